@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Benchmark loading parse results from a binary record file against re-parsing.
+
+Writes N parsed swipes to a binary record file, then times re-parsing the raw
+tracks, rebuilding every model from the file and decoding the vectorized
+columns. Prints records/s for each as JSON.
+
+Usage (with the package installed, e.g. ``pip install -e .``):
+    python benchmarks/bench_binary_format.py [--records 1000000]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from credit_card_stripe_parser import FullTrackParser
+from credit_card_stripe_parser.binary_format import RecordReader, write_records
+
+TRACK = ("%B5168755544412233^PKMMV/UNEMBOXXXX          ^1807111100000000000000111000000?"
+         ";5168755544412233=18071111000011100000?")
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--records', type=int, default=1_000_000)
+    args = parser.parse_args()
+    track_parser = FullTrackParser()
+    result = track_parser.parse(TRACK)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'swipes.bin')
+        write_seconds = timed(lambda: write_records(path, (result for _ in range(args.records))))
+        parse_seconds = timed(lambda: [track_parser.parse(TRACK) for _ in range(args.records)])
+        with RecordReader(path) as reader:
+            models_seconds = timed(lambda: list(reader))
+            columns_seconds = timed(reader.columns)
+        report = {
+            'records': args.records,
+            'file_bytes': os.path.getsize(path),
+            'write_records_per_second': args.records / write_seconds,
+            'parse_records_per_second': args.records / parse_seconds,
+            'read_models_per_second': args.records / models_seconds,
+            'read_columns_per_second': args.records / columns_seconds,
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark the local HTTP parsing service at increasing concurrency.
+
+Starts a ParseService on localhost and drives it with keep-alive clients that
+each send single-swipe requests back to back. Prints requests/s and latency
+percentiles for every concurrency level as JSON.
+
+Usage (with the package installed, e.g. ``pip install -e .``):
+    python benchmarks/bench_http_service.py [--duration 3] [--levels 1,8,32,128]
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from credit_card_stripe_parser.http_service import ParseService
+from credit_card_stripe_parser.loadgen import percentile
+
+TRACK = ("%B5168755544412233^PKMMV/UNEMBOXXXX          ^1807111100000000000000111000000?"
+         ";5168755544412233=18071111000011100000?")
+
+
+async def client(port, deadline, latencies):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = json.dumps({'track': TRACK}).encode('utf-8')
+    request = (f"POST /parse HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+               f"Content-Length: {len(body)}\r\n\r\n").encode('latin-1') + body
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        writer.write(request)
+        await writer.drain()
+        length = 0
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            if line.lower().startswith(b'content-length:'):
+                length = int(line.split(b':')[1])
+        await reader.readexactly(length)
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+
+
+async def run(levels, duration, max_batch, max_delay):
+    service = ParseService(max_batch=max_batch, max_delay=max_delay)
+    await service.start()
+    report = []
+    try:
+        for concurrency in levels:
+            latencies = []
+            start = time.perf_counter()
+            deadline = start + duration
+            await asyncio.gather(*(client(service.port, deadline, latencies) for _ in range(concurrency)))
+            elapsed = time.perf_counter() - start
+            latencies.sort()
+            report.append({
+                'concurrency': concurrency,
+                'requests_per_second': len(latencies) / elapsed,
+                'p50_ms': percentile(latencies, 0.50) * 1000,
+                'p99_ms': percentile(latencies, 0.99) * 1000,
+                'p999_ms': percentile(latencies, 0.999) * 1000,
+            })
+        stats = dict(service.stats)
+    finally:
+        await service.stop()
+    return {'levels': report, 'service_stats': stats}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--duration', type=float, default=3.0)
+    parser.add_argument('--levels', default='1,8,32,128')
+    parser.add_argument('--max-batch', type=int, default=64)
+    parser.add_argument('--max-delay-ms', type=float, default=2.0)
+    args = parser.parse_args()
+    levels = [int(level) for level in args.levels.split(',')]
+    report = asyncio.run(run(levels, args.duration, args.max_batch, args.max_delay_ms / 1000))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Benchmark compiled reader profiles against the default parser.
+
+For every built-in profile, formats a swipe in the profile's layout and times
+the compiled parse routine against the default FullTrackParser on clean input
+and against ad-hoc preprocessing followed by the default parser. Prints
+swipes/s as JSON.
+
+Usage (with the package installed, e.g. ``pip install -e .``):
+    python benchmarks/bench_profiles.py [--records 200000]
+"""
+import argparse
+import json
+import time
+
+from credit_card_stripe_parser import FullTrackParser
+from credit_card_stripe_parser.profiles import PROFILES
+
+TRACK_ONE = "%B5168755544412233^PKMMV/UNEMBOXXXX          ^1807111100000000000000111000000?"
+TRACK_TWO = ";5168755544412233=18071111000011100000?"
+LAYOUTS = {
+    'default': TRACK_ONE + TRACK_TWO,
+    'crlf': TRACK_ONE + "\r\n" + TRACK_TWO + "\r\n",
+    'nul_padded': TRACK_ONE + TRACK_TWO + "\0" * 16,
+    'device_header': "RDR-0042|" + TRACK_ONE + "\r\n" + TRACK_TWO + "\0" * 16,
+}
+
+
+def ad_hoc(raw):
+    """The pre-processing callers wrote by hand before profiles existed."""
+    raw = raw.split('|', 1)[-1] if '|' in raw else raw
+    return raw.replace('\r', '').replace('\n', '').rstrip('\0')
+
+
+def rate(records, fn, raw):
+    start = time.perf_counter()
+    for _ in range(records):
+        fn(raw)
+    return records / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--records', type=int, default=200_000)
+    args = parser.parse_args()
+    default = FullTrackParser()
+    report = {'default_per_second': rate(args.records, default.parse, LAYOUTS['default']), 'profiles': {}}
+    for name, profile in PROFILES.items():
+        compiled = profile.compile()
+        raw = LAYOUTS[name]
+        report['profiles'][name] = {
+            'compiled_per_second': rate(args.records, compiled.parse, raw),
+            'ad_hoc_per_second': rate(args.records, lambda r: default.parse(ad_hoc(r)), raw),
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Compare serial, thread-pool and process-pool parsing, optionally across interpreters.
+
+Parses the same batch of swipes serially, with ThreadedParser at each thread
+count and with a process pool at each worker count, and prints swipes/s as
+JSON together with whether the interpreter is a free-threaded build. Pass
+``--interpreters`` to run the benchmark under several interpreters (for
+example a standard and a free-threaded CPython) and report them side by side.
+
+Usage (with the package installed, e.g. ``pip install -e .``):
+    python benchmarks/bench_threads.py [--records 200000] [--workers 1,2,4,8]
+    python benchmarks/bench_threads.py --interpreters python3.13,python3.13t
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from credit_card_stripe_parser import FullTrackParser
+from credit_card_stripe_parser.threaded import ThreadedParser, free_threaded_build, gil_enabled
+
+TRACK = ("%B5168755544412233^PKMMV/UNEMBOXXXX          ^1807111100000000000000111000000?"
+         ";5168755544412233=18071111000011100000?")
+
+
+def parse_chunk(tracks):
+    parser = FullTrackParser()
+    return [parser.parse(track) for track in tracks]
+
+
+def rate(records, fn):
+    start = time.perf_counter()
+    fn()
+    return records / (time.perf_counter() - start)
+
+
+def run(records, worker_counts):
+    tracks = [TRACK] * records
+    parser = FullTrackParser()
+    report = {
+        'python': platform.python_version(),
+        'executable': sys.executable,
+        'free_threaded_build': free_threaded_build(),
+        'gil_enabled': gil_enabled(),
+        'serial_per_second': rate(records, lambda: [parser.parse(track) for track in tracks]),
+        'threads_per_second': {},
+        'processes_per_second': {},
+    }
+    for workers in worker_counts:
+        with ThreadedParser(parser, workers=workers, chunk_size=1024) as threaded:
+            report['threads_per_second'][workers] = rate(records, lambda: threaded.parse_batch(tracks))
+        chunks = [tracks[i:i + 1024] for i in range(0, records, 1024)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(parse_chunk, chunks[:workers]))  # start the workers
+            report['processes_per_second'][workers] = rate(
+                records, lambda: [r for chunk in executor.map(parse_chunk, chunks) for r in chunk])
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--records', type=int, default=200_000)
+    parser.add_argument('--workers', default='1,2,4,8')
+    parser.add_argument('--interpreters', help='comma-separated interpreters to compare')
+    args = parser.parse_args()
+    if args.interpreters:
+        reports = []
+        for interpreter in args.interpreters.split(','):
+            output = subprocess.run([interpreter, __file__, '--records', str(args.records),
+                                     '--workers', args.workers], check=True, capture_output=True, text=True)
+            reports.append(json.loads(output.stdout))
+        print(json.dumps(reports, indent=2))
+        return
+    worker_counts = [int(w) for w in args.workers.split(',')]
+    print(json.dumps(run(args.records, worker_counts), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -8,11 +8,23 @@ from magnetic stripe cards according to ISO 7811-2 standards.
 __version__ = "1.0.0"
 
 from .full_track_parser import FullTrackParser
+from .stream_parser import StreamParser, StreamStats
+from .consistency import ConsistencyReport
+from .archive_index import ArchiveIndex
+from .follow import Checkpoint, FileFollower
+from .shm_transport import SharedResultRing
 from .models import FullTrackDataModel, TrackOneModel, TrackTwoModel
 from .exceptions import InvalidTrackOneError, InvalidTrackTwoError
 
 __all__ = [
     'FullTrackParser',
+    'StreamParser',
+    'StreamStats',
+    'ConsistencyReport',
+    'ArchiveIndex',
+    'Checkpoint',
+    'FileFollower',
+    'SharedResultRing',
     'FullTrackDataModel',
     'TrackOneModel',
     'TrackTwoModel',
@@ -0,0 +1,26 @@
+"""
+Helpers for optional third-party dependencies.
+"""
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover - exercised only without numpy installed
+    numpy = None
+
+
+def require_numpy():
+    """
+    Return the numpy module, raising a helpful error if it is not installed.
+
+    Returns:
+        The imported numpy module.
+
+    Raises:
+        ImportError: If numpy is not available.
+    """
+    if numpy is None:
+        raise ImportError(
+            "This feature requires numpy. "
+            "Install it with: pip install credit-card-stripe-parser[numpy]"
+        )
+    return numpy
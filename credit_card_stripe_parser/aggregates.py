@@ -0,0 +1,452 @@
+"""
+Streaming aggregate statistics over parse results.
+
+Live dashboards need swipes per BIN, per service code and per terminal, error
+rates by failure reason and the number of distinct cards, without storing
+every swipe. This module keeps those figures in constant memory with cheap
+updates (O(1) for the sketches, amortized O(log k) for a top-k table):
+
+* CountMinSketch estimates the frequency of any key;
+* HyperLogLog estimates the number of distinct keys;
+* TopK keeps the heaviest keys of a dimension in a fixed-size table.
+
+SwipeAggregator combines them for parse results. Every structure can be merged
+with another built with the same parameters, so partial aggregates from many
+workers (or many time windows) can be combined. WindowedAggregator keeps one
+aggregator per time window and rolls up any recent span on demand.
+"""
+import copy
+import hashlib
+import math
+import time
+from array import array
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from .models import FullTrackDataModel
+
+NO_VALID_TRACK = 'no_valid_track'
+
+_MASK64 = (1 << 64) - 1
+
+
+def _hash128(key: str, seed: int) -> Tuple[int, int]:
+    """Hash a key to two independent 64-bit integers."""
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16,
+                             salt=seed.to_bytes(16, 'little')).digest()
+    return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little')
+
+
+def _check_compatible(a: Any, b: Any, attributes: Tuple[str, ...]) -> None:
+    for name in attributes:
+        if getattr(a, name) != getattr(b, name):
+            raise ValueError(f"Cannot merge {type(a).__name__} instances with different {name}")
+
+
+class CountMinSketch:
+    """
+    A count-min sketch of key frequencies.
+
+    Estimates never undercount; with probability ``1 - exp(-depth)`` they
+    overcount by at most ``e / width`` times the total count.
+    """
+
+    def __init__(self, width: int = 2048, depth: int = 4, seed: int = 0):
+        """
+        Allocate the sketch.
+
+        Args:
+            width: The number of counters per row.
+            depth: The number of rows (independent hash functions).
+            seed: The hash seed. Only sketches with equal seeds can be merged.
+        """
+        self.width = width
+        self.depth = depth
+        self.seed = seed
+        self.total = 0
+        self._table = array('Q', bytes(8 * width * depth))
+
+    def _cells(self, key: str) -> List[int]:
+        h1, h2 = _hash128(key, self.seed)
+        width = self.width
+        return [row * width + (h1 + row * h2) % width for row in range(self.depth)]
+
+    def add(self, key: str, count: int = 1) -> None:
+        """Add ``count`` occurrences of a key."""
+        table = self._table
+        for cell in self._cells(key):
+            table[cell] += count
+        self.total += count
+
+    def estimate(self, key: str) -> int:
+        """Return the estimated number of occurrences of a key."""
+        table = self._table
+        return min(table[cell] for cell in self._cells(key))
+
+    def merge(self, other: 'CountMinSketch') -> None:
+        """
+        Add the counts of another sketch to this one.
+
+        Raises:
+            ValueError: If the sketches have different dimensions or seeds.
+        """
+        _check_compatible(self, other, ('width', 'depth', 'seed'))
+        table = self._table
+        for i, value in enumerate(other._table):
+            if value:
+                table[i] += value
+        self.total += other.total
+
+
+class HyperLogLog:
+    """
+    A HyperLogLog estimator of the number of distinct keys.
+
+    The standard error is about ``1.04 / sqrt(2 ** precision)``, e.g. 1.6%
+    with the default precision of 12 (4 KiB of registers).
+    """
+
+    def __init__(self, precision: int = 12, seed: int = 0):
+        """
+        Allocate the registers.
+
+        Args:
+            precision: The number of index bits, between 4 and 18.
+            seed: The hash seed. Only estimators with equal seeds can be merged.
+
+        Raises:
+            ValueError: If the precision is out of range.
+        """
+        if not 4 <= precision <= 18:
+            raise ValueError("HyperLogLog precision must be between 4 and 18")
+        self.precision = precision
+        self.seed = seed
+        self._registers = bytearray(1 << precision)
+
+    def add(self, key: str) -> None:
+        """Add a key."""
+        h, _ = _hash128(key, self.seed)
+        bits = 64 - self.precision
+        index = h >> bits
+        rank = bits - (h & ((1 << bits) - 1)).bit_length() + 1
+        if rank > self._registers[index]:
+            self._registers[index] = rank
+
+    def count(self) -> int:
+        """Return the estimated number of distinct keys added."""
+        m = len(self._registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self._registers)
+        zeros = self._registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def merge(self, other: 'HyperLogLog') -> None:
+        """
+        Merge the keys of another estimator into this one.
+
+        Raises:
+            ValueError: If the estimators have different precisions or seeds.
+        """
+        _check_compatible(self, other, ('precision', 'seed'))
+        self._registers = bytearray(map(max, self._registers, other._registers))
+
+
+class TopK:
+    """
+    A fixed-size table of the most frequent keys (a space-saving summary).
+
+    At most ``2 * capacity`` keys are tracked; the table is pruned back to
+    ``capacity`` keys by sorting it when it fills. A prune costs
+    O(k log k) for ``k = capacity`` and happens at most once every ``k + 1``
+    new keys, so updates are amortized O(log k). A key
+    first seen after a prune starts from ``floor``, the largest count pruned
+    so far, which makes every reported count an overestimate by at most
+    ``floor``.
+    """
+
+    def __init__(self, capacity: int = 10):
+        """
+        Allocate the table.
+
+        Args:
+            capacity: The number of keys reported by ``top()``.
+        """
+        self.capacity = capacity
+        self.floor = 0
+        self._counts: Dict[str, int] = {}
+
+    def add(self, key: str, count: int = 1) -> None:
+        """Add ``count`` occurrences of a key."""
+        counts = self._counts
+        if key in counts:
+            counts[key] += count
+            return
+        counts[key] = self.floor + count
+        if len(counts) > 2 * self.capacity:
+            self._prune()
+
+    def top(self, n: Optional[int] = None) -> List[Tuple[str, int]]:
+        """
+        Return the heaviest keys.
+
+        Args:
+            n: The number of keys to return (``capacity`` if omitted).
+
+        Returns:
+            List[Tuple[str, int]]: ``(key, count)`` pairs, most frequent first.
+        """
+        n = self.capacity if n is None else min(n, self.capacity)
+        return sorted(self._counts.items(), key=lambda item: (-item[1], item[0]))[:n]
+
+    def merge(self, other: 'TopK') -> None:
+        """
+        Merge the counts of another table into this one.
+
+        Raises:
+            ValueError: If the tables have different capacities.
+        """
+        _check_compatible(self, other, ('capacity',))
+        merged = {key: count + other._counts.get(key, other.floor) for key, count in self._counts.items()}
+        for key, count in other._counts.items():
+            if key not in merged:
+                merged[key] = count + self.floor
+        self._counts = merged
+        self.floor += other.floor
+        if len(merged) > 2 * self.capacity:
+            self._prune()
+
+    def _prune(self) -> None:
+        ranked = sorted(self._counts.items(), key=lambda item: (-item[1], item[0]))
+        self.floor = max(self.floor, ranked[self.capacity][1])
+        self._counts = dict(ranked[:self.capacity])
+
+
+class SwipeAggregator:
+    """
+    Constant-memory aggregate statistics over parse results.
+
+    Swipes are counted per BIN, per service code and per terminal, both in a
+    CountMinSketch (for any key) and in a TopK table (for the heaviest keys).
+    Distinct cards are estimated with a HyperLogLog over PANs. Failures are
+    counted exactly per reason, since the set of reasons is small and fixed.
+    """
+
+    DIMENSIONS = ('bin', 'service_code', 'terminal')
+
+    def __init__(self, width: int = 2048, depth: int = 4, precision: int = 12, top_k: int = 10, seed: int = 0):
+        """
+        Allocate the aggregator.
+
+        Args:
+            width: The CountMinSketch width of each dimension.
+            depth: The CountMinSketch depth of each dimension.
+            precision: The HyperLogLog precision of the distinct card estimate.
+            top_k: The TopK capacity of each dimension.
+            seed: The hash seed. Only aggregators with equal parameters can be merged.
+        """
+        self.swipes = 0
+        self.errors: Dict[str, int] = {}
+        self._sketches = {name: CountMinSketch(width, depth, seed) for name in self.DIMENSIONS}
+        self._top = {name: TopK(top_k) for name in self.DIMENSIONS}
+        self._cards = HyperLogLog(precision, seed)
+
+    def _count(self, dimension: str, key: str) -> None:
+        self._sketches[dimension].add(key)
+        self._top[dimension].add(key)
+
+    def add(self, result: FullTrackDataModel, terminal: Optional[str] = None) -> None:
+        """
+        Count a parse result.
+
+        Results without any parsed track are counted as ``no_valid_track`` errors.
+
+        Args:
+            result: The parsed swipe.
+            terminal: The identifier of the terminal that read the swipe, if known.
+        """
+        track = result.track_two or result.track_one
+        if track is None:
+            self.add_error(NO_VALID_TRACK, terminal)
+            return
+        self.swipes += 1
+        if terminal is not None:
+            self._count('terminal', terminal)
+        self._count('bin', track.pan[:6])
+        self._count('service_code', track.service_code)
+        self._cards.add(track.pan)
+
+    def add_error(self, error: Union[str, BaseException], terminal: Optional[str] = None) -> None:
+        """
+        Count a failed swipe.
+
+        Args:
+            error: The failure reason, or the exception raised by the parser
+                (counted under its class name).
+            terminal: The identifier of the terminal that read the swipe, if known.
+        """
+        reason = error if isinstance(error, str) else type(error).__name__
+        self.errors[reason] = self.errors.get(reason, 0) + 1
+        if terminal is not None:
+            self._count('terminal', terminal)
+
+    @property
+    def total(self) -> int:
+        """The number of swipes and failures counted."""
+        return self.swipes + sum(self.errors.values())
+
+    def estimate(self, dimension: str, key: str) -> int:
+        """
+        Return the estimated number of swipes for a key of a dimension.
+
+        Args:
+            dimension: One of ``bin``, ``service_code`` or ``terminal``.
+            key: The BIN, service code or terminal identifier.
+        """
+        return self._sketches[dimension].estimate(key)
+
+    def top(self, dimension: str, n: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Return the heaviest ``(key, count)`` pairs of a dimension, most frequent first."""
+        return self._top[dimension].top(n)
+
+    def distinct_cards(self) -> int:
+        """Return the estimated number of distinct PANs."""
+        return self._cards.count()
+
+    def error_rates(self) -> Dict[str, float]:
+        """Return the fraction of all counted swipes that failed, per reason."""
+        total = self.total
+        return {reason: count / total for reason, count in self.errors.items()} if total else {}
+
+    def merge(self, other: 'SwipeAggregator') -> None:
+        """
+        Merge another aggregator into this one.
+
+        Raises:
+            ValueError: If the aggregators were built with different parameters.
+        """
+        for name in self.DIMENSIONS:
+            self._sketches[name].merge(other._sketches[name])
+            self._top[name].merge(other._top[name])
+        self._cards.merge(other._cards)
+        self.swipes += other.swipes
+        for reason, count in other.errors.items():
+            self.errors[reason] = self.errors.get(reason, 0) + count
+
+    def copy(self) -> 'SwipeAggregator':
+        """Return an independent copy of the aggregator."""
+        return copy.deepcopy(self)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the headline figures as a JSON-serializable dictionary."""
+        return {
+            'total': self.total,
+            'swipes': self.swipes,
+            'errors': dict(self.errors),
+            'error_rates': self.error_rates(),
+            'distinct_cards': self.distinct_cards(),
+            'top': {name: self.top(name) for name in self.DIMENSIONS},
+        }
+
+
+class WindowedAggregator:
+    """
+    Per-window SwipeAggregators with on-demand rollups.
+
+    Swipes are assigned to fixed windows of ``window`` seconds by timestamp.
+    Only the ``retain`` most recent windows are kept, so memory stays constant.
+    """
+
+    def __init__(self, window: float = 60.0, retain: int = 60, clock: Callable[[], float] = time.time,
+                 **aggregator_options: Any):
+        """
+        Configure the windows.
+
+        Args:
+            window: The window length in seconds.
+            retain: The number of windows kept.
+            clock: The time source used when no timestamp is given.
+            **aggregator_options: Options passed to each window's SwipeAggregator.
+        """
+        self.window = window
+        self.retain = retain
+        self.clock = clock
+        self.aggregator_options = aggregator_options
+        self._windows: 'OrderedDict[float, SwipeAggregator]' = OrderedDict()
+
+    def _window_for(self, timestamp: Optional[float]) -> Optional[SwipeAggregator]:
+        if timestamp is None:
+            timestamp = self.clock()
+        start = math.floor(timestamp / self.window) * self.window
+        aggregator = self._windows.get(start)
+        if aggregator is None:
+            if self._windows and start < next(iter(self._windows)) and len(self._windows) >= self.retain:
+                return None  # older than every retained window
+            aggregator = self._windows[start] = SwipeAggregator(**self.aggregator_options)
+            if len(self._windows) > 1 and start < next(reversed(self._windows)):
+                self._windows = OrderedDict(sorted(self._windows.items()))
+            while len(self._windows) > self.retain:
+                self._windows.popitem(last=False)
+        return aggregator
+
+    def add(self, result: FullTrackDataModel, terminal: Optional[str] = None,
+            timestamp: Optional[float] = None) -> None:
+        """
+        Count a parse result in the window containing ``timestamp`` (now if omitted).
+
+        Swipes older than every retained window are dropped.
+        """
+        aggregator = self._window_for(timestamp)
+        if aggregator is not None:
+            aggregator.add(result, terminal)
+
+    def add_error(self, error: Union[str, BaseException], terminal: Optional[str] = None,
+                  timestamp: Optional[float] = None) -> None:
+        """Count a failed swipe in the window containing ``timestamp`` (now if omitted)."""
+        aggregator = self._window_for(timestamp)
+        if aggregator is not None:
+            aggregator.add_error(error, terminal)
+
+    def windows(self) -> List[Tuple[float, SwipeAggregator]]:
+        """Return the retained ``(window start, aggregator)`` pairs, oldest first."""
+        return list(self._windows.items())
+
+    def rollup(self, span: Optional[float] = None, now: Optional[float] = None) -> SwipeAggregator:
+        """
+        Merge recent windows into one aggregator.
+
+        Args:
+            span: The number of seconds to cover, ending at ``now``; all
+                retained windows if omitted.
+            now: The end of the span (the clock's time if omitted).
+
+        Returns:
+            SwipeAggregator: A new aggregator covering the span.
+        """
+        rollup = SwipeAggregator(**self.aggregator_options)
+        if span is not None:
+            now = self.clock() if now is None else now
+            oldest = now - span
+        for start, aggregator in self._windows.items():
+            if span is None or start + self.window > oldest:
+                rollup.merge(aggregator)
+        return rollup
+
+    def merge(self, other: 'WindowedAggregator') -> None:
+        """
+        Merge the windows of another windowed aggregator into this one.
+
+        Raises:
+            ValueError: If the window lengths differ.
+        """
+        _check_compatible(self, other, ('window',))
+        for start, aggregator in other._windows.items():
+            target = self._windows.get(start)
+            if target is None:
+                self._windows[start] = aggregator.copy()
+            else:
+                target.merge(aggregator)
+        self._windows = OrderedDict(sorted(self._windows.items()))
+        while len(self._windows) > self.retain:
+            self._windows.popitem(last=False)
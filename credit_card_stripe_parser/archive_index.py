@@ -0,0 +1,326 @@
+"""
+ArchiveIndex class for locating cards in raw swipe archives.
+
+Archives are newline-delimited files of raw track data, optionally compressed
+with gzip, bz2 or xz; offsets refer to the decompressed stream. Each archive is parsed
+once with FullTrackParser and every swipe is recorded as a posting that maps a
+keyed PAN hash, the BIN and the expiration date to the ``(file, offset)`` of
+the raw record. Postings are written as immutable, sorted segment files that
+are memory-mapped and binary searched at query time; adding an archive only
+writes a new segment.
+
+Segment file layout (little endian)::
+
+    magic (8 bytes) | count (uint64)
+    count x (key uint64, file_id uint32, offset uint64)  sorted by PAN hash
+    count x (key uint64, file_id uint32, offset uint64)  sorted by BIN
+    count x (key uint64, file_id uint32, offset uint64)  sorted by expiry
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from .bulk import iter_records, open_archive
+from .full_track_parser import FullTrackParser
+from .models import FullTrackDataModel
+from .exceptions import CreditCardStripeError
+
+_MAGIC = b'CCSPIDX1'
+_HEADER = struct.Struct('<8sQ')
+_POSTING = struct.Struct('<QIQ')
+_MANIFEST = 'manifest.json'
+
+# Section order within a segment file
+_PAN_SECTION = 0
+_BIN_SECTION = 1
+_EXPIRY_SECTION = 2
+
+
+def _is_digits(value: str) -> bool:
+    """Whether a string consists of ASCII digits (isdigit alone also accepts e.g. superscripts)."""
+    return value.isascii() and value.isdigit()
+
+
+class ArchiveIndex:
+    """
+    A persistent on-disk index over raw swipe archive files.
+
+    The PAN itself is never stored: postings are keyed by a BLAKE2b hash of the
+    PAN keyed with a secret, so the index can only be queried by someone who
+    holds the key.
+
+    Swipes without a PAN of ASCII digits cannot be indexed; ``skipped``
+    counts them, along with records that fail to parse.
+    """
+
+    def __init__(self, directory: str, key: bytes, parser: Optional[FullTrackParser] = None):
+        """
+        Open or create an index.
+
+        Args:
+            directory: The directory holding the index files. Created if missing.
+            key: The secret key (up to 64 bytes) used to hash PANs.
+            parser: The parser used for archive records (a default FullTrackParser if omitted).
+
+        Raises:
+            ValueError: If the key is empty or longer than 64 bytes.
+        """
+        if not key or len(key) > 64:
+            raise ValueError("Index key must be between 1 and 64 bytes long")
+        self.directory = directory
+        self.parser = parser if parser is not None else FullTrackParser()
+        self._key = key
+        self.skipped = 0
+        os.makedirs(directory, exist_ok=True)
+        self._files: List[str] = []
+        self._segments: List[str] = []
+        manifest_path = os.path.join(directory, _MANIFEST)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r', encoding='utf-8') as fh:
+                manifest = json.load(fh)
+            self._files = manifest['files']
+            self._segments = manifest['segments']
+
+    @property
+    def files(self) -> List[str]:
+        """The archive files covered by the index, in the order they were added."""
+        return list(self._files)
+
+    def hash_pan(self, pan: str) -> int:
+        """
+        Return the keyed hash of a PAN as stored in the index.
+
+        Args:
+            pan: The Primary Account Number.
+
+        Returns:
+            int: The 64-bit keyed hash.
+        """
+        digest = hashlib.blake2b(pan.encode('utf-8'), key=self._key, digest_size=8).digest()
+        return int.from_bytes(digest, 'little')
+
+    def add_archive(self, path: str) -> int:
+        """
+        Parse an archive file and add its swipes to the index.
+
+        Archives that are already indexed are skipped. Records that fail to
+        parse or have no PAN of ASCII digits are skipped and counted in ``skipped``.
+
+        Args:
+            path: The archive file to index.
+
+        Returns:
+            int: The number of postings added.
+        """
+        path = os.path.abspath(path)
+        if path in self._files:
+            return 0
+        file_id = len(self._files)
+        postings = []
+        for offset, line in iter_records(path):
+            try:
+                result = self.parser.parse(line)
+            except CreditCardStripeError:
+                self.skipped += 1
+                continue
+            key = self._posting_key(result)
+            if key is None:
+                self.skipped += 1
+            else:
+                postings.append(key + (file_id, offset))
+
+        self._files.append(path)
+        if postings:
+            self._segments.append(self._write_segment(postings))
+        self._write_manifest()
+        return len(postings)
+
+    def lookup(self, pan: Optional[str] = None, bin_prefix: Optional[str] = None,
+               expiry: Optional[str] = None) -> List[Tuple[str, int]]:
+        """
+        Find the archive locations of swipes matching all given criteria.
+
+        Args:
+            pan: The full PAN to look for.
+            bin_prefix: The BIN (first six digits of the PAN).
+            expiry: The expiration date in YYMM format.
+
+        Returns:
+            List[Tuple[str, int]]: ``(file, offset)`` pairs sorted by file and offset.
+
+        Raises:
+            ValueError: If no criteria are given, or a criterion is not in its
+                digit format.
+        """
+        criteria = []
+        if pan is not None:
+            if not _is_digits(pan):
+                raise ValueError(f"PAN must be a string of digits: {pan!r}")
+            criteria.append((_PAN_SECTION, self.hash_pan(pan)))
+        if bin_prefix is not None:
+            if len(bin_prefix) != 6 or not _is_digits(bin_prefix):
+                raise ValueError(f"BIN must be six digits: {bin_prefix!r}")
+            criteria.append((_BIN_SECTION, int(bin_prefix)))
+        if expiry is not None:
+            if len(expiry) != 4 or not _is_digits(expiry):
+                raise ValueError(f"Expiration date must be four digits (YYMM): {expiry!r}")
+            criteria.append((_EXPIRY_SECTION, int(expiry)))
+        if not criteria:
+            raise ValueError("At least one of pan, bin_prefix or expiry is required")
+
+        matches: Optional[Set[Tuple[int, int]]] = None
+        for section, key in criteria:
+            found = set()
+            for segment in self._segments:
+                found.update(self._search_segment(segment, section, key))
+            matches = found if matches is None else matches & found
+        return [(self._files[file_id], offset) for file_id, offset in sorted(matches)]
+
+    def query(self, pan: Optional[str] = None, bin_prefix: Optional[str] = None,
+              expiry: Optional[str] = None) -> List[FullTrackDataModel]:
+        """
+        Return the matching swipes, re-parsed from the archives.
+
+        When searching by PAN, records whose PAN differs (a hash collision) are dropped.
+
+        Args:
+            pan: The full PAN to look for.
+            bin_prefix: The BIN (first six digits of the PAN).
+            expiry: The expiration date in YYMM format.
+
+        Returns:
+            List[FullTrackDataModel]: The parsed swipes, in archive order.
+
+        Raises:
+            ValueError: If no criteria are given, or a criterion is not in its
+                digit format.
+        """
+        # Group the hits by archive so each archive is read once, in offset order
+        offsets: Dict[str, List[int]] = {}
+        for path, offset in self.lookup(pan=pan, bin_prefix=bin_prefix, expiry=expiry):
+            offsets.setdefault(path, []).append(offset)
+        results = []
+        for path, archive_offsets in offsets.items():
+            for line in self._read_records(path, archive_offsets):
+                result = self.parser.parse(line)
+                if pan is not None and self._result_pan(result) != pan:
+                    continue
+                results.append(result)
+        return results
+
+    def compact(self) -> None:
+        """Merge all segments into a single segment."""
+        if len(self._segments) < 2:
+            return
+        postings: Dict[Tuple[int, int], List[int]] = {}
+        for segment in self._segments:
+            for section, (key, file_id, offset) in self._iter_segment(segment):
+                postings.setdefault((file_id, offset), [0, 0, 0])[section] = key
+        merged = [tuple(keys) + location for location, keys in postings.items()]
+        old_segments = self._segments
+        self._segments = [self._write_segment(merged)]
+        self._write_manifest()
+        for segment in old_segments:
+            os.remove(os.path.join(self.directory, segment))
+
+    def _read_records(self, path: str, offsets: List[int]) -> Iterator[str]:
+        """
+        Read the raw records at ascending decompressed offsets of an archive.
+
+        Compressed archives can only seek by decompressing up to the target,
+        and seeking backwards restarts from the beginning; reading all hits
+        in one forward pass decompresses the archive at most once.
+        """
+        with open_archive(path) as fh:
+            for offset in offsets:
+                fh.seek(offset)
+                yield fh.readline().rstrip(b'\r\n').decode('latin-1')
+
+    @staticmethod
+    def _result_pan(result: FullTrackDataModel) -> Optional[str]:
+        """Return the PAN of a parsed swipe, preferring Track 2."""
+        track = result.track_two or result.track_one
+        return track.pan if track else None
+
+    def _posting_key(self, result: FullTrackDataModel) -> Optional[Tuple[int, int, int]]:
+        """Return the ``(pan_hash, bin, expiry)`` key of a parsed swipe."""
+        track = result.track_two or result.track_one
+        if track is None or len(track.pan) < 6 or not _is_digits(track.pan):
+            return None
+        expiry = int(track.expiration_date) if _is_digits(track.expiration_date) else 0
+        return self.hash_pan(track.pan), int(track.pan[:6]), expiry
+
+    def _write_segment(self, postings: List[Tuple[int, int, int, int, int]]) -> str:
+        """Write postings as a new sorted segment file and return its name."""
+        number = len(self._segments)
+        while os.path.exists(os.path.join(self.directory, f"segment-{number:06d}.idx")):
+            number += 1
+        name = f"segment-{number:06d}.idx"
+        path = os.path.join(self.directory, name)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as fh:
+            fh.write(_HEADER.pack(_MAGIC, len(postings)))
+            for section in (_PAN_SECTION, _BIN_SECTION, _EXPIRY_SECTION):
+                entries = sorted((p[section], p[3], p[4]) for p in postings)
+                fh.write(b''.join(_POSTING.pack(*entry) for entry in entries))
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp_path, path)
+        return name
+
+    def _write_manifest(self) -> None:
+        """Atomically write the manifest listing files and segments."""
+        path = os.path.join(self.directory, _MANIFEST)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as fh:
+            json.dump({'version': 1, 'files': self._files, 'segments': self._segments}, fh)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp_path, path)
+
+    def _open_segment(self, segment: str) -> Tuple[mmap.mmap, int]:
+        """Memory-map a segment file and return the map and its posting count."""
+        with open(os.path.join(self.directory, segment), 'rb') as fh:
+            view = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count = _HEADER.unpack_from(view, 0)
+        if magic != _MAGIC:
+            view.close()
+            raise ValueError(f"Invalid index segment: {segment}")
+        return view, count
+
+    def _search_segment(self, segment: str, section: int, key: int) -> List[Tuple[int, int]]:
+        """Binary search one section of a segment for all postings with ``key``."""
+        view, count = self._open_segment(segment)
+        try:
+            base = _HEADER.size + section * count * _POSTING.size
+            low, high = 0, count
+            while low < high:
+                mid = (low + high) // 2
+                if _POSTING.unpack_from(view, base + mid * _POSTING.size)[0] < key:
+                    low = mid + 1
+                else:
+                    high = mid
+            found = []
+            while low < count:
+                entry_key, file_id, offset = _POSTING.unpack_from(view, base + low * _POSTING.size)
+                if entry_key != key:
+                    break
+                found.append((file_id, offset))
+                low += 1
+            return found
+        finally:
+            view.close()
+
+    def _iter_segment(self, segment: str) -> Iterator[Tuple[int, Tuple[int, int, int]]]:
+        """Yield ``(section, posting)`` for every posting in a segment."""
+        view, count = self._open_segment(segment)
+        try:
+            for section in (_PAN_SECTION, _BIN_SECTION, _EXPIRY_SECTION):
+                base = _HEADER.size + section * count * _POSTING.size
+                for i in range(count):
+                    yield section, _POSTING.unpack_from(view, base + i * _POSTING.size)
+        finally:
+            view.close()
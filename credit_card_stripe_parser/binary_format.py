@@ -0,0 +1,426 @@
+"""
+Compact fixed-width binary storage for parse results.
+
+Reprocessing jobs spend most of their time re-parsing raw track text or
+loading JSON. This module stores FullTrackDataModel objects in a binary file
+that can be memory-mapped and read without any parsing:
+
+* a header carrying a magic number, the schema version, the record size, the
+  record count and the offset of the heap;
+* a table of fixed-width records holding validity flags, the format code as
+  one latin-1 byte, the PAN and both tracks' expiration dates and service
+  codes as packed BCD, plus an offset into the heap and the lengths of the
+  record's variable-length fields;
+* a heap holding cardholder names, discretionary data and source strings,
+  and the text of any field that cannot be stored in its fixed-width form
+  (for example a PAN that contains non-digit characters or more than 19
+  digits, or a format code outside latin-1).
+
+RecordWriter streams models into a file; RecordReader memory-maps it and
+offers random access to models and, with the ``numpy`` extra, vectorized
+column views.
+"""
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from ._compat import require_numpy
+from .models import FullTrackDataModel, TrackOneModel, TrackTwoModel
+
+SCHEMA_VERSION = 2
+
+_MAGIC = b'CCSPREC1'
+# magic, schema version, record size, header flags, record count, heap offset
+_HEADER = struct.Struct('<8sHHIQQ')
+# flags, format code, PAN, Track 1 expiry and service code, Track 2 expiry and service code,
+# heap offset, then the heap lengths of the _SLOTS fields
+_RECORD = struct.Struct('<H1s10s2s2s2s2sQ' + 'H' * 12)
+
+_HEADER_SOURCE = 0x01
+
+_TRACK_ONE_VALID = 0x0001
+_TRACK_ONE_PRESENT = 0x0002
+_TRACK_TWO_VALID = 0x0004
+_TRACK_TWO_PRESENT = 0x0008
+_TRACK_ONE_PAN_DIFFERS = 0x0010
+# A field stored as text in the heap because it could not be packed as BCD
+_PAN_TEXT = 0x0020
+_TRACK_ONE_EXPIRY_TEXT = 0x0040
+_TRACK_ONE_SERVICE_CODE_TEXT = 0x0080
+_TRACK_TWO_EXPIRY_TEXT = 0x0100
+_TRACK_TWO_SERVICE_CODE_TEXT = 0x0200
+# The format code is not a single latin-1 byte and is stored in the heap
+_FORMAT_CODE_TEXT = 0x0400
+
+# Heap fields of a record, in storage order
+_SLOTS = ('pan', 'track_one_pan', 'track_one_expiry', 'track_one_service_code', 'track_two_expiry',
+          'track_two_service_code', 'card_holder_name', 'track_one_discretionary_data',
+          'track_two_discretionary_data', 'track_one_source_string', 'track_two_source_string', 'format_code')
+# (heap slot, BCD size in bytes, maximum digits, text flag) of the fields stored as BCD, in
+# record order. The digit limits match the widths of the columns returned by RecordReader.columns.
+_BCD_FIELDS = ((0, 10, 19, _PAN_TEXT),
+               (2, 2, 4, _TRACK_ONE_EXPIRY_TEXT), (3, 2, 3, _TRACK_ONE_SERVICE_CODE_TEXT),
+               (4, 2, 4, _TRACK_TWO_EXPIRY_TEXT), (5, 2, 3, _TRACK_TWO_SERVICE_CODE_TEXT))
+
+
+def _pack_bcd(value: str, size: int, digits: int) -> Optional[bytes]:
+    """Pack up to ``digits`` digits as BCD padded with 0xF nibbles, or return None if they do not fit."""
+    if len(value) > digits or not (value.isascii() and (value.isdigit() or not value)):
+        return None
+    return bytes.fromhex(value.ljust(2 * size, 'f'))
+
+
+class RecordWriter:
+    """
+    Streams parse results into a binary record file.
+
+    Records are written to ``<path>.part`` and the heap to a temporary file;
+    ``close()`` appends the heap, completes the header and atomically renames
+    the file into place, so readers never see a partial file.
+    """
+
+    def __init__(self, path: str, include_source: bool = True):
+        """
+        Create the file.
+
+        Args:
+            path: The path of the record file.
+            include_source: Whether to store the tracks' source strings. Without
+                them, records are smaller and models are rebuilt with empty
+                source strings.
+        """
+        self.path = path
+        self.include_source = include_source
+        self.count = 0
+        self._part_path = path + '.part'
+        self._fh = open(self._part_path, 'wb')
+        self._fh.write(bytes(_HEADER.size))
+        self._heap = tempfile.TemporaryFile(dir=os.path.dirname(os.path.abspath(path)))
+        self._heap_size = 0
+
+    def write(self, result: FullTrackDataModel) -> None:
+        """
+        Append a parse result.
+
+        Args:
+            result: The parsed swipe.
+
+        Raises:
+            ValueError: If a variable-length field is longer than 65535 bytes.
+        """
+        one = result.track_one
+        two = result.track_two
+        flags = 0
+        if result.is_track_one_valid:
+            flags |= _TRACK_ONE_VALID
+        if result.is_track_two_valid:
+            flags |= _TRACK_TWO_VALID
+        texts = [''] * len(_SLOTS)
+        pan = ''
+        if one is not None:
+            flags |= _TRACK_ONE_PRESENT
+            pan = one.pan
+            texts[2:4] = one.expiration_date, one.service_code
+            texts[6:8] = one.card_holder_name, one.discretionary_data
+            if self.include_source:
+                texts[9] = one.source_string
+        if two is not None:
+            flags |= _TRACK_TWO_PRESENT
+            if one is not None and one.pan != two.pan:
+                flags |= _TRACK_ONE_PAN_DIFFERS
+                texts[1] = one.pan
+            pan = two.pan
+            texts[4:6] = two.expiration_date, two.service_code
+            texts[8] = two.discretionary_data
+            if self.include_source:
+                texts[10] = two.source_string
+        texts[0] = pan
+        format_code = b''
+        if one is not None:
+            code = one.format_code
+            if len(code) == 1 and '\0' < code <= '\xff':
+                format_code = code.encode('latin-1')
+            else:
+                flags |= _FORMAT_CODE_TEXT
+                texts[11] = code
+
+        packed = []
+        for slot, size, digits, flag in _BCD_FIELDS:
+            bcd = _pack_bcd(texts[slot], size, digits)
+            if bcd is None:
+                flags |= flag
+                packed.append(bytes(size))
+            else:
+                texts[slot] = ''
+                packed.append(bcd)
+
+        encoded = [t.encode('utf-8') for t in texts]
+        lengths = [len(e) for e in encoded]
+        if max(lengths) > 0xFFFF:
+            raise ValueError("Field is too long for the binary record format")
+        self._fh.write(_RECORD.pack(flags, format_code, *packed, self._heap_size, *lengths))
+        heap = b''.join(encoded)
+        self._heap.write(heap)
+        self._heap_size += len(heap)
+        self.count += 1
+
+    def write_many(self, results: Iterable[FullTrackDataModel]) -> int:
+        """Append several parse results and return how many were written."""
+        written = 0
+        for result in results:
+            self.write(result)
+            written += 1
+        return written
+
+    def close(self) -> None:
+        """Complete the file and move it into place."""
+        if self._fh is None:
+            return
+        heap_offset = _HEADER.size + self.count * _RECORD.size
+        self._heap.seek(0)
+        shutil.copyfileobj(self._heap, self._fh)
+        self._heap.close()
+        self._fh.seek(0)
+        self._fh.write(_HEADER.pack(_MAGIC, SCHEMA_VERSION, _RECORD.size,
+                                    _HEADER_SOURCE if self.include_source else 0, self.count, heap_offset))
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+        self._fh.close()
+        self._fh = None
+        os.replace(self._part_path, self.path)
+
+    def abort(self) -> None:
+        """Discard the partially written file."""
+        if self._fh is None:
+            return
+        self._heap.close()
+        self._fh.close()
+        self._fh = None
+        os.remove(self._part_path)
+
+    def __enter__(self) -> 'RecordWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class RecordReader:
+    """
+    A memory-mapped reader for binary record files.
+
+    Models are rebuilt only for the records accessed. ``records()`` and
+    ``columns()`` require the ``numpy`` extra; release any arrays they return
+    before closing the reader.
+    """
+
+    def __init__(self, path: str):
+        """
+        Open and validate a record file.
+
+        Args:
+            path: The path of the record file.
+
+        Raises:
+            ValueError: If the file is not a record file or uses an unsupported schema version.
+        """
+        self.path = path
+        with open(path, 'rb') as fh:
+            self._map = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < _HEADER.size:
+            self._map.close()
+            raise ValueError(f"Invalid record file: {path}")
+        magic, version, record_size, header_flags, count, heap_offset = _HEADER.unpack_from(self._map, 0)
+        if magic != _MAGIC or record_size != _RECORD.size:
+            self._map.close()
+            raise ValueError(f"Invalid record file: {path}")
+        if version != SCHEMA_VERSION:
+            self._map.close()
+            raise ValueError(f"Unsupported record file schema version {version}: {path}")
+        self.schema_version = version
+        self.include_source = bool(header_flags & _HEADER_SOURCE)
+        self._count = count
+        self._heap_offset = heap_offset
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _texts(self, fields: tuple) -> List[str]:
+        """Read the heap fields of a record."""
+        lengths = fields[8:]
+        start = self._heap_offset + fields[7]
+        chunk = self._map[start:start + sum(lengths)]
+        if chunk.isascii():
+            # One decode for the whole record; byte offsets are character offsets
+            text = chunk.decode('ascii')
+        else:
+            text = chunk
+        texts = []
+        start = 0
+        for length in lengths:
+            end = start + length
+            texts.append(text[start:end] if text is not chunk else chunk[start:end].decode('utf-8'))
+            start = end
+        return texts
+
+    def __getitem__(self, i: int) -> FullTrackDataModel:
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("Record index out of range")
+        fields = _RECORD.unpack_from(self._map, _HEADER.size + i * _RECORD.size)
+        flags = fields[0]
+        texts = self._texts(fields)
+        digits = b''.join(fields[2:7]).hex()
+        start = 0
+        for slot, size, _, flag in _BCD_FIELDS:
+            end = start + 2 * size
+            if not flags & flag:
+                texts[slot] = digits[start:end].rstrip('f')
+            start = end
+        track_one = track_two = None
+        if flags & _TRACK_ONE_PRESENT:
+            track_one = TrackOneModel(
+                format_code=texts[11] if flags & _FORMAT_CODE_TEXT else fields[1].decode('latin-1'),
+                pan=texts[1] if flags & _TRACK_ONE_PAN_DIFFERS else texts[0],
+                card_holder_name=texts[6], expiration_date=texts[2], service_code=texts[3],
+                discretionary_data=texts[7], source_string=texts[9])
+        if flags & _TRACK_TWO_PRESENT:
+            track_two = TrackTwoModel(
+                pan=texts[0], expiration_date=texts[4], service_code=texts[5],
+                discretionary_data=texts[8], source_string=texts[10])
+        return FullTrackDataModel(
+            is_track_one_valid=bool(flags & _TRACK_ONE_VALID),
+            track_one=track_one,
+            is_track_two_valid=bool(flags & _TRACK_TWO_VALID),
+            track_two=track_two,
+        )
+
+    def __iter__(self) -> Iterator[FullTrackDataModel]:
+        for i in range(self._count):
+            yield self[i]
+
+    def records(self) -> Any:
+        """
+        Return a zero-copy structured numpy view of the fixed-width records.
+
+        Returns:
+            numpy.ndarray: Fields ``flags``, ``format_code``, ``pan`` and the
+            BCD ``track_one_expiry``, ``track_one_service_code``,
+            ``track_two_expiry`` and ``track_two_service_code`` bytes, plus
+            ``heap_offset`` and ``heap_lengths``.
+        """
+        np = require_numpy()
+        dtype = np.dtype([
+            ('flags', '<u2'), ('format_code', 'S1'), ('pan', 'u1', (10,)),
+            ('track_one_expiry', 'u1', (2,)), ('track_one_service_code', 'u1', (2,)),
+            ('track_two_expiry', 'u1', (2,)), ('track_two_service_code', 'u1', (2,)),
+            ('heap_offset', '<u8'), ('heap_lengths', '<u2', (len(_SLOTS),)),
+        ])
+        return np.frombuffer(self._map, dtype=dtype, count=self._count, offset=_HEADER.size)
+
+    def columns(self) -> Dict[str, Any]:
+        """
+        Decode the PAN, expiry, service code and presence columns of every record.
+
+        BCD fields are decoded with vectorized numpy operations; only fields
+        stored as text fall back to reading the heap. Text values are never
+        truncated: a column is widened to hold its longest value, and non-ASCII
+        text is kept as UTF-8, so ``consistency.check_columns`` flags such
+        values as invalid. The result has the same keys as
+        ``consistency.to_columns`` and can be passed directly to
+        ``consistency.check_columns``.
+
+        Returns:
+            Dict[str, numpy.ndarray]: Byte-string columns ``track_one_pan``,
+            ``track_two_pan``, ``track_one_expiry``, ``track_two_expiry``,
+            ``track_one_service_code`` and ``track_two_service_code``, and
+            boolean ``track_one_present`` and ``track_two_present`` columns.
+        """
+        np = require_numpy()
+        records = self.records()
+        flags = records['flags']
+        present1 = (flags & _TRACK_ONE_PRESENT) != 0
+        present2 = (flags & _TRACK_TWO_PRESENT) != 0
+
+        def decode(name: str, width: int) -> Any:
+            raw = records[name]
+            nibbles = np.empty((len(raw), raw.shape[1] * 2), dtype=np.uint8)
+            nibbles[:, 0::2] = raw >> 4
+            nibbles[:, 1::2] = raw & 0x0F
+            chars = np.where(nibbles == 0x0F, 0, nibbles + ord('0')).astype(np.uint8)
+            return np.ascontiguousarray(chars[:, :width]).view(f'S{width}').ravel()
+
+        pan = decode('pan', 19)
+        columns = {
+            'track_one_expiry': decode('track_one_expiry', 4),
+            'track_one_service_code': decode('track_one_service_code', 3),
+            'track_two_expiry': decode('track_two_expiry', 4),
+            'track_two_service_code': decode('track_two_service_code', 3),
+        }
+        text_flags = {'track_one_expiry': _TRACK_ONE_EXPIRY_TEXT,
+                      'track_one_service_code': _TRACK_ONE_SERVICE_CODE_TEXT,
+                      'track_two_expiry': _TRACK_TWO_EXPIRY_TEXT,
+                      'track_two_service_code': _TRACK_TWO_SERVICE_CODE_TEXT}
+        columns['track_one_pan'] = np.where(present1, pan, b'')
+        columns['track_two_pan'] = np.where(present2, pan, b'')
+        # Heap text of each record, by column, applied once the columns are wide enough for it
+        overrides: Dict[str, Dict[int, bytes]] = {name: {} for name in columns}
+        for i in np.flatnonzero(flags & (_PAN_TEXT | _TRACK_ONE_PAN_DIFFERS | sum(text_flags.values()))):
+            i = int(i)
+            texts = self._texts(_RECORD.unpack_from(self._map, _HEADER.size + i * _RECORD.size))
+            if flags[i] & _PAN_TEXT:
+                pan_text = texts[0].encode('utf-8')
+                overrides['track_one_pan'][i] = pan_text if present1[i] else b''
+                overrides['track_two_pan'][i] = pan_text if present2[i] else b''
+            if flags[i] & _TRACK_ONE_PAN_DIFFERS:
+                overrides['track_one_pan'][i] = texts[1].encode('utf-8')
+            for name, flag in text_flags.items():
+                if flags[i] & flag:
+                    overrides[name][i] = texts[_SLOTS.index(name)].encode('utf-8')
+        for name, values in overrides.items():
+            if not values:
+                continue
+            column = columns[name]
+            width = max(column.dtype.itemsize, max(map(len, values.values())))
+            column = columns[name] = column.astype(f'S{width}')
+            for i, value in values.items():
+                column[i] = value
+        columns['track_one_present'] = present1
+        columns['track_two_present'] = present2
+        return columns
+
+    def close(self) -> None:
+        """Unmap the file. Arrays returned by ``records()`` keep the mapping alive until released."""
+        try:
+            self._map.close()
+        except BufferError:
+            pass
+
+    def __enter__(self) -> 'RecordReader':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def write_records(path: str, results: Iterable[FullTrackDataModel], include_source: bool = True) -> int:
+    """
+    Write parse results to a binary record file.
+
+    Args:
+        path: The path of the record file.
+        results: The parse results.
+        include_source: Whether to store the tracks' source strings.
+
+    Returns:
+        int: The number of records written.
+    """
+    with RecordWriter(path, include_source=include_source) as writer:
+        return writer.write_many(results)
@@ -0,0 +1,255 @@
+"""
+Bulk and streaming parsing of swipe archive files.
+
+Archives are newline-delimited files of raw track data, stored either plain or
+compressed with gzip, bz2 or xz. Compressed archives are decompressed on the
+fly in large chunks into a reusable buffer, so no scratch copy is written to
+disk. Independent files are decompressed and parsed in parallel worker
+processes, and every entry point reports the time spent in each stage.
+"""
+import bz2
+import gzip
+import lzma
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, fields
+from typing import BinaryIO, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .full_track_parser import FullTrackParser
+from .models import FullTrackDataModel
+from .exceptions import CreditCardStripeError
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+_MAGIC_NUMBERS = (
+    (b'\x1f\x8b', gzip.GzipFile),
+    (b'BZh', bz2.BZ2File),
+    (b'\xfd7zXZ\x00', lzma.LZMAFile),
+)
+
+
+@dataclass
+class IngestStats:
+    """
+    Per-stage counters and timings for reading and parsing archives.
+
+    Attributes:
+        files (int): Number of archive files read.
+        compressed_bytes (int): Size of the archive files on disk.
+        decompressed_bytes (int): Number of bytes after decompression.
+        records (int): Number of records framed.
+        invalid_records (int): Number of records the parser rejected.
+        decompress_seconds (float): Time spent reading and decompressing.
+        frame_seconds (float): Time spent splitting chunks into records.
+        parse_seconds (float): Time spent in the parser.
+    """
+    files: int = 0
+    compressed_bytes: int = 0
+    decompressed_bytes: int = 0
+    records: int = 0
+    invalid_records: int = 0
+    decompress_seconds: float = 0.0
+    frame_seconds: float = 0.0
+    parse_seconds: float = 0.0
+
+    def merge(self, other: 'IngestStats') -> None:
+        """Add the counters of ``other`` to this object."""
+        for f in fields(self):
+            setattr(self, f.name, getattr(self, f.name) + getattr(other, f.name))
+
+    def throughput(self) -> Dict[str, float]:
+        """
+        Return the throughput of each stage.
+
+        Timings are summed over all workers, so these are per-core rates.
+
+        Returns:
+            Dict[str, float]: Decompression and framing rates in decompressed
+            MB/s and the parse rate in records/s (0.0 for stages that took no time).
+        """
+        def rate(amount: float, seconds: float) -> float:
+            return amount / seconds if seconds > 0 else 0.0
+
+        return {
+            'decompress_mb_per_s': rate(self.decompressed_bytes / 1e6, self.decompress_seconds),
+            'frame_mb_per_s': rate(self.decompressed_bytes / 1e6, self.frame_seconds),
+            'parse_records_per_s': rate(self.records, self.parse_seconds),
+        }
+
+
+@dataclass
+class FileResult:
+    """
+    The parsed contents of one archive file.
+
+    Attributes:
+        path (str): The archive file.
+        results (List[FullTrackDataModel]): The parsed swipes, in file order.
+        stats (IngestStats): Counters and timings for this file.
+    """
+    path: str
+    results: List[FullTrackDataModel] = field(default_factory=list)
+    stats: IngestStats = field(default_factory=IngestStats)
+
+
+def open_archive(path: str) -> BinaryIO:
+    """
+    Open an archive file for reading, decompressing it if needed.
+
+    The compression format is detected from the file's magic number rather than
+    its extension.
+
+    Args:
+        path: The archive file to open.
+
+    Returns:
+        BinaryIO: A binary file object yielding the decompressed bytes.
+    """
+    with open(path, 'rb') as fh:
+        head = fh.read(6)
+    for magic, opener in _MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return opener(path, 'rb')
+    return open(path, 'rb')
+
+
+def _iter_chunks(path: str, chunk_size: int,
+                 stats: IngestStats) -> Iterator[List[Tuple[int, bytes]]]:
+    """Yield the complete ``(offset, line)`` records of each decompressed chunk."""
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    tail = b''
+    offset = 0  # Decompressed offset of the first byte of ``tail``
+    stats.files += 1
+    stats.compressed_bytes += os.path.getsize(path)
+    with open_archive(path) as fh:
+        while True:
+            start = time.perf_counter()
+            size = fh.readinto(view)
+            split = time.perf_counter()
+            stats.decompress_seconds += split - start
+            if not size:
+                break
+            stats.decompressed_bytes += size
+            # Copy each line out of the buffer once; only a line that spans
+            # chunks is assembled from the previous chunk's tail
+            records = []
+            find = buffer.find
+            pos = 0
+            end = find(b'\n', 0, size)
+            while end >= 0:
+                line = tail + view[pos:end] if tail else view[pos:end].tobytes()
+                tail = b''
+                record = line.rstrip(b'\r')
+                if record:
+                    records.append((offset, record))
+                offset += len(line) + 1
+                pos = end + 1
+                end = find(b'\n', pos, size)
+            if pos < size:
+                tail += view[pos:size]
+            stats.frame_seconds += time.perf_counter() - split
+            stats.records += len(records)
+            yield records
+    tail = tail.rstrip(b'\r')
+    if tail:
+        stats.records += 1
+        yield [(offset, tail)]
+
+
+def iter_records(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 stats: Optional[IngestStats] = None) -> Iterator[Tuple[int, str]]:
+    """
+    Yield the raw records of a plain or compressed archive.
+
+    Args:
+        path: The archive file to read.
+        chunk_size: The size of the reusable decompression buffer in bytes.
+        stats: Counters to update while reading.
+
+    Yields:
+        Tuple[int, str]: The decompressed byte offset and text of each non-empty line.
+    """
+    stats = stats if stats is not None else IngestStats()
+    for records in _iter_chunks(path, chunk_size, stats):
+        for offset, line in records:
+            yield offset, line.decode('latin-1')
+
+
+def iter_parse(path: str, parser: Optional[FullTrackParser] = None,
+               chunk_size: int = DEFAULT_CHUNK_SIZE,
+               stats: Optional[IngestStats] = None) -> Iterator[FullTrackDataModel]:
+    """
+    Parse a plain or compressed archive, yielding swipes as they are decoded.
+
+    Records the parser rejects are counted in ``stats.invalid_records`` and skipped.
+
+    Args:
+        path: The archive file to read.
+        parser: The parser to use (a default FullTrackParser if omitted).
+        chunk_size: The size of the reusable decompression buffer in bytes.
+        stats: Counters to update while reading.
+
+    Yields:
+        FullTrackDataModel: Each parsed swipe, in file order.
+    """
+    parser = parser if parser is not None else FullTrackParser()
+    stats = stats if stats is not None else IngestStats()
+    for records in _iter_chunks(path, chunk_size, stats):
+        start = time.perf_counter()
+        results = []
+        for _, line in records:
+            try:
+                results.append(parser.parse(line.decode('latin-1')))
+            except CreditCardStripeError:
+                stats.invalid_records += 1
+        stats.parse_seconds += time.perf_counter() - start
+        yield from results
+
+
+def parse_file(path: str, parser: Optional[FullTrackParser] = None,
+               chunk_size: int = DEFAULT_CHUNK_SIZE) -> FileResult:
+    """
+    Parse a whole plain or compressed archive.
+
+    Args:
+        path: The archive file to read.
+        parser: The parser to use (a default FullTrackParser if omitted).
+        chunk_size: The size of the reusable decompression buffer in bytes.
+
+    Returns:
+        FileResult: The parsed swipes and the per-stage statistics.
+    """
+    result = FileResult(path=path)
+    result.results = list(iter_parse(path, parser, chunk_size, result.stats))
+    return result
+
+
+def parse_files(paths: Sequence[str], max_workers: Optional[int] = None,
+                parser: Optional[FullTrackParser] = None,
+                chunk_size: int = DEFAULT_CHUNK_SIZE) -> Tuple[List[FileResult], IngestStats]:
+    """
+    Parse several archives, decompressing independent files in parallel.
+
+    Args:
+        paths: The archive files to read.
+        max_workers: The number of worker processes (one per CPU if omitted).
+            With ``max_workers=1`` the files are parsed in the calling process.
+        parser: The parser to use (a default FullTrackParser if omitted).
+        chunk_size: The size of the reusable decompression buffer in bytes.
+
+    Returns:
+        Tuple[List[FileResult], IngestStats]: One result per input file, in input
+        order, and the combined statistics of all files.
+    """
+    if max_workers == 1 or len(paths) <= 1:
+        file_results = [parse_file(path, parser, chunk_size) for path in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            file_results = list(executor.map(parse_file, paths,
+                                             [parser] * len(paths), [chunk_size] * len(paths)))
+    total = IngestStats()
+    for file_result in file_results:
+        total.merge(file_result.stats)
+    return file_results, total
@@ -0,0 +1,115 @@
+"""
+Helper functions for Primary Account Numbers.
+
+Provides the Luhn check, card brand detection from the BIN (the leading
+digits of the PAN) and PAN masking for output that must not contain full
+card numbers.
+"""
+from itertools import islice
+
+# Value of each digit after the Luhn doubling step
+_LUHN_DOUBLED = (0, 2, 4, 6, 8, 1, 3, 5, 7, 9)
+# Lookups of a digit character's value as is and after the doubling step
+_digit_value = {str(digit): digit for digit in range(10)}.__getitem__
+_doubled_value = {str(digit): _LUHN_DOUBLED[digit] for digit in range(10)}.__getitem__
+
+# (brand, BIN prefix ranges as (low, high, prefix length)) in matching order
+_BRAND_RANGES = (
+    ('amex', ((34, 34, 2), (37, 37, 2))),
+    ('diners', ((300, 305, 3), (36, 36, 2), (38, 39, 2))),
+    ('discover', ((6011, 6011, 4), (644, 649, 3), (65, 65, 2))),
+    ('jcb', ((3528, 3589, 4),)),
+    ('unionpay', ((62, 62, 2),)),
+    ('maestro', ((5018, 5018, 4), (5020, 5020, 4), (5038, 5038, 4), (6304, 6304, 4),
+                 (6759, 6759, 4), (6761, 6763, 4))),
+    ('mastercard', ((51, 55, 2), (2221, 2720, 4))),
+    ('visa', ((4, 4, 1),)),
+)
+
+
+def luhn_valid(pan: str) -> bool:
+    """
+    Check a PAN with the Luhn (mod 10) algorithm.
+
+    Args:
+        pan: The Primary Account Number.
+
+    Returns:
+        bool: True if the PAN consists of ASCII digits and passes the Luhn check.
+    """
+    # isdigit alone also accepts characters such as superscripts
+    if not (pan.isascii() and pan.isdigit()):
+        return False
+    total = 0
+    double = False
+    for ch in reversed(pan):
+        digit = ord(ch) - 48
+        total += _LUHN_DOUBLED[digit] if double else digit
+        double = not double
+    return total % 10 == 0
+
+
+def luhn_valid_span(text: str, start: int, end: int) -> bool:
+    """
+    Check ``text[start:end]`` with the Luhn algorithm without slicing it.
+
+    Args:
+        text: The string containing the PAN, e.g. a raw track.
+        start: The index of the first PAN digit.
+        end: The index just past the last PAN digit.
+
+    Returns:
+        bool: True if the span is non-empty, consists of ASCII digits and
+        passes the Luhn check.
+    """
+    if start >= end:
+        return False
+    # The last digit is added as is, the one before it doubled, and so on;
+    # islice walks every other character without creating a substring
+    parity = (end - 1 - start) % 2
+    try:
+        total = (sum(map(_digit_value, islice(text, start + parity, end, 2)))
+                 + sum(map(_doubled_value, islice(text, start + 1 - parity, end, 2))))
+    except KeyError:
+        return False
+    return total % 10 == 0
+
+
+def card_brand(pan: str) -> str:
+    """
+    Identify the card brand from the leading digits of a PAN.
+
+    Args:
+        pan: The Primary Account Number, or at least its first six digits.
+
+    Returns:
+        str: The brand name in lowercase, or ``'unknown'``.
+    """
+    for brand, ranges in _BRAND_RANGES:
+        for low, high, length in ranges:
+            prefix = pan[:length]
+            if len(prefix) == length and prefix.isascii() and prefix.isdigit() and low <= int(prefix) <= high:
+                return brand
+    return 'unknown'
+
+
+def mask_pan(pan: str, visible_prefix: int = 6, visible_suffix: int = 4, mask_char: str = '*') -> str:
+    """
+    Mask the middle digits of a PAN.
+
+    By default the first six and last four digits stay visible, as allowed by
+    PCI DSS for display.
+
+    Args:
+        pan: The Primary Account Number.
+        visible_prefix: The number of leading characters to keep.
+        visible_suffix: The number of trailing characters to keep.
+        mask_char: The replacement character.
+
+    Returns:
+        str: The masked PAN. PANs too short to mask are masked entirely.
+    """
+    if len(pan) <= visible_prefix + visible_suffix:
+        return mask_char * len(pan)
+    hidden = len(pan) - visible_prefix - visible_suffix
+    return pan[:visible_prefix] + mask_char * hidden + pan[len(pan) - visible_suffix:]
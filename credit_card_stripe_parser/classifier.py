@@ -0,0 +1,231 @@
+"""
+Format classification and dispatch for mixed-track input streams.
+
+FullTrackParser.parse validates both tracks on every line, and each
+validation scans the whole line. Aggregated feeds mix Track 1 only, Track 2
+only and combined Track 1+2 lines with formats the parser does not support,
+such as Track 3 and JIS II. FormatClassifier looks at the first character of
+each line (and, for ``;`` lines, its length) to pick a specialized handler:
+
+* Track 1 only and combined lines are split at the Track 1 end sentinel, and
+  each track is validated and parsed on its own part of the line;
+* Track 2 only lines are validated and parsed as Track 2 alone, so they never
+  pay for a search for Track 1 sentinels;
+* Track 3 (``;`` lines longer than a Track 2), JIS II (``0x7F`` start), empty
+  and unrecognized lines are skipped with a reason code.
+
+Results equal those of ``FullTrackParser.parse`` for well-formed lines. Lines
+with unexpected data after the Track 1 end sentinel fall back to ``parse``.
+"""
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence
+
+from .exceptions import InvalidTrackOneError, InvalidTrackTwoError, UnsupportedFormatError
+from .flight_recorder import TRACK_ONE_ERROR, TRACK_TWO_ERROR
+from .full_track_parser import FullTrackParser
+from .models import FullTrackDataModel
+
+TRACK_ONE = 'track_one'
+TRACK_TWO = 'track_two'
+TRACK_ONE_AND_TWO = 'track_one_and_two'
+TRACK_THREE = 'track_three'
+JIS_II = 'jis_ii'
+EMPTY = 'empty'
+UNKNOWN = 'unknown_format'
+
+SUPPORTED_FORMATS = (TRACK_ONE, TRACK_TWO, TRACK_ONE_AND_TWO)
+
+_JIS_II_START = '\x7f'
+
+
+@dataclass
+class ClassifiedBatch:
+    """
+    The outcome of a classified batch.
+
+    Attributes:
+        results (List[Optional[FullTrackDataModel]]): One result per line, in
+            input order; None for skipped lines and lines the parser rejected.
+        formats (List[str]): The format of each line.
+        groups (Dict[str, List[int]]): The line indices of each format.
+        errors (Dict[int, str]): The reason code of each skipped or rejected
+            line: the format for unsupported lines, else the parser's error class name.
+    """
+    results: List[Optional[FullTrackDataModel]]
+    formats: List[str]
+    groups: Dict[str, List[int]] = field(default_factory=dict)
+    errors: Dict[int, str] = field(default_factory=dict)
+
+
+class FormatClassifier:
+    """Classifies lines by their leading character and dispatches them to per-format handlers."""
+
+    def __init__(self, parser: Optional[FullTrackParser] = None):
+        """
+        Build the dispatch table.
+
+        Args:
+            parser: The parser whose sentinels, length limits and track
+                routines are used (a default FullTrackParser if omitted).
+        """
+        self.parser = parser if parser is not None else FullTrackParser()
+        self._ss1 = self.parser._SS1
+        self._es1 = self.parser._ES1
+        self._ss2 = self.parser._SS2
+        self._es2 = self.parser._ES2
+        # A Track 2 line: start sentinel, data, end sentinel and an optional LRC character
+        self._max_track_two_line = self.parser._MAX_TRACK2_LEN + 3
+        self._first_char: Dict[str, str] = {self._ss1: TRACK_ONE, self._ss2: TRACK_TWO, _JIS_II_START: JIS_II}
+        self._handlers: Dict[str, Callable[[str], FullTrackDataModel]] = {
+            TRACK_ONE: self._parse_track_one_line,
+            TRACK_ONE_AND_TWO: self._parse_track_one_line,
+            TRACK_TWO: self._parse_track_two_line,
+        }
+        self._dispatch = {self._ss1: self._parse_track_one_line, self._ss2: self._parse_track_two_line}
+
+    def classify(self, line: str) -> str:
+        """
+        Return the format of a line.
+
+        Args:
+            line: The raw swipe line.
+
+        Returns:
+            str: One of the format constants of this module.
+        """
+        if not line:
+            return EMPTY
+        kind = self._first_char.get(line[0], UNKNOWN)
+        if kind == TRACK_TWO:
+            return TRACK_THREE if len(line) > self._max_track_two_line else TRACK_TWO
+        if kind == TRACK_ONE:
+            return TRACK_ONE_AND_TWO if self._track_two_start(line) > 0 else TRACK_ONE
+        return kind
+
+    def parse(self, line: str) -> FullTrackDataModel:
+        """
+        Classify and parse a line.
+
+        Args:
+            line: The raw swipe line.
+
+        Returns:
+            FullTrackDataModel: The parsed swipe.
+
+        Raises:
+            UnsupportedFormatError: If the line is not in a supported format;
+                its ``reason`` is the format code.
+            InvalidTrackOneError: If there's an error parsing Track 1 data.
+            InvalidTrackTwoError: If there's an error parsing Track 2 data.
+        """
+        handler = self._dispatch.get(line[:1])
+        if handler is None:
+            raise UnsupportedFormatError(self.classify(line))
+        return handler(line)
+
+    def parse_batch(self, lines: Sequence[str]) -> ClassifiedBatch:
+        """
+        Classify a batch, then parse each format's group of lines in bulk.
+
+        Args:
+            lines: The raw swipe lines.
+
+        Returns:
+            ClassifiedBatch: The results, formats, groups and reason codes.
+        """
+        classify = self.classify
+        formats = [classify(line) for line in lines]
+        batch = ClassifiedBatch(results=[None] * len(lines), formats=formats)
+        for index, kind in enumerate(formats):
+            batch.groups.setdefault(kind, []).append(index)
+        results = batch.results
+        for kind, indices in batch.groups.items():
+            handler = self._handlers.get(kind)
+            if handler is None:
+                for index in indices:
+                    batch.errors[index] = kind
+                continue
+            for index in indices:
+                try:
+                    results[index] = handler(lines[index])
+                except (InvalidTrackOneError, InvalidTrackTwoError) as e:
+                    batch.errors[index] = type(e).__name__
+        return batch
+
+    def _track_two_start(self, line: str) -> int:
+        """
+        Return where Track 2 starts in a line that begins with Track 1.
+
+        Returns 0 if nothing follows Track 1 (and its optional LRC character),
+        and -1 if something other than Track 2 does.
+        """
+        end = line.find(self._es1)
+        if end < 0:
+            return 0
+        rest = len(line) - end - 1
+        if rest == 0:
+            return 0
+        if line[end + 1] == self._ss2:
+            return end + 1
+        if rest == 1:
+            return 0
+        return end + 2 if line[end + 2] == self._ss2 else -1
+
+    def _parse_track_one_line(self, line: str) -> FullTrackDataModel:
+        """
+        Parse a Track 1 or Track 1+2 line, each track on its own slice of the line.
+
+        A track that ends exactly at its first end sentinel is known to be
+        valid, so the validation pass is only run for tracks followed by an
+        LRC character (which may itself equal the end sentinel).
+        """
+        parser = self.parser
+        # Inlined _track_two_start: this is the hottest path
+        end = line.find(self._es1)
+        rest = len(line) - end - 1
+        if end < 0 or rest == 0:
+            boundary = 0
+        elif line[end + 1] == self._ss2:
+            boundary = end + 1
+        elif rest == 1:
+            boundary = 0
+        elif line[end + 2] == self._ss2:
+            boundary = end + 2
+        else:
+            return parser.parse(line)
+        track_one = line[:boundary] if boundary else line
+        try:
+            # Only a track ending at its first end sentinel is known to have no
+            # LRC; an LRC character equal to the end sentinel must be checked
+            is_valid_one = len(track_one) == end + 1 or parser._validate_track_one(track_one)
+            model_one = parser.parse_track_one(track_one) if is_valid_one else None
+        except Exception as e:
+            if parser.recorder is not None:
+                parser.recorder.record(TRACK_ONE_ERROR, line, 0, e)
+            raise InvalidTrackOneError("Failed to parse Track 1 data") from e
+        if not boundary:
+            return FullTrackDataModel(is_track_one_valid=is_valid_one, track_one=model_one,
+                                      is_track_two_valid=False, track_two=None)
+        is_valid_two, model_two = self._parse_track_two(line[boundary:])
+        return FullTrackDataModel(is_track_one_valid=is_valid_one, track_one=model_one,
+                                  is_track_two_valid=is_valid_two, track_two=model_two)
+
+    def _parse_track_two_line(self, line: str) -> FullTrackDataModel:
+        """Parse a Track 2 only line without looking for Track 1."""
+        if len(line) > self._max_track_two_line:
+            raise UnsupportedFormatError(TRACK_THREE)
+        is_valid_two, model_two = self._parse_track_two(line)
+        return FullTrackDataModel(is_track_one_valid=False, track_one=None,
+                                  is_track_two_valid=is_valid_two, track_two=model_two)
+
+    def _parse_track_two(self, track_two: str):
+        parser = self.parser
+        try:
+            # _validate_track_two locates the end sentinel with rfind, so a
+            # trailing end sentinel always validates
+            is_valid = track_two[-1:] == self._es2 or parser._validate_track_two(track_two)
+            return is_valid, parser.parse_track_two(track_two) if is_valid else None
+        except Exception as e:
+            if parser.recorder is not None:
+                parser.recorder.record(TRACK_TWO_ERROR, track_two, 0, e)
+            raise InvalidTrackTwoError("Failed to parse Track 2 data") from e
@@ -0,0 +1,197 @@
+"""
+Cross-track consistency checks for batches of parsed swipes.
+
+Track 1 and Track 2 of a genuine card carry the same PAN, expiration date and
+service code. A mismatch between the two tracks is a strong sign that the
+stripe was re-encoded, so this module compares them for whole batches at once
+using vectorized numpy comparisons over columnar arrays.
+
+numpy is an optional dependency; install it with
+``pip install credit-card-stripe-parser[numpy]``.
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional
+
+from ._compat import require_numpy
+from .models import FullTrackDataModel
+
+# Mismatch bit flags
+PAN_MISMATCH = 0x01
+EXPIRY_MISMATCH = 0x02
+SERVICE_CODE_MISMATCH = 0x04
+TRACK_MISSING = 0x08
+INVALID_FIELD = 0x10
+
+_FLAG_NAMES = {
+    'pan_mismatch': PAN_MISMATCH,
+    'expiry_mismatch': EXPIRY_MISMATCH,
+    'service_code_mismatch': SERVICE_CODE_MISMATCH,
+    'track_missing': TRACK_MISSING,
+    'invalid_field': INVALID_FIELD,
+}
+
+# Widths of the PAN, expiry and service code columns
+_PAN_WIDTH = 19
+_EXPIRY_WIDTH = 4
+_SERVICE_CODE_WIDTH = 3
+
+
+@dataclass
+class ConsistencyReport:
+    """
+    The result of a batch cross-track consistency check.
+
+    Attributes:
+        masks (numpy.ndarray): A uint8 mismatch bitmask for each record.
+        counts (Dict[str, int]): The number of records with each mismatch flag set,
+            plus ``consistent`` for records with no flag set.
+    """
+    masks: Any
+    counts: Dict[str, int]
+
+    def __len__(self) -> int:
+        return len(self.masks)
+
+    def mismatched(self) -> Any:
+        """
+        Return the indices of records with at least one mismatch flag set.
+
+        Returns:
+            numpy.ndarray: The record indices, in ascending order.
+        """
+        np = require_numpy()
+        return np.flatnonzero(self.masks)
+
+
+def to_columns(results: Iterable[FullTrackDataModel]) -> Dict[str, Any]:
+    """
+    Convert parsed results into the columnar arrays used by ``check_columns``.
+
+    This is the only step that touches individual model objects; callers that
+    already hold columnar data should call ``check_columns`` directly.
+
+    Args:
+        results: The parsed swipes.
+
+    Returns:
+        Dict[str, numpy.ndarray]: Keyword arguments for ``check_columns``.
+        String fields are UTF-8 encoded and never truncated.
+    """
+    np = require_numpy()
+    pairs = [(r.track_one, r.track_two) for r in results]
+    ones = [p[0] for p in pairs]
+    twos = [p[1] for p in pairs]
+
+    def column(tracks: list, name: str) -> Any:
+        return np.array([getattr(t, name).encode('utf-8') if t else b'' for t in tracks], dtype=bytes)
+
+    return {
+        'track_one_pan': column(ones, 'pan'),
+        'track_two_pan': column(twos, 'pan'),
+        'track_one_expiry': column(ones, 'expiration_date'),
+        'track_two_expiry': column(twos, 'expiration_date'),
+        'track_one_service_code': column(ones, 'service_code'),
+        'track_two_service_code': column(twos, 'service_code'),
+        'track_one_present': np.array([t is not None for t in ones], dtype=bool),
+        'track_two_present': np.array([t is not None for t in twos], dtype=bool),
+    }
+
+
+def check_columns(
+    track_one_pan: Any,
+    track_two_pan: Any,
+    track_one_expiry: Any,
+    track_two_expiry: Any,
+    track_one_service_code: Any,
+    track_two_service_code: Any,
+    track_one_present: Optional[Any] = None,
+    track_two_present: Optional[Any] = None,
+) -> ConsistencyReport:
+    """
+    Compare Track 1 against Track 2 fields for a batch of records.
+
+    All arguments are equal-length array-likes; string columns are compared as
+    fixed-width byte strings (19 bytes for PANs, 4 for expiration dates and
+    3 for service codes). Records missing either track are flagged with
+    ``TRACK_MISSING`` only, since their fields cannot be compared. Records
+    with a value that is longer than its column or not ASCII are likewise
+    flagged with ``INVALID_FIELD`` only, rather than compared truncated.
+    When the presence columns are omitted, a track is considered missing if
+    its PAN is empty.
+
+    Args:
+        track_one_pan: Track 1 PANs.
+        track_two_pan: Track 2 PANs.
+        track_one_expiry: Track 1 expiration dates (YYMM).
+        track_two_expiry: Track 2 expiration dates (YYMM).
+        track_one_service_code: Track 1 service codes.
+        track_two_service_code: Track 2 service codes.
+        track_one_present: Booleans marking records with a parsed Track 1.
+        track_two_present: Booleans marking records with a parsed Track 2.
+
+    Returns:
+        ConsistencyReport: Per-record bitmasks and aggregate counts.
+
+    Raises:
+        ValueError: If the columns have different lengths.
+    """
+    np = require_numpy()
+    converted = [
+        _fixed_width(np, track_one_pan, _PAN_WIDTH), _fixed_width(np, track_two_pan, _PAN_WIDTH),
+        _fixed_width(np, track_one_expiry, _EXPIRY_WIDTH), _fixed_width(np, track_two_expiry, _EXPIRY_WIDTH),
+        _fixed_width(np, track_one_service_code, _SERVICE_CODE_WIDTH),
+        _fixed_width(np, track_two_service_code, _SERVICE_CODE_WIDTH),
+    ]
+    columns = [column for column, _ in converted]
+    fits = [fit for _, fit in converted]
+    # A PAN that does not fit its column is not empty
+    present1 = ((columns[0] != b'') | ~fits[0] if track_one_present is None
+                else np.asarray(track_one_present, dtype=bool))
+    present2 = ((columns[1] != b'') | ~fits[1] if track_two_present is None
+                else np.asarray(track_two_present, dtype=bool))
+    if len({len(c) for c in columns + [present1, present2]}) > 1:
+        raise ValueError("All columns must have the same length")
+
+    masks = np.zeros(len(columns[0]), dtype=np.uint8)
+    masks |= (columns[0] != columns[1]).astype(np.uint8) * PAN_MISMATCH
+    masks |= (columns[2] != columns[3]).astype(np.uint8) * EXPIRY_MISMATCH
+    masks |= (columns[4] != columns[5]).astype(np.uint8) * SERVICE_CODE_MISMATCH
+    masks[~np.logical_and.reduce(fits)] = INVALID_FIELD
+    missing = ~(present1 & present2)
+    masks[missing] = TRACK_MISSING
+
+    counts = {name: int(np.count_nonzero(masks & flag)) for name, flag in _FLAG_NAMES.items()}
+    counts['consistent'] = int(np.count_nonzero(masks == 0))
+    return ConsistencyReport(masks=masks, counts=counts)
+
+
+def _fixed_width(np: Any, values: Any, width: int) -> Any:
+    """
+    Return a string column as ``S{width}`` byte strings and a mask of the values that fit.
+
+    A value fits if it is ASCII and at most ``width`` characters long. Values
+    that do not fit are blanked rather than truncated, as in
+    ``decode_tables``, so they can never compare equal by accident.
+    """
+    values = np.asarray(values)
+    if values.dtype.kind not in 'SU':
+        values = values.astype(str)
+    fits = np.char.str_len(values) <= width
+    if len(values):
+        unit = np.uint8 if values.dtype.kind == 'S' else np.uint32
+        codes = np.ascontiguousarray(values).view(unit).reshape(len(values), -1)
+        fits &= (codes < 128).all(axis=1)
+    return np.where(fits, values, values.dtype.type()).astype(f'S{width}'), fits
+
+
+def check_results(results: Iterable[FullTrackDataModel]) -> ConsistencyReport:
+    """
+    Compare Track 1 against Track 2 fields for a batch of parsed results.
+
+    Args:
+        results: The parsed swipes, for example the output of ``FullTrackParser.parse``.
+
+    Returns:
+        ConsistencyReport: Per-record bitmasks and aggregate counts.
+    """
+    return check_columns(**to_columns(results))
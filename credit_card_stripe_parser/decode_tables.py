@@ -0,0 +1,282 @@
+"""
+Precomputed decode tables for service codes and expiration dates.
+
+Service codes (ISO/IEC 7813) are three digits:
+
+* digit 1, interchange and technology: international or national
+  interchange, private (closed loop) use or test cards, and whether the
+  card carries a chip that should be used where feasible;
+* digit 2, authorization processing: normal, or online authorization by the
+  issuer (unless a bilateral agreement applies);
+* digit 3, allowed services and PIN requirements.
+
+All 1000 codes are decoded once at import time into ServiceCode objects, and
+every YYMM expiration date into an ExpiryDate holding the last day of the
+month and a month index, so checking whether a card has expired is a
+dictionary lookup and an integer comparison. The ``*_columns`` functions
+evaluate whole columns with the ``numpy`` extra.
+"""
+import calendar
+import datetime
+import functools
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional
+
+from ._compat import require_numpy
+
+_INTERCHANGE = {'1': 'international', '2': 'international', '5': 'national', '6': 'national',
+                '7': 'private', '9': 'test'}
+_CHIP = {'2', '6'}
+_AUTHORIZATION = {'0': 'normal', '2': 'online', '4': 'online_unless_bilateral'}
+# digit 3: (allowed services, PIN requirement)
+_SERVICES = {
+    '0': ('any', 'required'),
+    '1': ('any', 'none'),
+    '2': ('goods_and_services', 'none'),
+    '3': ('atm', 'required'),
+    '4': ('cash', 'none'),
+    '5': ('goods_and_services', 'required'),
+    '6': ('any', 'if_feasible'),
+    '7': ('goods_and_services', 'if_feasible'),
+}
+RESERVED = 'reserved'
+
+# Two-digit expiry years are read as 2000-2099
+_CENTURY = 2000
+
+
+@dataclass(frozen=True)
+class ServiceCode:
+    """
+    A decoded service code.
+
+    Attributes:
+        code (str): The three-digit service code.
+        interchange (str): ``international``, ``national``, ``private``, ``test`` or ``reserved``.
+        chip (bool): Whether the card has a chip that should be used where feasible.
+        authorization (str): ``normal``, ``online``, ``online_unless_bilateral`` or ``reserved``.
+        services (str): ``any``, ``goods_and_services``, ``atm``, ``cash`` or ``reserved``.
+        pin (str): ``required``, ``if_feasible``, ``none`` or ``reserved``.
+        assigned (bool): Whether every digit has an assigned meaning.
+    """
+    code: str
+    interchange: str
+    chip: bool
+    authorization: str
+    services: str
+    pin: str
+    assigned: bool
+
+    @property
+    def cash_allowed(self) -> bool:
+        """Whether cash withdrawals are allowed."""
+        return self.services in ('any', 'atm', 'cash')
+
+    @property
+    def pin_required(self) -> bool:
+        """Whether a PIN is always required."""
+        return self.pin == 'required'
+
+
+@dataclass(frozen=True)
+class ExpiryDate:
+    """
+    A decoded YYMM expiration date.
+
+    Attributes:
+        yymm (str): The expiration date as stored on the card.
+        end_date (datetime.date): The last day the card is valid (the end of the month).
+        month_index (int): Months since January 2000, for integer comparisons.
+    """
+    yymm: str
+    end_date: datetime.date
+    month_index: int
+
+    def is_expired(self, reference: datetime.date) -> bool:
+        """Whether the card has expired on the reference date."""
+        return self.month_index < month_index(reference)
+
+
+def month_index(day: datetime.date) -> int:
+    """
+    Return the month index (months since January 2000) of a date.
+
+    Args:
+        day: The date.
+
+    Returns:
+        int: The index compared against ``ExpiryDate.month_index``.
+    """
+    return (day.year - _CENTURY) * 12 + day.month - 1
+
+
+def _build_service_codes() -> Dict[str, ServiceCode]:
+    table = {}
+    for value in range(1000):
+        code = f"{value:03d}"
+        first, second, third = code
+        services, pin = _SERVICES.get(third, (RESERVED, RESERVED))
+        table[code] = ServiceCode(
+            code=code,
+            interchange=_INTERCHANGE.get(first, RESERVED),
+            chip=first in _CHIP,
+            authorization=_AUTHORIZATION.get(second, RESERVED),
+            services=services,
+            pin=pin,
+            assigned=first in _INTERCHANGE and second in _AUTHORIZATION and third in _SERVICES,
+        )
+    return table
+
+
+def _build_expiry_dates() -> Dict[str, ExpiryDate]:
+    table = {}
+    for year in range(100):
+        for month in range(1, 13):
+            yymm = f"{year:02d}{month:02d}"
+            end_day = calendar.monthrange(_CENTURY + year, month)[1]
+            table[yymm] = ExpiryDate(yymm=yymm, end_date=datetime.date(_CENTURY + year, month, end_day),
+                                     month_index=year * 12 + month - 1)
+    return table
+
+
+SERVICE_CODES: Dict[str, ServiceCode] = _build_service_codes()
+EXPIRY_DATES: Dict[str, ExpiryDate] = _build_expiry_dates()
+
+
+def decode_service_code(code: str) -> Optional[ServiceCode]:
+    """
+    Decode a service code.
+
+    Args:
+        code: The three-digit service code.
+
+    Returns:
+        Optional[ServiceCode]: The decoded service code, or None if it is not three digits.
+    """
+    return SERVICE_CODES.get(code)
+
+
+def decode_expiry(yymm: str) -> Optional[ExpiryDate]:
+    """
+    Decode a YYMM expiration date.
+
+    Args:
+        yymm: The expiration date as stored on the card.
+
+    Returns:
+        Optional[ExpiryDate]: The decoded date, or None if it is not a valid YYMM value.
+    """
+    return EXPIRY_DATES.get(yymm)
+
+
+def decode_service_codes(codes: Iterable[str]) -> List[Optional[ServiceCode]]:
+    """Decode many service codes; invalid codes decode to None."""
+    get = SERVICE_CODES.get
+    return [get(code) for code in codes]
+
+
+def expired_flags(expiries: Iterable[str], reference: datetime.date) -> List[Optional[bool]]:
+    """
+    Check many expiration dates against a reference date.
+
+    Args:
+        expiries: YYMM expiration dates.
+        reference: The date to check against.
+
+    Returns:
+        List[Optional[bool]]: Whether each card has expired, or None for invalid dates.
+    """
+    get = EXPIRY_DATES.get
+    ref = month_index(reference)
+    flags = []
+    for yymm in expiries:
+        expiry = get(yymm)
+        flags.append(None if expiry is None else expiry.month_index < ref)
+    return flags
+
+
+def _digit_matrix(np: Any, values: Any, width: int) -> Any:
+    """
+    Return the digits of a string column as an (n, width) array and a validity mask.
+
+    As in the scalar decoders, a value is valid only if it is exactly ``width``
+    ASCII digits; longer values are invalid rather than truncated.
+    """
+    values = np.asarray(values)
+    if values.dtype.kind not in 'SU':
+        values = values.astype(str)
+    fits = np.char.str_len(values) == width
+    unit = np.uint8 if values.dtype.kind == 'S' else np.uint32
+    chars = np.ascontiguousarray(values.astype(f'{values.dtype.kind}{width}'))
+    digits = chars.view(unit).reshape(len(values), width).astype(np.int32) - ord('0')
+    valid = fits & ((digits >= 0) & (digits <= 9)).all(axis=1)
+    return np.where(valid[:, None], digits, 0), valid
+
+
+@functools.lru_cache(maxsize=None)
+def _service_code_arrays() -> Dict[str, Any]:
+    """Return the service code table as numpy columns indexed by the code's value."""
+    np = require_numpy()
+    entries = [SERVICE_CODES[f"{value:03d}"] for value in range(1000)]
+    return {name: np.array([getattr(e, name) for e in entries])
+            for name in ('assigned', 'chip', 'cash_allowed', 'pin_required',
+                         'interchange', 'authorization', 'services', 'pin')}
+
+
+@functools.lru_cache(maxsize=None)
+def _end_date_array() -> Any:
+    """Return the end dates of all expiry months as a numpy array indexed by month index."""
+    np = require_numpy()
+    return np.array([EXPIRY_DATES[f"{i // 12:02d}{i % 12 + 1:02d}"].end_date for i in range(1200)],
+                    dtype='datetime64[D]')
+
+
+def service_code_columns(codes: Any) -> Dict[str, Any]:
+    """
+    Decode a column of service codes with vectorized table lookups.
+
+    Args:
+        codes: A sequence or array of three-digit service codes (str or bytes).
+
+    Returns:
+        Dict[str, numpy.ndarray]: ``valid`` (three digits), ``assigned``,
+        ``chip``, ``cash_allowed`` and ``pin_required`` boolean columns, and
+        ``interchange``, ``authorization``, ``services`` and ``pin`` string
+        columns (empty for invalid codes).
+    """
+    np = require_numpy()
+    digits, valid = _digit_matrix(np, codes, 3)
+    index = digits[:, 0] * 100 + digits[:, 1] * 10 + digits[:, 2]
+    tables = _service_code_arrays()
+    columns = {'valid': valid}
+    for name in ('assigned', 'chip', 'cash_allowed', 'pin_required'):
+        columns[name] = tables[name][index] & valid
+    for name in ('interchange', 'authorization', 'services', 'pin'):
+        columns[name] = np.where(valid, tables[name][index], '')
+    return columns
+
+
+def expiry_columns(expiries: Any, reference: datetime.date) -> Dict[str, Any]:
+    """
+    Decode a column of YYMM expiration dates and check them against a reference date.
+
+    Args:
+        expiries: A sequence or array of YYMM expiration dates (str or bytes).
+        reference: The date to check against.
+
+    Returns:
+        Dict[str, numpy.ndarray]: ``valid`` and ``expired`` boolean columns,
+        ``month_index`` (-1 for invalid dates) and ``end_date`` as
+        ``datetime64[D]`` (NaT for invalid dates).
+    """
+    np = require_numpy()
+    digits, valid = _digit_matrix(np, expiries, 4)
+    month = digits[:, 2] * 10 + digits[:, 3]
+    valid &= (month >= 1) & (month <= 12)
+    index = np.where(valid, (digits[:, 0] * 10 + digits[:, 1]) * 12 + month - 1, -1)
+    return {
+        'valid': valid,
+        'expired': valid & (index < month_index(reference)),
+        'month_index': index,
+        'end_date': np.where(valid, _end_date_array()[np.maximum(index, 0)], np.datetime64('NaT')),
+    }
@@ -16,3 +16,19 @@ class InvalidTrackOneError(CreditCardStripeError):
 class InvalidTrackTwoError(CreditCardStripeError):
     """Raised when there's an error parsing Track 2 data."""
     pass
+
+
+class UnsupportedFormatError(CreditCardStripeError):
+    """Raised when an input line is in a track format the parser does not support."""
+
+    def __init__(self, reason: str):
+        super().__init__(f"Unsupported track format: {reason}")
+        self.reason = reason
+
+
+class RejectedSwipeError(CreditCardStripeError):
+    """Raised when a swipe fails a pre-check and is rejected without being parsed."""
+
+    def __init__(self, reason: str):
+        super().__init__(f"Swipe rejected: {reason}")
+        self.reason = reason
@@ -0,0 +1,245 @@
+"""
+Flight recorder for failed swipes.
+
+A FlightRecorder keeps the last ``capacity`` parse failures in a ring that is
+allocated once, so the raw input behind a burst of bad reads can be inspected
+after the fact without logging every failure. Attach it to a parser with
+``FullTrackParser(recorder=...)``; the parser records each
+``InvalidTrackOneError``/``InvalidTrackTwoError`` it raises and each failed
+``try_parse_*`` call. Successful parses never touch the recorder.
+
+Raw input is masked with ``mask_swipe`` before it is stored, so the ring
+never holds a full PAN, cardholder name or discretionary data, however
+long the process runs. Recording then stores a tuple (reason, masked
+input, offset, timestamp, and the cause's exception type and arguments) in
+the next ring slot. The exception itself is not kept, since its traceback
+would keep the caller's frames and their data alive. Formatting the cause
+and ordering the entries are deferred until the ring is dumped.
+
+Per-reason sampling rates keep one in N failures of a reason, so a flood of
+one kind of failure does not push rarer ones out of the ring. Dumps are
+taken with ``dump()``, written with ``write()``, or triggered from outside
+the process with ``install_signal_handler()`` (SIGUSR1 by default).
+"""
+import itertools
+import json
+import os
+import re
+import signal
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+# Failure reasons recorded by FullTrackParser
+TRACK_ONE_ERROR = 'track_one_error'
+TRACK_TWO_ERROR = 'track_two_error'
+TRY_TRACK_ONE = 'try_track_one'
+TRY_TRACK_TWO = 'try_track_two'
+
+# Letters and digits (in any script) are masked unless positively identified
+_WORD = re.compile(r'\w')
+# Well-formed track prefixes: format code, PAN, and expiry date plus service code
+_TRACK_ONE = re.compile(r'%([A-Za-z])(\d{12,19})\^[^^?%;]*\^(\d{7})')
+_TRACK_TWO = re.compile(r';(\d{12,19})=(\d{7})')
+
+
+def mask_swipe(raw: str) -> str:
+    """
+    Mask the card data in a raw swipe while keeping its layout.
+
+    Every letter and digit is masked except in fields that are positively
+    identified from a well-formed track prefix: the format code, the first
+    six and last four digits of a 12 to 19 digit PAN, and the expiry date and
+    service code. Cardholder names and discretionary data are always masked,
+    and a corrupted track is masked entirely. Sentinels, field separators,
+    spaces and control characters are kept, since they are what a bad read
+    usually gets wrong.
+
+    Args:
+        raw: The raw swipe, valid or not.
+
+    Returns:
+        str: The masked swipe, of the same length.
+    """
+    masked = list(_WORD.sub('*', raw))
+    kept = []
+    for match in _TRACK_ONE.finditer(raw):
+        kept += [match.span(1), match.span(3)]
+        pan_start, pan_end = match.span(2)
+        kept += [(pan_start, pan_start + 6), (pan_end - 4, pan_end)]
+    for match in _TRACK_TWO.finditer(raw):
+        kept.append(match.span(2))
+        pan_start, pan_end = match.span(1)
+        kept += [(pan_start, pan_start + 6), (pan_end - 4, pan_end)]
+    for start, end in kept:
+        masked[start:end] = raw[start:end]
+    return ''.join(masked)
+
+
+@dataclass
+class FailureRecord:
+    """
+    One recorded parse failure, with its card data masked.
+
+    Attributes:
+        sequence (int): The failure's position among all recorded failures.
+        timestamp (float): When the failure was recorded (seconds since the epoch).
+        reason (str): The failure reason, e.g. ``track_one_error``.
+        offset (int): The offset of the failing track's start sentinel in the
+            raw input, or -1 if it has none.
+        detail (str): The underlying error message.
+        raw (str): The masked raw input.
+    """
+    sequence: int
+    timestamp: float
+    reason: str
+    offset: int
+    detail: str
+    raw: str
+
+
+class FlightRecorder:
+    """
+    A fixed-size ring of the most recent parse failures.
+
+    ``record`` takes no lock: slots are claimed from an ``itertools.count``
+    and filled with a single list store, so concurrent recorders never tear
+    an entry. The per-reason counters used for sampling may undercount
+    slightly when several threads record the same reason at once.
+    """
+
+    def __init__(self, capacity: int = 1024, sample_rates: Optional[Dict[str, int]] = None,
+                 clock: Callable[[], float] = time.time):
+        """
+        Allocate the ring.
+
+        Args:
+            capacity: The number of failures kept.
+            sample_rates: Keep one in N failures of a reason, by reason (every
+                failure if omitted); 0 records none of that reason.
+            clock: The time source for timestamps.
+
+        Raises:
+            ValueError: If the capacity is less than 1 or a sampling rate is negative.
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        if sample_rates and min(sample_rates.values()) < 0:
+            raise ValueError("Sampling rates must not be negative")
+        self.capacity = capacity
+        self.sample_rates: Dict[str, int] = dict(sample_rates or {})
+        self.clock = clock
+        self.seen: Dict[str, int] = {}
+        self._slots: List[Optional[tuple]] = [None] * capacity
+        self._sequence = itertools.count()
+        self._recorded = 0
+        self._previous_handler: Any = None
+
+    def record(self, reason: str, raw: str, offset: int = -1, cause: Any = None) -> None:
+        """
+        Record a failure, subject to the reason's sampling rate.
+
+        Args:
+            reason: The failure reason.
+            raw: The raw input that failed to parse; only its masked form is kept.
+            offset: The offset of the failing track in ``raw`` (-1 if unknown).
+            cause: The underlying exception or message. Only an exception's
+                type and arguments are kept.
+        """
+        seen = self.seen.get(reason, 0)
+        self.seen[reason] = seen + 1
+        rate = self.sample_rates.get(reason, 1)
+        if rate != 1 and (rate == 0 or seen % rate):
+            return
+        if isinstance(cause, BaseException):
+            cause = (type(cause), cause.args)
+        masked = mask_swipe(raw)
+        sequence = next(self._sequence)
+        self._slots[sequence % self.capacity] = (sequence, self.clock(), reason, masked, offset, cause)
+        self._recorded = sequence + 1
+
+    @property
+    def recorded(self) -> int:
+        """The number of failures recorded (after sampling), including overwritten ones."""
+        return self._recorded
+
+    def __len__(self) -> int:
+        """The number of failures currently held in the ring."""
+        return min(self._recorded, self.capacity)
+
+    def clear(self) -> None:
+        """Drop all recorded failures and reset the counters."""
+        self._slots = [None] * self.capacity
+        self._sequence = itertools.count()
+        self._recorded = 0
+        self.seen = {}
+
+    def dump(self) -> List[FailureRecord]:
+        """
+        Return the recorded failures, oldest first.
+
+        Returns:
+            List[FailureRecord]: Up to ``capacity`` failures.
+        """
+        entries = sorted(entry for entry in list(self._slots) if entry is not None)
+        return [FailureRecord(sequence=sequence, timestamp=timestamp, reason=reason, offset=offset,
+                              detail=_detail(cause), raw=masked)
+                for sequence, timestamp, reason, masked, offset, cause in entries]
+
+    def write(self, path: str) -> int:
+        """
+        Write a dump as JSON Lines, replacing the file atomically.
+
+        The first line holds the per-reason failure counts; each following line
+        is one FailureRecord.
+
+        Args:
+            path: The output file.
+
+        Returns:
+            int: The number of failures written.
+        """
+        records = self.dump()
+        with open(path + '.part', 'w', encoding='utf-8') as fh:
+            fh.write(json.dumps({'capacity': self.capacity, 'recorded': self._recorded,
+                                 'seen': dict(self.seen)}) + '\n')
+            for record in records:
+                fh.write(json.dumps(asdict(record)) + '\n')
+        os.replace(path + '.part', path)
+        return len(records)
+
+    def install_signal_handler(self, path: str, signum: Optional[int] = None) -> None:
+        """
+        Write a dump to ``path`` whenever the process receives a signal.
+
+        Must be called from the main thread.
+
+        Args:
+            path: The output file, rewritten on every signal.
+            signum: The signal number (SIGUSR1 if omitted).
+
+        Raises:
+            ValueError: If no signal is given and the platform has no SIGUSR1.
+        """
+        if signum is None:
+            signum = getattr(signal, 'SIGUSR1', None)
+            if signum is None:
+                raise ValueError("SIGUSR1 is not available on this platform; pass a signal number")
+        self._previous_handler = (signum, signal.signal(signum, lambda number, frame: self.write(path)))
+
+    def uninstall_signal_handler(self) -> None:
+        """Restore the signal handler replaced by ``install_signal_handler``."""
+        if self._previous_handler is not None:
+            signum, handler = self._previous_handler
+            signal.signal(signum, handler)
+            self._previous_handler = None
+
+
+def _detail(cause: Any) -> str:
+    if cause is None:
+        return ''
+    if isinstance(cause, tuple):
+        exc_type, args = cause
+        message = str(args[0]) if len(args) == 1 else ', '.join(map(str, args))
+        return f"{exc_type.__name__}: {message}" if message else exc_type.__name__
+    return str(cause)
@@ -0,0 +1,263 @@
+"""
+FileFollower class for parsing swipes appended to growing log files.
+
+Reader daemons append one swipe per line to log files that are rotated or
+truncated from time to time. FileFollower watches such a file the way
+``tail -F`` does, parses only newly appended complete lines with
+FullTrackParser and persists a durable offset checkpoint so that a restart
+resumes at the last committed record.
+"""
+import json
+import os
+import time
+import threading
+from dataclasses import asdict, dataclass
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+from .full_track_parser import FullTrackParser
+from .models import FullTrackDataModel
+from .exceptions import CreditCardStripeError
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+@dataclass
+class Checkpoint:
+    """
+    A durable position within a followed file.
+
+    Attributes:
+        device (int): The device number of the followed file.
+        inode (int): The inode number of the followed file.
+        offset (int): The byte offset just past the last committed record.
+    """
+    device: int
+    inode: int
+    offset: int
+
+
+class FileFollower:
+    """
+    Follows a growing, possibly rotated, log file of raw swipes.
+
+    Only complete, newline-terminated lines are parsed; a partial line at the
+    end of the file is kept until the rest of it is appended. When the file is
+    truncated, reading restarts at its beginning. When it is rotated (the path
+    now refers to a different file), the remainder of the old file is read
+    before switching to the new one.
+
+    If the file was rotated while nothing was following it, the checkpointed
+    file is looked up by inode among the rotated siblings of the path (such as
+    ``swipes.log.1``) and drained from the checkpoint first. If it cannot be
+    found, following starts over on the current file and ``missed_files`` is
+    incremented, since the records after the checkpoint were skipped.
+    """
+
+    def __init__(self, path: str, checkpoint_path: Optional[str] = None,
+                 parser: Optional[FullTrackParser] = None, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """
+        Start following a file.
+
+        Args:
+            path: The log file to follow. It does not need to exist yet.
+            checkpoint_path: Where the offset checkpoint is persisted. When it
+                exists and refers to the current file, reading resumes from it.
+            parser: The parser used for each line (a default FullTrackParser if omitted).
+            chunk_size: The number of bytes read from the file at a time.
+
+        Raises:
+            ValueError: If the chunk size is less than 1.
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        self.path = path
+        self.checkpoint_path = checkpoint_path
+        self.parser = parser if parser is not None else FullTrackParser()
+        self.chunk_size = chunk_size
+        self.invalid_records = 0
+        self.missed_files = 0
+        self._file: Optional[BinaryIO] = None
+        self._device = 0
+        self._inode = 0
+        self._offset = 0
+        self._pending = b''
+        self._open(self._load_checkpoint())
+
+    @property
+    def checkpoint(self) -> Checkpoint:
+        """The position just past the last record returned by ``poll``."""
+        return Checkpoint(device=self._device, inode=self._inode, offset=self._offset)
+
+    def poll(self) -> List[FullTrackDataModel]:
+        """
+        Parse the lines appended since the last call.
+
+        Returns:
+            List[FullTrackDataModel]: The newly parsed swipes, in file order.
+        """
+        if self._file is None and not self._open(None):
+            return []
+        if os.fstat(self._file.fileno()).st_size < self._file.tell():
+            # Truncated in place: start over from the beginning
+            self._file.seek(0)
+            self._offset = 0
+            self._pending = b''
+
+        results = self._read_new(final=False)
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return results
+        if _identity(stat) != (self._device, self._inode):
+            # Rotated: drain the old file, then continue with the new one
+            results.extend(self._read_new(final=True))
+            self._file.close()
+            self._file = None
+            if self._open(None):
+                results.extend(self._read_new(final=False))
+        return results
+
+    def commit(self) -> None:
+        """Durably persist the current checkpoint, if a checkpoint path is set."""
+        if self.checkpoint_path is None:
+            return
+        tmp_path = self.checkpoint_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as fh:
+            json.dump(asdict(self.checkpoint), fh)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def follow(self, poll_interval: float = 0.01,
+               stop: Optional[threading.Event] = None) -> Iterator[FullTrackDataModel]:
+        """
+        Yield swipes as they are appended, committing after each consumed batch.
+
+        The checkpoint is committed once the consumer has taken every swipe of
+        a batch, so a restart never skips a record that was not consumed.
+
+        Args:
+            poll_interval: Seconds to wait between polls when no data arrived.
+            stop: An event that ends the iteration when set.
+
+        Yields:
+            FullTrackDataModel: Each newly parsed swipe.
+        """
+        while stop is None or not stop.is_set():
+            batch = self.poll()
+            if not batch:
+                if stop is None:
+                    time.sleep(poll_interval)
+                else:
+                    stop.wait(poll_interval)
+                continue
+            yield from batch
+            self.commit()
+
+    def close(self) -> None:
+        """Close the followed file."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> 'FileFollower':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def _load_checkpoint(self) -> Optional[Checkpoint]:
+        """Load the persisted checkpoint, if any."""
+        if self.checkpoint_path is None or not os.path.exists(self.checkpoint_path):
+            return None
+        with open(self.checkpoint_path, 'r', encoding='utf-8') as fh:
+            return Checkpoint(**json.load(fh))
+
+    def _open(self, checkpoint: Optional[Checkpoint]) -> bool:
+        """
+        Open the followed path, resuming from ``checkpoint`` when it matches the file.
+
+        A checkpoint of a file that has since been rotated resumes in the
+        rotated file instead; ``poll`` then drains it and moves on to the path.
+        """
+        try:
+            fh = open(self.path, 'rb')
+        except FileNotFoundError:
+            fh = None
+        if checkpoint is not None and checkpoint.inode and (
+                fh is None or (checkpoint.device, checkpoint.inode) != _identity(os.fstat(fh.fileno()))):
+            rotated = self._find_rotated(checkpoint)
+            if rotated is not None:
+                if fh is not None:
+                    fh.close()
+                fh = rotated
+            else:
+                self.missed_files += 1
+        if fh is None:
+            return False
+        stat = os.fstat(fh.fileno())
+        offset = 0
+        if (checkpoint is not None and (checkpoint.device, checkpoint.inode) == (stat.st_dev, stat.st_ino)
+                and checkpoint.offset <= stat.st_size):
+            offset = checkpoint.offset
+        fh.seek(offset)
+        self._file = fh
+        self._device, self._inode = stat.st_dev, stat.st_ino
+        self._offset = offset
+        self._pending = b''
+        return True
+
+    def _find_rotated(self, checkpoint: Checkpoint) -> Optional[BinaryIO]:
+        """Open the rotated sibling of the path that is the checkpointed file, if there is one."""
+        directory = os.path.dirname(self.path) or '.'
+        prefix = os.path.basename(self.path) + '.'
+        try:
+            names = sorted(name for name in os.listdir(directory) if name.startswith(prefix))
+        except OSError:
+            return None
+        for name in names:
+            candidate = os.path.join(directory, name)
+            try:
+                if _identity(os.stat(candidate)) != (checkpoint.device, checkpoint.inode):
+                    continue
+                fh = open(candidate, 'rb')
+            except OSError:
+                continue
+            if _identity(os.fstat(fh.fileno())) == (checkpoint.device, checkpoint.inode):
+                return fh
+            fh.close()
+        return None
+
+    def _read_new(self, final: bool) -> List[FullTrackDataModel]:
+        """Read and parse newly appended lines; ``final`` also parses a trailing partial line."""
+        results: List[FullTrackDataModel] = []
+        while True:
+            data = self._file.read(self.chunk_size)
+            if not data:
+                break
+            lines = (self._pending + data).split(b'\n')
+            self._pending = lines.pop()
+            self._parse_lines(lines, results)
+        if final and self._pending:
+            lines = [self._pending]
+            self._offset -= 1  # The last line has no newline to account for
+            self._pending = b''
+            self._parse_lines(lines, results)
+        return results
+
+    def _parse_lines(self, lines: List[bytes], results: List[FullTrackDataModel]) -> None:
+        """Parse complete lines into ``results``, advancing the offset past each."""
+        for line in lines:
+            self._offset += len(line) + 1
+            line = line.rstrip(b'\r')
+            if not line:
+                continue
+            try:
+                results.append(self.parser.parse(line.decode('latin-1')))
+            except CreditCardStripeError:
+                self.invalid_records += 1
+
+
+def _identity(stat: os.stat_result) -> Tuple[int, int]:
+    """Return the (device, inode) pair that identifies a file."""
+    return stat.st_dev, stat.st_ino
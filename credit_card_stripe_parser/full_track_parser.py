@@ -8,11 +8,23 @@ from typing import Optional, Tuple
 
 from .models import FullTrackDataModel, TrackOneModel, TrackTwoModel
 from .exceptions import InvalidTrackOneError, InvalidTrackTwoError
+from .flight_recorder import FlightRecorder, TRACK_ONE_ERROR, TRACK_TWO_ERROR, TRY_TRACK_ONE, TRY_TRACK_TWO
 
 
 class FullTrackParser:
     """
     A parser for credit card magnetic stripe data that can parse both Track 1 and Track 2.
+
+    Instances keep no per-call state: the sentinels and length limits are
+    class constants and the parse methods only use local variables. A single
+    instance can therefore be shared by any number of threads, including on
+    free-threaded CPython builds.
+
+    An optional FlightRecorder receives the raw input of every failure; it
+    is only consulted on failure paths. A ``try_parse_*`` call on input
+    without that track's start sentinel is not a failure and is not
+    recorded. A recorder shared between threads may undercount its
+    per-reason counters slightly; see FlightRecorder.
     """
     
     # Constants for track parsing
@@ -22,6 +34,19 @@ class FullTrackParser:
     _SS2 = ';'  # Start sentinel for Track 2
     _FS2 = '='  # Field separator for Track 2
     _ES2 = '?'  # End sentinel for Track 2
+    _MAX_TRACK1_LEN = 79  # Maximum Track 1 length between sentinels
+    _MAX_TRACK2_LEN = 40  # Maximum Track 2 length between sentinels
+
+    recorder: Optional[FlightRecorder] = None
+
+    def __init__(self, recorder: Optional[FlightRecorder] = None):
+        """
+        Create a parser.
+
+        Args:
+            recorder: Records the raw input of failed parses (nothing is recorded if omitted).
+        """
+        self.recorder = recorder
 
     def parse_full_track(self, track1: str, track2: str = None) -> FullTrackDataModel:
         """
@@ -49,6 +74,8 @@ class FullTrackParser:
                 if is_track1_valid:
                     track1_model = self.parse_track_one(track1)
         except Exception as e:
+            if self.recorder is not None:
+                self.recorder.record(TRACK_ONE_ERROR, track1, track1.find(self._SS1), e)
             raise InvalidTrackOneError("Failed to parse Track 1 data") from e
             
         try:
@@ -57,6 +84,8 @@ class FullTrackParser:
                 if is_track2_valid:
                     track2_model = self.parse_track_two(track2)
         except Exception as e:
+            if self.recorder is not None:
+                self.recorder.record(TRACK_TWO_ERROR, track2, track2.find(self._SS2), e)
             raise InvalidTrackTwoError("Failed to parse Track 2 data") from e
             
         return FullTrackDataModel(
@@ -90,6 +119,8 @@ class FullTrackParser:
             if is_track1_valid:
                 track1 = self.parse_track_one(full_track)
         except Exception as e:
+            if self.recorder is not None:
+                self.recorder.record(TRACK_ONE_ERROR, full_track, full_track.find(self._SS1), e)
             raise InvalidTrackOneError("Failed to parse Track 1 data") from e
             
         try:
@@ -97,6 +128,8 @@ class FullTrackParser:
             if is_track2_valid:
                 track2 = self.parse_track_two(full_track)
         except Exception as e:
+            if self.recorder is not None:
+                self.recorder.record(TRACK_TWO_ERROR, full_track, full_track.find(self._SS2), e)
             raise InvalidTrackTwoError("Failed to parse Track 2 data") from e
             
         return FullTrackDataModel(
@@ -142,8 +175,8 @@ class FullTrackParser:
         end_idx = full_track.index(self._ES1)
         track_string = full_track[start_idx:end_idx]
         
-        if len(track_string) > 79:
-            raise ValueError("Track 1 data exceeds maximum length of 79 characters")
+        if len(track_string) > self._MAX_TRACK1_LEN:
+            raise ValueError(f"Track 1 data exceeds maximum length of {self._MAX_TRACK1_LEN} characters")
             
         # Split into segments using the field separator
         track_segments = track_string.split(self._FS1)
@@ -179,7 +212,9 @@ class FullTrackParser:
                 return False, None
             track_one = self.parse_track_one(full_track)
             return True, track_one
-        except Exception:
+        except Exception as e:
+            if self.recorder is not None:
+                self.recorder.record(TRY_TRACK_ONE, full_track, full_track.find(self._SS1), e)
             return False, None
     
     def parse_track2(self, full_track: str) -> TrackTwoModel:
@@ -218,8 +253,8 @@ class FullTrackParser:
         end_idx = full_track.rindex(self._ES2)  # Use rindex in case of multiple '?'
         track_string = full_track[start_idx:end_idx]
         
-        if len(track_string) > 40:
-            raise ValueError("Track 2 data exceeds maximum length of 40 characters")
+        if len(track_string) > self._MAX_TRACK2_LEN:
+            raise ValueError(f"Track 2 data exceeds maximum length of {self._MAX_TRACK2_LEN} characters")
             
         # Split into segments using the field separator
         track_segments = track_string.split(self._FS2)
@@ -258,7 +293,9 @@ class FullTrackParser:
                 return False, None
             track_two = self.parse_track_two(full_track)
             return True, track_two
-        except Exception:
+        except Exception as e:
+            if self.recorder is not None:
+                self.recorder.record(TRY_TRACK_TWO, full_track, full_track.find(self._SS2), e)
             return False, None
     
     def _calculate_lrc(self, data: bytes) -> int:
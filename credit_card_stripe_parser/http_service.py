@@ -0,0 +1,351 @@
+"""
+Local HTTP parsing service with adaptive micro-batching.
+
+A small asyncio HTTP/1.1 server, built only on the standard library, that
+exposes FullTrackParser to other local services:
+
+* ``POST /parse`` with ``{"track": "..."}`` parses a single swipe;
+* ``POST /parse/batch`` with ``{"tracks": ["...", ...]}`` parses many swipes;
+* ``GET /stats`` returns the service counters.
+
+Concurrent single requests are coalesced into micro-batches that are
+dispatched to a pre-warmed thread pool. Batches grow only while every worker
+is busy, and no request waits longer than ``max_delay`` seconds for its
+batch. Connections are kept alive unless the client asks otherwise.
+
+Run it from the command line with::
+
+    python -m credit_card_stripe_parser.http_service --port 8080
+"""
+import argparse
+import asyncio
+import json
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from .full_track_parser import FullTrackParser
+from .exceptions import CreditCardStripeError
+from .profiler import profiled
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+            413: 'Payload Too Large', 422: 'Unprocessable Entity', 500: 'Internal Server Error',
+            503: 'Service Unavailable'}
+_MAX_BODY = 16 << 20
+
+
+class _Stopping(Exception):
+    """Set on the futures of single requests that are dropped by ``stop()``."""
+
+
+class ParseService:
+    """An asyncio HTTP service exposing FullTrackParser."""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, max_batch: int = 64,
+                 max_delay: float = 0.002, workers: int = 4, parser: Optional[FullTrackParser] = None):
+        """
+        Configure the service.
+
+        Args:
+            host: The address to listen on.
+            port: The port to listen on; 0 picks a free port.
+            max_batch: The maximum number of single requests coalesced into one batch.
+            max_delay: The latency ceiling in seconds a single request may wait for its batch to fill.
+            workers: The number of parser threads.
+            parser: The parser to use (a default FullTrackParser if omitted).
+        """
+        self.host = host
+        self.port = port
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.workers = workers
+        self.parser = parser if parser is not None else FullTrackParser()
+        self.stats: Dict[str, int] = {
+            'connections': 0,
+            'requests': 0,
+            'single_requests': 0,
+            'batch_requests': 0,
+            'micro_batches': 0,
+            'micro_batched_items': 0,
+            'records_parsed': 0,
+            'parse_errors': 0,
+        }
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: Optional[asyncio.Queue] = None
+        self._batcher: Optional[asyncio.Task] = None
+        self._dispatches: Set[asyncio.Task] = set()
+        self._worker_idle: Optional[asyncio.Event] = None
+
+    async def start(self) -> None:
+        """Start the worker pool, the micro-batcher and the listening socket."""
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='parse')
+        # Pre-warm the pool so the first requests do not pay for thread creation
+        barrier = threading.Barrier(self.workers)
+        await asyncio.gather(*(asyncio.get_running_loop().run_in_executor(self._executor, barrier.wait)
+                               for _ in range(self.workers)))
+        self._pending = asyncio.Queue()
+        self._worker_idle = asyncio.Event()
+        self._worker_idle.set()
+        self._batcher = asyncio.create_task(self._run_batcher())
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        """
+        Stop accepting connections and shut down the worker pool.
+
+        The micro-batcher and in-flight micro-batches are cancelled, and single
+        requests still waiting for a result are answered with a 503.
+        """
+        if self._server is not None:
+            self._server.close()
+        tasks = [task for task in (self._batcher, *self._dispatches) if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        while self._pending is not None and not self._pending.empty():
+            future = self._pending.get_nowait()[1]
+            if not future.done():
+                future.set_exception(_Stopping())
+        if self._server is not None:
+            await self._server.wait_closed()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+    async def serve_forever(self) -> None:
+        """Start the service and serve until cancelled."""
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    def _parse_batch(self, tracks: Sequence[Any]) -> List[Dict[str, Any]]:
+        """Parse a batch of swipes in a worker thread."""
+        results = []
+        for track in tracks:
+            if not isinstance(track, str):
+                results.append({'ok': False, 'error': 'track must be a string'})
+                continue
+            try:
+                results.append({'ok': True, 'result': asdict(self.parser.parse(track))})
+            except CreditCardStripeError as e:
+                results.append({'ok': False, 'error': str(e)})
+        return results
+
+    def _count_results(self, results: List[Dict[str, Any]]) -> None:
+        errors = sum(1 for r in results if not r['ok'])
+        self.stats['records_parsed'] += len(results) - errors
+        self.stats['parse_errors'] += errors
+
+    async def _run_batcher(self) -> None:
+        """
+        Coalesce single requests into micro-batches under the latency ceiling.
+
+        While a worker thread is idle, whatever is queued is dispatched at once,
+        so light traffic pays no batching delay. Once every worker is busy,
+        requests accumulate until the batch is full, a worker becomes idle or
+        the oldest request has waited ``max_delay`` seconds.
+
+        When cancelled, the requests of the batch being assembled are answered
+        with a 503.
+        """
+        loop = asyncio.get_running_loop()
+        batch: List[Tuple[Any, asyncio.Future]] = []
+        getter: Optional[asyncio.Future] = None
+        try:
+            while True:
+                batch = [await self._pending.get()]
+                deadline = loop.time() + self.max_delay
+                while len(batch) < self.max_batch:
+                    try:
+                        batch.append(self._pending.get_nowait())
+                        continue
+                    except asyncio.QueueEmpty:
+                        pass
+                    remaining = deadline - loop.time()
+                    if len(self._dispatches) < self.workers or remaining <= 0:
+                        break
+                    getter = asyncio.ensure_future(self._pending.get())
+                    idle = asyncio.ensure_future(self._worker_idle.wait())
+                    try:
+                        await asyncio.wait((getter, idle), timeout=remaining,
+                                           return_when=asyncio.FIRST_COMPLETED)
+                    finally:
+                        idle.cancel()
+                    received, getter = getter, None
+                    if not received.done():
+                        received.cancel()
+                        break
+                    batch.append(received.result())
+                self._submit(loop, batch)
+                batch = []
+        except asyncio.CancelledError:
+            if getter is not None:
+                if getter.done() and not getter.cancelled():
+                    batch.append(getter.result())
+                else:
+                    getter.cancel()
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(_Stopping())
+            raise
+
+    def _submit(self, loop: asyncio.AbstractEventLoop, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        """Dispatch a micro-batch to the worker pool."""
+        self.stats['micro_batches'] += 1
+        self.stats['micro_batched_items'] += len(batch)
+        task = loop.create_task(self._dispatch(batch))
+        self._dispatches.add(task)
+        if len(self._dispatches) >= self.workers:
+            self._worker_idle.clear()
+        task.add_done_callback(self._dispatch_done)
+
+    def _dispatch_done(self, task: asyncio.Task) -> None:
+        self._dispatches.discard(task)
+        self._worker_idle.set()
+
+    async def _dispatch(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        """
+        Parse a micro-batch in the worker pool and resolve its futures.
+
+        If the batch fails or the dispatch is cancelled, the error is set on
+        every future.
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self._executor, self._parse_batch, [t for t, _ in batch])
+        except BaseException as e:
+            stopping = isinstance(e, asyncio.CancelledError) or not isinstance(e, Exception)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(_Stopping() if stopping else e)
+            if stopping:
+                raise
+            return
+        self._count_results(results)
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def _route(self, method: str, path: str, body: bytes) -> Tuple[int, Any]:
+        """Handle one request and return the status code and JSON payload."""
+        if path == '/stats':
+            if method != 'GET':
+                return 405, {'error': 'method not allowed'}
+            stats = dict(self.stats)
+            stats['mean_micro_batch_size'] = (
+                stats['micro_batched_items'] / stats['micro_batches'] if stats['micro_batches'] else 0.0)
+            return 200, stats
+        if path not in ('/parse', '/parse/batch'):
+            return 404, {'error': 'not found'}
+        if method != 'POST':
+            return 405, {'error': 'method not allowed'}
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return 400, {'error': 'invalid JSON body'}
+        if not isinstance(payload, dict):
+            return 400, {'error': 'JSON body must be an object'}
+
+        if path == '/parse':
+            self.stats['single_requests'] += 1
+            future = asyncio.get_running_loop().create_future()
+            await self._pending.put((payload.get('track'), future))
+            result = await future
+            return (200, result['result']) if result['ok'] else (422, {'error': result['error']})
+
+        tracks = payload.get('tracks')
+        if not isinstance(tracks, list):
+            return 400, {'error': 'tracks must be a list'}
+        self.stats['batch_requests'] += 1
+        results = await asyncio.get_running_loop().run_in_executor(self._executor, self._parse_batch, tracks)
+        self._count_results(results)
+        return 200, {'results': results}
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve requests on one keep-alive connection."""
+        self.stats['connections'] += 1
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self._respond(writer, 400, {'error': 'malformed request line'}, False)
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+                length = headers.get('content-length', '0') or '0'
+                if not (length.isascii() and length.isdigit()):
+                    await self._respond(writer, 400, {'error': 'invalid Content-Length'}, False)
+                    break
+                length = int(length)
+                if length > _MAX_BODY:
+                    await self._respond(writer, 413, {'error': 'request body too large'}, False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+                self.stats['requests'] += 1
+                try:
+                    status, payload = await self._route(method, path.split('?', 1)[0], body)
+                except _Stopping:
+                    await self._respond(writer, 503, {'error': 'service stopping'}, False)
+                    break
+                except Exception:
+                    await self._respond(writer, 500, {'error': 'internal error'}, False)
+                    break
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, payload: Any, keep_alive: bool) -> None:
+        body = json.dumps(payload).encode('utf-8')
+        head = (f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Local HTTP parsing service")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--max-batch', type=int, default=64)
+    parser.add_argument('--max-delay-ms', type=float, default=2.0)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--profile', metavar='PREFIX',
+                        help="sample the service and write PREFIX.collapsed and PREFIX.summary.txt on exit")
+    parser.add_argument('--profile-hz', type=float, default=200.0, help="profiler samples per second")
+    args = parser.parse_args(argv)
+    service = ParseService(host=args.host, port=args.port, max_batch=args.max_batch,
+                           max_delay=args.max_delay_ms / 1000, workers=args.workers)
+    with profiled(args.profile, args.profile_hz):
+        try:
+            asyncio.run(service.serve_forever())
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,271 @@
+"""
+Simulated card-reader load generator.
+
+Simulates a number of card readers that emit swipes over local socket pairs or
+pipes, with configurable arrival rates, bursts, fragmentation and malformed
+input. The byte streams are ingested with one StreamParser per reader, and the
+run is summarized as a machine-readable report with parse latency
+percentiles, throughput and drop counts.
+
+Run it from the command line with::
+
+    python -m credit_card_stripe_parser.loadgen --readers 16 --rate 200 --duration 10
+"""
+import argparse
+import json
+import math
+import os
+import random
+import selectors
+import socket
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+from .profiler import profiled
+from .stream_parser import StreamParser
+
+_PAN = '4111111111111111'
+_TRACK_ONE = '%B' + _PAN + '^LOAD/TEST^2512101{tag}?'
+_TRACK_TWO = ';' + _PAN + '=2512101{tag}?'
+_NOISE = (b'\r\n', b'\x00\x00', b'\xff', b'\n\n\n')
+
+
+@dataclass
+class LoadConfig:
+    """
+    Parameters of a load test run.
+
+    Attributes:
+        readers (int): Number of simulated readers.
+        rate (float): Mean swipe arrivals per second for each reader.
+        duration (float): Length of the run in seconds.
+        transport (str): ``'socket'`` for Unix socket pairs or ``'pipe'`` for pipes.
+        burst_size (int): Swipes emitted back to back for each arrival.
+        fragment_size (int): Maximum bytes per write; 0 writes each swipe at once.
+        malformed_ratio (float): Fraction of swipes that are truncated or preceded by noise.
+        seed (Optional[int]): Random seed for reproducible runs.
+    """
+    readers: int = 4
+    rate: float = 100.0
+    duration: float = 5.0
+    transport: str = 'socket'
+    burst_size: int = 1
+    fragment_size: int = 0
+    malformed_ratio: float = 0.0
+    seed: Optional[int] = None
+
+
+def percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    """
+    Return the nearest-rank percentile of already sorted values.
+
+    Args:
+        sorted_values: The values, in ascending order.
+        fraction: The percentile as a fraction, for example 0.99.
+
+    Returns:
+        float: The percentile, or 0.0 for an empty sequence.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class _Reader(threading.Thread):
+    """A simulated reader writing swipes to one end of a channel."""
+
+    def __init__(self, reader_id: int, config: LoadConfig, channel: Any, seed: int):
+        super().__init__(name=f'reader-{reader_id}', daemon=True)
+        self.reader_id = reader_id
+        self.config = config
+        self.channel = channel
+        self.random = random.Random(seed)
+        self.sent_at: Dict[int, float] = {}
+        self.sent = 0
+        self.malformed = 0
+
+    def _write(self, data: bytes) -> None:
+        if isinstance(self.channel, socket.socket):
+            self.channel.sendall(data)
+        else:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(self.channel, view):]
+
+    def _emit(self, seq: int) -> None:
+        tag = f'{self.reader_id:03d}{seq:09d}'
+        swipe = (_TRACK_ONE + _TRACK_TWO).format(tag=tag).encode('ascii')
+        malformed = self.random.random() < self.config.malformed_ratio
+        if malformed:
+            self.malformed += 1
+            if self.random.random() < 0.5:
+                # Cut the swipe inside Track 2 so the reader never completes it
+                swipe = swipe[:self.random.randrange(swipe.index(b';') + 1, len(swipe) - 1)]
+            else:
+                swipe = self.random.choice(_NOISE) + swipe
+
+        pieces = [swipe]
+        if self.config.fragment_size > 0:
+            pieces, pos = [], 0
+            while pos < len(swipe):
+                step = self.random.randint(1, self.config.fragment_size)
+                pieces.append(swipe[pos:pos + step])
+                pos += step
+        for piece in pieces[:-1]:
+            self._write(piece)
+        if swipe.endswith(b'?'):
+            self.sent_at[seq] = time.perf_counter()
+            self.sent += 1
+        self._write(pieces[-1])
+
+    def run(self) -> None:
+        config = self.config
+        deadline = time.perf_counter() + config.duration
+        next_arrival = time.perf_counter()
+        seq = 0
+        try:
+            while True:
+                next_arrival += self.random.expovariate(config.rate / config.burst_size)
+                if next_arrival >= deadline:
+                    break
+                delay = next_arrival - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                for _ in range(config.burst_size):
+                    self._emit(seq)
+                    seq += 1
+        finally:
+            if isinstance(self.channel, socket.socket):
+                self.channel.close()
+            else:
+                os.close(self.channel)
+
+
+def run_load(config: LoadConfig) -> Dict[str, Any]:
+    """
+    Run a load test and return its report.
+
+    Args:
+        config: The load test parameters.
+
+    Returns:
+        Dict[str, Any]: A JSON-serializable report with the configuration, swipe
+        counts, throughput and latency percentiles in milliseconds.
+
+    Raises:
+        ValueError: If the transport is unknown.
+    """
+    if config.transport not in ('socket', 'pipe'):
+        raise ValueError(f"Unknown transport: {config.transport}")
+    seeds = random.Random(config.seed)
+    selector = selectors.DefaultSelector()
+    readers: List[_Reader] = []
+    streams: Dict[int, StreamParser] = {}
+    for reader_id in range(config.readers):
+        if config.transport == 'socket':
+            read_end, write_end = socket.socketpair()
+            fd = read_end.fileno()
+        else:
+            fd, write_end = os.pipe()
+            read_end = fd
+        selector.register(fd, selectors.EVENT_READ, read_end)
+        streams[fd] = StreamParser()
+        readers.append(_Reader(reader_id, config, write_end, seeds.getrandbits(32)))
+
+    latencies: List[float] = []
+    unexpected = 0
+    start = time.perf_counter()
+    for reader in readers:
+        reader.start()
+    open_channels = len(readers)
+    while open_channels:
+        for key, _ in selector.select():
+            fd = key.fd
+            data = os.read(fd, 65536)
+            stream = streams[fd]
+            events = stream.feed(data) if data else stream.flush()
+            now = time.perf_counter()
+            for event in events:
+                tag = event.track_two.discretionary_data if event.track_two else ''
+                try:
+                    sent_at = readers[int(tag[:3])].sent_at.pop(int(tag[3:12]))
+                except (ValueError, IndexError, KeyError):
+                    unexpected += 1
+                    continue
+                latencies.append(now - sent_at)
+            if not data:
+                selector.unregister(fd)
+                if isinstance(key.data, socket.socket):
+                    key.data.close()
+                else:
+                    os.close(fd)
+                open_channels -= 1
+    elapsed = time.perf_counter() - start
+    selector.close()
+    for reader in readers:
+        reader.join()
+
+    latencies.sort()
+    sent = sum(reader.sent for reader in readers)
+    return {
+        'config': asdict(config),
+        'elapsed_seconds': elapsed,
+        'swipes_sent': sent,
+        'malformed_sent': sum(reader.malformed for reader in readers),
+        'swipes_parsed': len(latencies),
+        'dropped': sent - len(latencies),
+        'unexpected': unexpected,
+        'invalid_frames': sum(s.stats.invalid_frames for s in streams.values()),
+        'garbage_bytes': sum(s.stats.garbage_bytes for s in streams.values()),
+        'throughput_per_second': len(latencies) / elapsed if elapsed > 0 else 0.0,
+        'latency_ms': {
+            'p50': percentile(latencies, 0.50) * 1000,
+            'p95': percentile(latencies, 0.95) * 1000,
+            'p99': percentile(latencies, 0.99) * 1000,
+            'p999': percentile(latencies, 0.999) * 1000,
+            'max': (latencies[-1] if latencies else 0.0) * 1000,
+            'mean': (sum(latencies) / len(latencies) if latencies else 0.0) * 1000,
+        },
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Command line entry point; writes the JSON report to stdout or a file."""
+    parser = argparse.ArgumentParser(description="Simulated card-reader load generator")
+    parser.add_argument('--readers', type=int, default=LoadConfig.readers)
+    parser.add_argument('--rate', type=float, default=LoadConfig.rate,
+                        help="mean swipe arrivals per second for each reader")
+    parser.add_argument('--duration', type=float, default=LoadConfig.duration, help="seconds")
+    parser.add_argument('--transport', choices=('socket', 'pipe'), default=LoadConfig.transport)
+    parser.add_argument('--burst-size', type=int, default=LoadConfig.burst_size)
+    parser.add_argument('--fragment-size', type=int, default=LoadConfig.fragment_size,
+                        help="maximum bytes per write (0 disables fragmentation)")
+    parser.add_argument('--malformed-ratio', type=float, default=LoadConfig.malformed_ratio)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--output', help="write the report to this file instead of stdout")
+    parser.add_argument('--profile', metavar='PREFIX',
+                        help="sample the run and write PREFIX.collapsed and PREFIX.summary.txt")
+    parser.add_argument('--profile-hz', type=float, default=200.0, help="profiler samples per second")
+    args = parser.parse_args(argv)
+
+    with profiled(args.profile, args.profile_hz):
+        report = run_load(LoadConfig(
+            readers=args.readers, rate=args.rate, duration=args.duration, transport=args.transport,
+            burst_size=args.burst_size, fragment_size=args.fragment_size,
+            malformed_ratio=args.malformed_ratio, seed=args.seed,
+        ))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fh:
+            fh.write(text + '\n')
+    else:
+        sys.stdout.write(text + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
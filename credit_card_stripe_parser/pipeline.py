@@ -0,0 +1,415 @@
+"""
+A small staged ingestion pipeline with bounded queues.
+
+A Pipeline chains Stage objects, for example::
+
+    read_chunks(path) -> FrameStage -> ParseStage -> EnrichStage -> MaskStage -> WriteStage
+
+Items travel between stages in batches through bounded queues, so a slow stage
+applies backpressure to the stages before it instead of letting memory grow.
+Each stage runs in one of three modes:
+
+* ``'inline'``: fused into the worker of the previous stage (no queue);
+* ``'thread'``: ``workers`` threads consuming the stage's input queue;
+* ``'process'``: ``workers`` processes fed by the stage's input queue.
+
+Per-stage metrics (items in and out, busy time, throughput and queue depth)
+show which stage is the bottleneck so that only that stage is scaled. With more
+than one worker a stage does not preserve item order.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from .bulk import DEFAULT_CHUNK_SIZE, open_archive
+from .card_utils import card_brand, luhn_valid, mask_pan
+from .full_track_parser import FullTrackParser
+from .models import FullTrackDataModel
+from .exceptions import CreditCardStripeError
+
+_END = object()  # End-of-stream marker passed between stages
+
+_MODES = ('inline', 'thread', 'process')
+
+
+@dataclass
+class EnrichedSwipe:
+    """
+    A parsed swipe with card-level enrichment.
+
+    Attributes:
+        result (FullTrackDataModel): The parsed swipe.
+        pan (str): The PAN, taken from Track 2 when present, else from Track 1.
+        bin (str): The first six digits of the PAN.
+        brand (str): The card brand detected from the BIN.
+        luhn_valid (bool): Whether the PAN passes the Luhn check.
+    """
+    result: FullTrackDataModel
+    pan: str
+    bin: str
+    brand: str
+    luhn_valid: bool
+
+
+class Stage:
+    """
+    Base class for pipeline stages.
+
+    Subclasses override ``process`` (one item in, one item or None out) or
+    ``process_batch`` (a list in, a list out). Stages that keep state between
+    batches set ``stateful`` and then run with a single thread or inline.
+    """
+
+    stateful = False
+
+    def __init__(self, name: Optional[str] = None, mode: str = 'thread', workers: int = 1,
+                 batch_size: int = 256, queue_size: int = 16):
+        """
+        Configure the stage.
+
+        Args:
+            name: The name used in metrics (the class name if omitted).
+            mode: ``'inline'``, ``'thread'`` or ``'process'``.
+            workers: The number of threads or processes for the stage.
+            batch_size: The maximum number of items per batch handed to this stage.
+            queue_size: The maximum number of batches waiting in the input queue.
+
+        Raises:
+            ValueError: If the mode is unknown or the worker count is invalid for the stage.
+        """
+        if mode not in _MODES:
+            raise ValueError(f"Unknown stage mode: {mode}")
+        if workers < 1:
+            raise ValueError("A stage needs at least one worker")
+        if self.stateful and (mode == 'process' or workers > 1):
+            raise ValueError(f"{type(self).__name__} keeps state and must run inline or with one thread")
+        self.name = name or type(self).__name__
+        self.mode = mode
+        self.workers = workers
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+
+    def process(self, item: Any) -> Any:
+        """Process one item; return None to drop it."""
+        raise NotImplementedError
+
+    def process_batch(self, items: List[Any]) -> List[Any]:
+        """Process a batch of items and return the output items."""
+        results = []
+        for item in items:
+            result = self.process(item)
+            if result is not None:
+                results.append(result)
+        return results
+
+    def finish(self) -> List[Any]:
+        """Return any items still buffered when the input ends."""
+        return []
+
+
+class FrameStage(Stage):
+    """Splits raw byte chunks into newline-delimited records."""
+
+    stateful = True
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._tail = b''
+
+    def process_batch(self, items: List[bytes]) -> List[str]:
+        records = []
+        for chunk in items:
+            lines = (self._tail + chunk).split(b'\n')
+            self._tail = lines.pop()
+            records.extend(line.rstrip(b'\r').decode('latin-1') for line in lines if line.rstrip(b'\r'))
+        return records
+
+    def finish(self) -> List[str]:
+        tail, self._tail = self._tail.rstrip(b'\r'), b''
+        return [tail.decode('latin-1')] if tail else []
+
+
+class ParseStage(Stage):
+    """Parses records with FullTrackParser, dropping records the parser rejects."""
+
+    def __init__(self, parser: Optional[FullTrackParser] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.parser = parser if parser is not None else FullTrackParser()
+
+    def process(self, item: str) -> Optional[FullTrackDataModel]:
+        try:
+            result = self.parser.parse(item)
+        except CreditCardStripeError:
+            return None
+        if result.track_one is None and result.track_two is None:
+            return None
+        return result
+
+
+class EnrichStage(Stage):
+    """Adds the PAN, BIN, brand and Luhn result to each parsed swipe."""
+
+    def process(self, item: FullTrackDataModel) -> EnrichedSwipe:
+        track = item.track_two or item.track_one
+        pan = track.pan if track is not None else ''
+        return EnrichedSwipe(result=item, pan=pan, bin=pan[:6], brand=card_brand(pan),
+                             luhn_valid=luhn_valid(pan))
+
+
+class MaskStage(Stage):
+    """Masks PANs and removes raw source strings from enriched swipes."""
+
+    def process(self, item: EnrichedSwipe) -> EnrichedSwipe:
+        result = item.result
+        track_one = result.track_one
+        track_two = result.track_two
+        if track_one is not None:
+            track_one = replace(track_one, pan=mask_pan(track_one.pan), source_string='')
+        if track_two is not None:
+            track_two = replace(track_two, pan=mask_pan(track_two.pan), source_string='')
+        return replace(item, pan=mask_pan(item.pan),
+                       result=replace(result, track_one=track_one, track_two=track_two))
+
+
+class WriteStage(Stage):
+    """Writes each item as one line to a text stream."""
+
+    stateful = True
+
+    def __init__(self, stream: IO[str], formatter: Callable[[Any], str] = str, **kwargs):
+        """
+        Configure the writer.
+
+        Args:
+            stream: The text stream to write to.
+            formatter: Converts an item to its output line (without newline).
+        """
+        super().__init__(**kwargs)
+        self.stream = stream
+        self.formatter = formatter
+
+    def process_batch(self, items: List[Any]) -> List[Any]:
+        self.stream.write(''.join(self.formatter(item) + '\n' for item in items))
+        return []
+
+
+def read_chunks(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Read a plain or compressed archive in chunks, as input for a FrameStage.
+
+    Args:
+        path: The archive file to read.
+        chunk_size: The chunk size in bytes.
+
+    Yields:
+        bytes: Consecutive decompressed chunks.
+    """
+    with open_archive(path) as fh:
+        while True:
+            chunk = fh.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+class _StageRunner:
+    """Runs one non-inline stage together with the inline stages fused after it."""
+
+    def __init__(self, stage: Stage, fused: List[Stage]):
+        self.stage = stage
+        self.fused = fused
+        self.queue: queue.Queue = queue.Queue(maxsize=stage.queue_size)
+        self.downstream: Optional['_StageRunner'] = None
+        self.metrics = {s.name: {'items_in': 0, 'items_out': 0, 'batches': 0, 'busy_seconds': 0.0}
+                        for s in [stage] + fused}
+        self.max_queue_depth = 0
+        self.threads: List[threading.Thread] = []
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._active = stage.workers
+
+    def put(self, batch: Any) -> None:
+        self.queue.put(batch)
+        depth = self.queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+
+
+class Pipeline:
+    """A chain of stages connected by bounded queues."""
+
+    def __init__(self, stages: Iterable[Stage]):
+        """
+        Build the pipeline.
+
+        Args:
+            stages: The stages in processing order. The first stage may not be inline.
+
+        Raises:
+            ValueError: If there are no stages or the first stage is inline, or
+                when ``run`` fuses a stateful inline stage after a parallel stage.
+        """
+        self.stages = list(stages)
+        if not self.stages:
+            raise ValueError("A pipeline needs at least one stage")
+        if self.stages[0].mode == 'inline':
+            raise ValueError("The first stage of a pipeline cannot be inline")
+        self._runners: List[_StageRunner] = []
+        self._errors: List[BaseException] = []
+        self._outputs: List[Any] = []
+        self._elapsed = 0.0
+
+    def run(self, source: Iterable[Any]) -> List[Any]:
+        """
+        Feed every item of ``source`` through the pipeline and wait for completion.
+
+        Args:
+            source: The input items of the first stage.
+
+        Returns:
+            List[Any]: The items produced by the last stage.
+
+        Raises:
+            Exception: The first exception raised by any stage.
+        """
+        self._build()
+        self._errors = []
+        self._outputs = []
+        start = time.perf_counter()
+        for runner in self._runners:
+            self._start(runner)
+
+        first = self._runners[0]
+        batch = []
+        for item in source:
+            batch.append(item)
+            if len(batch) >= first.stage.batch_size:
+                first.put(batch)
+                batch = []
+        if batch:
+            first.put(batch)
+        for _ in range(first.stage.workers):
+            first.put(_END)
+
+        for runner in self._runners:
+            for thread in runner.threads:
+                thread.join()
+            if runner.executor is not None:
+                runner.executor.shutdown()
+        self._elapsed = time.perf_counter() - start
+        if self._errors:
+            raise self._errors[0]
+        return self._outputs
+
+    def metrics(self) -> Dict[str, Dict[str, float]]:
+        """
+        Return per-stage metrics from the last run.
+
+        Returns:
+            Dict[str, Dict[str, float]]: For each stage name: items in and out,
+            batches, busy seconds, items per busy second, and for queued stages
+            the maximum input queue depth in batches.
+        """
+        metrics = {'pipeline': {'elapsed_seconds': self._elapsed}}
+        for runner in self._runners:
+            for name, stage_metrics in runner.metrics.items():
+                stage_metrics = dict(stage_metrics)
+                busy = stage_metrics['busy_seconds']
+                stage_metrics['items_per_second'] = stage_metrics['items_in'] / busy if busy > 0 else 0.0
+                if name == runner.stage.name:
+                    stage_metrics['max_queue_depth'] = runner.max_queue_depth
+                metrics[name] = stage_metrics
+        return metrics
+
+    def _build(self) -> None:
+        """Group inline stages with the queued stage before them."""
+        self._runners = []
+        for stage in self.stages:
+            if stage.mode == 'inline':
+                parent = self._runners[-1].stage
+                if stage.stateful and (parent.mode == 'process' or parent.workers > 1):
+                    raise ValueError(f"{stage.name} keeps state and cannot be fused after a parallel stage")
+                self._runners[-1].fused.append(stage)
+                self._runners[-1].metrics[stage.name] = {
+                    'items_in': 0, 'items_out': 0, 'batches': 0, 'busy_seconds': 0.0}
+            else:
+                self._runners.append(_StageRunner(stage, []))
+        for upstream, downstream in zip(self._runners, self._runners[1:]):
+            upstream.downstream = downstream
+
+    def _start(self, runner: _StageRunner) -> None:
+        if runner.stage.mode == 'process':
+            runner.executor = ProcessPoolExecutor(max_workers=runner.stage.workers)
+        for i in range(runner.stage.workers):
+            thread = threading.Thread(target=self._work, args=(runner,),
+                                      name=f'{runner.stage.name}-{i}', daemon=True)
+            runner.threads.append(thread)
+            thread.start()
+
+    def _apply(self, runner: _StageRunner, stage: Stage, items: List[Any], finishing: bool) -> List[Any]:
+        """Run one stage on a batch, recording its metrics."""
+        start = time.perf_counter()
+        if finishing:
+            output = stage.finish()
+        elif runner.executor is not None and stage is runner.stage:
+            output = runner.executor.submit(stage.process_batch, items).result()
+        else:
+            output = stage.process_batch(items)
+        elapsed = time.perf_counter() - start
+        with runner._lock:
+            metrics = runner.metrics[stage.name]
+            metrics['items_in'] += len(items)
+            metrics['items_out'] += len(output)
+            metrics['batches'] += 0 if finishing else 1
+            metrics['busy_seconds'] += elapsed
+        return output
+
+    def _emit(self, runner: _StageRunner, items: List[Any]) -> None:
+        """Pass a stage's output to the next queued stage, or collect it."""
+        if not items:
+            return
+        downstream = runner.downstream
+        if downstream is None:
+            with runner._lock:
+                self._outputs.extend(items)
+            return
+        size = downstream.stage.batch_size
+        for i in range(0, len(items), size):
+            downstream.put(items[i:i + size])
+
+    def _run_chain(self, runner: _StageRunner, items: List[Any], finishing: bool) -> List[Any]:
+        """Run the queued stage and its fused inline stages on a batch."""
+        items = self._apply(runner, runner.stage, items, finishing)
+        for stage in runner.fused:
+            items = self._apply(runner, stage, items, False) if items else items
+            if finishing:
+                items = items + self._apply(runner, stage, [], True)
+        return items
+
+    def _work(self, runner: _StageRunner) -> None:
+        while True:
+            batch = runner.queue.get()
+            if batch is _END:
+                break
+            if self._errors:
+                continue  # Drain without processing so upstream stages never block
+            try:
+                self._emit(runner, self._run_chain(runner, batch, False))
+            except Exception as e:  # noqa: BLE001 - reported by run()
+                self._errors.append(e)
+
+        with runner._lock:
+            runner._active -= 1
+            last = runner._active == 0
+        if last:
+            if not self._errors:
+                try:
+                    self._emit(runner, self._run_chain(runner, [], True))
+                except Exception as e:  # noqa: BLE001 - reported by run()
+                    self._errors.append(e)
+            if runner.downstream is not None:
+                for _ in range(runner.downstream.stage.workers):
+                    runner.downstream.put(_END)
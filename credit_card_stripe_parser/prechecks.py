@@ -0,0 +1,232 @@
+"""
+Early rejection of swipes that fail authorization pre-checks.
+
+Front ends drop swipes whose PAN fails the Luhn check, whose card has
+expired, or whose service code or format code is not accepted. During
+card-testing bursts most swipes are such rejects, so PreCheckedParser runs
+these checks on the raw swipe before parsing it. Each check reads
+characters at the field offsets of the raw string; no slice, field string
+or model object is created for a rejected swipe.
+
+The PAN, expiry date and service code are read from Track 2 when it is
+present, else from Track 1. Swipes whose fields cannot be located are not
+rejected here; they are passed to the parser, which reports them as usual.
+"""
+import datetime
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, List, Optional, Sequence
+
+from .card_utils import luhn_valid_span
+from .decode_tables import decode_service_code, month_index
+from .exceptions import CreditCardStripeError, RejectedSwipeError
+from .full_track_parser import FullTrackParser
+from .models import FullTrackDataModel
+
+# Rejection reasons, in the order the checks run
+FORMAT_CODE = 'format_code'
+SERVICE_CODE = 'service_code'
+EXPIRY = 'expiry'
+LUHN = 'luhn'
+
+REASONS = (FORMAT_CODE, SERVICE_CODE, EXPIRY, LUHN)
+
+
+@dataclass(frozen=True)
+class PreChecks:
+    """
+    The checks a swipe must pass before it is parsed.
+
+    Attributes:
+        luhn (bool): Whether the PAN must pass the Luhn check.
+        reference_date (Optional[datetime.date]): If set, cards that expired
+            before this date's month are rejected, as are invalid expiry dates.
+        service_codes (Optional[FrozenSet[str]]): If set, the accepted service codes.
+        format_codes (Optional[FrozenSet[str]]): If set, the accepted Track 1
+            format codes. Swipes without Track 1 have no format code and are
+            not checked.
+    """
+    luhn: bool = True
+    reference_date: Optional[datetime.date] = None
+    service_codes: Optional[FrozenSet[str]] = None
+    format_codes: Optional[FrozenSet[str]] = None
+
+    def validate(self) -> None:
+        """
+        Check the configuration.
+
+        Raises:
+            ValueError: If a service code is not three digits or a format code
+                is not a single character.
+        """
+        for code in self.service_codes or ():
+            if decode_service_code(code) is None:
+                raise ValueError(f"Service codes must be three digits: {code!r}")
+        for code in self.format_codes or ():
+            if len(code) != 1:
+                raise ValueError(f"Format codes must be single characters: {code!r}")
+
+
+@dataclass
+class PreCheckedBatch:
+    """
+    The outcome of a pre-checked batch.
+
+    Attributes:
+        results (List[Optional[FullTrackDataModel]]): One result per swipe, in
+            input order; None for rejected swipes and swipes the parser rejected.
+        rejected (Dict[int, str]): The rejection reason of each rejected swipe.
+        errors (Dict[int, str]): The parser's error class name for each swipe
+            that passed the checks but failed to parse.
+    """
+    results: List[Optional[FullTrackDataModel]]
+    rejected: Dict[int, str] = field(default_factory=dict)
+    errors: Dict[int, str] = field(default_factory=dict)
+
+
+def _digits(text: str, start: int, count: int) -> int:
+    """Return the value of ``count`` ASCII digits at ``start``, or -1 if any is not a digit."""
+    value = 0
+    for index in range(start, start + count):
+        digit = ord(text[index]) - 48
+        if not 0 <= digit <= 9:
+            return -1
+        value = value * 10 + digit
+    return value
+
+
+class PreCheckedParser:
+    """
+    Rejects swipes that fail the pre-checks and parses the rest.
+
+    ``stats`` counts the swipes checked and accepted and the rejections per
+    reason. Like the parser, an instance can be shared between threads; the
+    counters may then undercount slightly.
+    """
+
+    def __init__(self, checks: PreChecks, parser: Optional[FullTrackParser] = None):
+        """
+        Compile the checks.
+
+        Args:
+            checks: The checks to run.
+            parser: The parser for accepted swipes, whose sentinels are also
+                used to locate fields (a default FullTrackParser if omitted).
+
+        Raises:
+            ValueError: If the checks are misconfigured.
+        """
+        checks.validate()
+        self.checks = checks
+        self.parser = parser if parser is not None else FullTrackParser()
+        self.stats: Dict[str, int] = dict.fromkeys(('checked', 'accepted') + REASONS, 0)
+        self._ss1 = self.parser._SS1
+        self._fs1 = self.parser._FS1
+        self._ss2 = self.parser._SS2
+        self._fs2 = self.parser._FS2
+        self._luhn = checks.luhn
+        self._reference_month = month_index(checks.reference_date) if checks.reference_date else None
+        self._service_codes = (frozenset(int(code) for code in checks.service_codes)
+                               if checks.service_codes is not None else None)
+        self._format_codes = checks.format_codes
+        self._needs_fields = (self._luhn or self._reference_month is not None
+                              or self._service_codes is not None)
+
+    def check(self, raw: str) -> Optional[str]:
+        """
+        Run the checks on a raw swipe.
+
+        Args:
+            raw: The raw swipe.
+
+        Returns:
+            Optional[str]: The first failed check's reason, or None if the swipe passes.
+        """
+        stats = self.stats
+        stats['checked'] += 1
+        reason = self._first_failure(raw)
+        stats[reason or 'accepted'] += 1
+        return reason
+
+    def _first_failure(self, raw: str) -> Optional[str]:
+        track_one = raw.find(self._ss1)
+        if self._format_codes is not None and 0 <= track_one < len(raw) - 1:
+            if raw[track_one + 1] not in self._format_codes:
+                return FORMAT_CODE
+        if not self._needs_fields:
+            return None
+        # Locate the PAN as [pan_start, separator) and the expiry date at separator + 1
+        start = raw.find(self._ss2)
+        separator = raw.find(self._fs2, start + 1) if start >= 0 else -1
+        if separator >= 0:
+            pan_start, expiry_start = start + 1, separator + 1
+        elif track_one >= 0:
+            # Track 1: format code, PAN, separator, name, separator, expiry date
+            separator = raw.find(self._fs1, track_one + 2)
+            name_end = raw.find(self._fs1, separator + 1) if separator >= 0 else -1
+            if name_end < 0:
+                return None
+            pan_start, expiry_start = track_one + 2, name_end + 1
+        else:
+            return None
+        if expiry_start + 7 > len(raw):
+            return None
+        if self._service_codes is not None and _digits(raw, expiry_start + 4, 3) not in self._service_codes:
+            return SERVICE_CODE
+        if self._reference_month is not None:
+            yymm = _digits(raw, expiry_start, 4)
+            month = yymm % 100
+            if yymm < 0 or not 1 <= month <= 12 or (yymm // 100) * 12 + month - 1 < self._reference_month:
+                return EXPIRY
+        if self._luhn and not luhn_valid_span(raw, pan_start, separator):
+            return LUHN
+        return None
+
+    def parse(self, raw: str) -> FullTrackDataModel:
+        """
+        Check and parse a raw swipe.
+
+        Args:
+            raw: The raw swipe.
+
+        Returns:
+            FullTrackDataModel: The parsed swipe.
+
+        Raises:
+            RejectedSwipeError: If the swipe fails a check; its ``reason`` is
+                the failed check.
+            InvalidTrackOneError: If there's an error parsing Track 1 data.
+            InvalidTrackTwoError: If there's an error parsing Track 2 data.
+        """
+        reason = self.check(raw)
+        if reason is not None:
+            raise RejectedSwipeError(reason)
+        return self.parser.parse(raw)
+
+    def filter(self, raw_swipes: Sequence[str]) -> List[str]:
+        """Return the raw swipes that pass the checks, in input order."""
+        check = self.check
+        return [raw for raw in raw_swipes if check(raw) is None]
+
+    def parse_batch(self, raw_swipes: Sequence[str]) -> PreCheckedBatch:
+        """
+        Check a batch and parse the swipes that pass.
+
+        Args:
+            raw_swipes: The raw swipes.
+
+        Returns:
+            PreCheckedBatch: The results, rejection reasons and parse errors.
+        """
+        check, parse = self.check, self.parser.parse
+        batch = PreCheckedBatch(results=[None] * len(raw_swipes))
+        results = batch.results
+        for index, raw in enumerate(raw_swipes):
+            reason = check(raw)
+            if reason is not None:
+                batch.rejected[index] = reason
+                continue
+            try:
+                results[index] = parse(raw)
+            except CreditCardStripeError as e:
+                batch.errors[index] = type(e).__name__
+        return batch
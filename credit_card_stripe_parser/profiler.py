@@ -0,0 +1,223 @@
+"""
+Built-in sampling profiler for the parse path.
+
+SamplingProfiler runs a background thread that periodically captures the
+Python stack of every other thread with ``sys._current_frames()``. Nothing is
+hooked into the parser itself, so the profiler costs nothing while it is not
+running and can stay in production builds; while it runs, the cost is one
+stack walk per thread per sample.
+
+Results are written as:
+
+* collapsed stacks (one ``frame;frame;frame count`` line per distinct stack),
+  the input format of flamegraph.pl, speedscope and inferno;
+* a per-function summary of self and total time.
+
+Only threads of the current process are sampled; profile worker processes
+by running a profiler inside each worker. The HTTP service and load
+generator CLIs accept ``--profile PREFIX`` to profile a whole run.
+"""
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Modules whose frames at the top of a stack mean the thread is waiting, not working
+_IDLE_MODULES = frozenset({'threading', 'queue', 'selectors', 'socket', 'asyncio.base_events',
+                           'concurrent.futures.thread', 'multiprocessing.connection'})
+
+
+@dataclass
+class FunctionStats:
+    """
+    Sampled time of one function.
+
+    Attributes:
+        function (str): The function, as ``module:qualified name``.
+        self_samples (int): Samples with the function at the top of the stack.
+        total_samples (int): Samples with the function anywhere on the stack.
+        self_seconds (float): Estimated time spent in the function itself.
+        total_seconds (float): Estimated time spent in the function and its callees.
+    """
+    function: str
+    self_samples: int
+    total_samples: int
+    self_seconds: float
+    total_seconds: float
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    name = getattr(code, 'co_qualname', code.co_name)
+    module = frame.f_globals.get('__name__', '?')
+    return f"{module}:{name}".replace(';', ':').replace(' ', '_')
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of running threads at a fixed frequency.
+
+    Use it as a context manager, or call ``start()`` and ``stop()``.
+    """
+
+    def __init__(self, frequency: float = 200.0, include_idle: bool = False, max_depth: int = 256):
+        """
+        Configure the profiler.
+
+        Args:
+            frequency: Samples per second.
+            include_idle: Whether to keep samples of threads that are waiting
+                (blocked in threading, queue, selectors and similar modules).
+            max_depth: The maximum number of frames kept per stack.
+
+        Raises:
+            ValueError: If the frequency is not positive.
+        """
+        if frequency <= 0:
+            raise ValueError("Sampling frequency must be positive")
+        self.interval = 1.0 / frequency
+        self.include_idle = include_idle
+        self.max_depth = max_depth
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.ticks = 0
+        self.elapsed = 0.0
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        """Whether the sampling thread is running."""
+        return self._thread is not None
+
+    def start(self) -> None:
+        """Start sampling in a background thread."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling and wait for the sampling thread to exit."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def __enter__(self) -> 'SamplingProfiler':
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        started = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            self._sample(own)
+        self.elapsed += time.perf_counter() - started
+
+    def _sample(self, own: int) -> None:
+        """Record the current stack of every other thread."""
+        self.ticks += 1
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own:
+                continue
+            if not self.include_idle and frame.f_globals.get('__name__') in _IDLE_MODULES:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stack.reverse()
+            self.stacks[tuple(stack)] += 1
+            self.samples += 1
+
+    @property
+    def seconds_per_sample(self) -> float:
+        """The measured time between samples."""
+        return self.elapsed / self.ticks if self.ticks else self.interval
+
+    def collapsed(self) -> str:
+        """Return the samples as collapsed stacks, most frequent first."""
+        return ''.join(f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self, limit: Optional[int] = None) -> List[FunctionStats]:
+        """
+        Summarize the samples per function.
+
+        Args:
+            limit: The number of functions to return (all if omitted).
+
+        Returns:
+            List[FunctionStats]: The functions, by descending self time.
+        """
+        self_counts: Dict[str, int] = Counter()
+        total_counts: Dict[str, int] = Counter()
+        for stack, count in self.stacks.items():
+            self_counts[stack[-1]] += count
+            for function in set(stack):
+                total_counts[function] += count
+        period = self.seconds_per_sample
+        stats = [FunctionStats(function, self_counts.get(function, 0), total, self_counts.get(function, 0) * period,
+                               total * period)
+                 for function, total in total_counts.items()]
+        stats.sort(key=lambda s: (-s.self_samples, -s.total_samples, s.function))
+        return stats[:limit] if limit is not None else stats
+
+    def format_summary(self, limit: Optional[int] = 40) -> str:
+        """Return the per-function summary as a text table."""
+        lines = [f"{'self s':>9} {'self %':>7} {'total s':>9} {'total %':>7}  function"]
+        samples = self.samples or 1
+        for s in self.summary(limit):
+            lines.append(f"{s.self_seconds:9.3f} {100 * s.self_samples / samples:6.1f}% "
+                         f"{s.total_seconds:9.3f} {100 * s.total_samples / samples:6.1f}%  {s.function}")
+        return '\n'.join(lines) + '\n'
+
+    def write(self, prefix: str) -> Tuple[str, str]:
+        """
+        Write ``<prefix>.collapsed`` and ``<prefix>.summary.txt``.
+
+        Args:
+            prefix: The output path prefix.
+
+        Returns:
+            Tuple[str, str]: The paths of the collapsed-stack and summary files.
+        """
+        collapsed_path = prefix + '.collapsed'
+        summary_path = prefix + '.summary.txt'
+        with open(collapsed_path, 'w', encoding='utf-8') as fh:
+            fh.write(self.collapsed())
+        with open(summary_path, 'w', encoding='utf-8') as fh:
+            fh.write(self.format_summary(limit=None))
+        return collapsed_path, summary_path
+
+
+@contextmanager
+def profiled(prefix: Optional[str], frequency: float = 200.0) -> Iterator[Optional[SamplingProfiler]]:
+    """
+    Profile the enclosed block and write the results, or do nothing if ``prefix`` is None.
+
+    Args:
+        prefix: The output path prefix passed to ``SamplingProfiler.write``.
+        frequency: Samples per second.
+
+    Yields:
+        Optional[SamplingProfiler]: The running profiler, or None when disabled.
+    """
+    if prefix is None:
+        yield None
+        return
+    profiler = SamplingProfiler(frequency=frequency)
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        profiler.write(prefix)
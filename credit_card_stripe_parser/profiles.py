@@ -0,0 +1,231 @@
+"""
+Declarative reader profiles for vendor-specific track layouts.
+
+Some readers use different sentinels or field separators, emit CR/LF between
+tracks, prefix each swipe with a device header or pad it with NUL bytes. A
+ReaderProfile describes such a layout declaratively. Compiling it produces:
+
+* a FullTrackParser subclass whose sentinel and length-limit class constants
+  are overridden, so parsing itself runs the unmodified code paths; and
+* a parse function that chains only the preprocessing steps the profile
+  needs (header skip, character removal, trailer stripping), selected once
+  at compile time so no per-swipe branching is added.
+
+Compiled parsers also plug into StreamParser, which reads its sentinels from
+the parser it wraps.
+"""
+import functools
+from dataclasses import dataclass
+from typing import Callable, Dict, List
+
+from .full_track_parser import FullTrackParser
+from .models import FullTrackDataModel
+
+
+class ProfileError(ValueError):
+    """Raised when a reader profile is inconsistent."""
+    pass
+
+
+@dataclass(frozen=True)
+class ReaderProfile:
+    """
+    The track layout produced by a reader model.
+
+    Attributes:
+        name (str): The profile name.
+        track_one_start (str): The Track 1 start sentinel.
+        track_one_separator (str): The Track 1 field separator.
+        track_one_end (str): The Track 1 end sentinel.
+        track_two_start (str): The Track 2 start sentinel.
+        track_two_separator (str): The Track 2 field separator.
+        track_two_end (str): The Track 2 end sentinel.
+        max_track_one_length (int): The maximum Track 1 length between sentinels.
+        max_track_two_length (int): The maximum Track 2 length between sentinels.
+        header_length (int): The length of a fixed-size device header to skip.
+        header_delimiter (str): If set, everything up to and including its
+            first occurrence is skipped as a device header.
+        removed_characters (str): Characters removed anywhere in the swipe,
+            e.g. CR/LF emitted between tracks.
+        trailer_characters (str): Characters stripped from the end of the
+            swipe, e.g. NUL padding.
+    """
+    name: str = 'default'
+    track_one_start: str = FullTrackParser._SS1
+    track_one_separator: str = FullTrackParser._FS1
+    track_one_end: str = FullTrackParser._ES1
+    track_two_start: str = FullTrackParser._SS2
+    track_two_separator: str = FullTrackParser._FS2
+    track_two_end: str = FullTrackParser._ES2
+    max_track_one_length: int = FullTrackParser._MAX_TRACK1_LEN
+    max_track_two_length: int = FullTrackParser._MAX_TRACK2_LEN
+    header_length: int = 0
+    header_delimiter: str = ''
+    removed_characters: str = ''
+    trailer_characters: str = ''
+
+    def problems(self) -> List[str]:
+        """Return a description of every inconsistency in the profile."""
+        problems = []
+        sentinels = {
+            'track_one_start': self.track_one_start, 'track_one_separator': self.track_one_separator,
+            'track_one_end': self.track_one_end, 'track_two_start': self.track_two_start,
+            'track_two_separator': self.track_two_separator, 'track_two_end': self.track_two_end,
+        }
+        for name, value in sentinels.items():
+            if len(value) != 1:
+                problems.append(f"{name} must be a single character")
+        for track in ('track_one', 'track_two'):
+            values = [sentinels[f'{track}_{part}'] for part in ('start', 'separator', 'end')]
+            if len(set(values)) != 3:
+                problems.append(f"{track} sentinels and separator must be distinct")
+        if self.track_one_start == self.track_two_start:
+            problems.append("track_one_start and track_two_start must differ")
+        for name, value in (('max_track_one_length', self.max_track_one_length),
+                            ('max_track_two_length', self.max_track_two_length)):
+            if value < 1:
+                problems.append(f"{name} must be positive")
+        if self.header_length < 0:
+            problems.append("header_length must not be negative")
+        if self.header_length and self.header_delimiter:
+            problems.append("header_length and header_delimiter are mutually exclusive")
+        for name, characters in (('header_delimiter', self.header_delimiter),
+                                 ('removed_characters', self.removed_characters),
+                                 ('trailer_characters', self.trailer_characters)):
+            clashes = sorted(set(characters) & set(sentinels.values()))
+            if clashes:
+                problems.append(f"{name} must not contain sentinels: {''.join(clashes)!r}")
+        return problems
+
+    def validate(self) -> None:
+        """
+        Check the profile for consistency.
+
+        Raises:
+            ProfileError: If the profile is inconsistent.
+        """
+        problems = self.problems()
+        if problems:
+            raise ProfileError(f"Invalid reader profile {self.name!r}: " + '; '.join(problems))
+
+    def compile(self) -> 'CompiledProfile':
+        """Validate the profile and compile it (cached per profile)."""
+        return compile_profile(self)
+
+
+class CompiledProfile:
+    """
+    A reader profile compiled into a specialized parser.
+
+    Attributes:
+        profile (ReaderProfile): The source profile.
+        parser (FullTrackParser): A parser with the profile's sentinels and length limits.
+        preprocess (Callable[[str], str]): Normalizes a raw swipe for ``parser``.
+        parse (Callable[[str], FullTrackDataModel]): Preprocesses and parses a raw swipe.
+    """
+
+    def __init__(self, profile: ReaderProfile):
+        profile.validate()
+        self.profile = profile
+        parser_class = type(f'{_class_name(profile.name)}TrackParser', (FullTrackParser,), {
+            '__doc__': f"FullTrackParser for the {profile.name!r} reader profile.",
+            '_SS1': profile.track_one_start,
+            '_FS1': profile.track_one_separator,
+            '_ES1': profile.track_one_end,
+            '_SS2': profile.track_two_start,
+            '_FS2': profile.track_two_separator,
+            '_ES2': profile.track_two_end,
+            '_MAX_TRACK1_LEN': profile.max_track_one_length,
+            '_MAX_TRACK2_LEN': profile.max_track_two_length,
+            # Pickle by profile, so profile parsers can be sent to worker processes
+            '__reduce__': lambda parser: (_profile_parser, (profile,)),
+        })
+        self.parser = parser_class()
+        self.preprocess = _build_preprocess(profile)
+        if self.preprocess is str:
+            self.parse = self.parser.parse
+        else:
+            parse, preprocess = self.parser.parse, self.preprocess
+            self.parse = lambda raw: parse(preprocess(raw))
+
+    def parse_many(self, raw_swipes: List[str]) -> List[FullTrackDataModel]:
+        """Preprocess and parse several raw swipes."""
+        parse = self.parse
+        return [parse(raw) for raw in raw_swipes]
+
+
+def _profile_parser(profile: ReaderProfile) -> FullTrackParser:
+    return compile_profile(profile).parser
+
+
+def _class_name(name: str) -> str:
+    return ''.join(part.capitalize() for part in name.replace('-', '_').split('_') if part.isidentifier())
+
+
+def _steps(profile: ReaderProfile) -> List[Callable[[str], str]]:
+    """Return the preprocessing steps the profile needs, in order."""
+    steps = []
+    if profile.header_length:
+        length = profile.header_length
+        steps.append(lambda raw: raw[length:])
+    elif profile.header_delimiter:
+        delimiter = profile.header_delimiter
+        steps.append(lambda raw: raw.partition(delimiter)[2] or raw)
+    for character in profile.removed_characters:
+        # str.replace is several times faster than str.translate for a few characters
+        steps.append(lambda raw, character=character: raw.replace(character, ''))
+    if profile.trailer_characters:
+        trailer = profile.trailer_characters
+        steps.append(lambda raw: raw.rstrip(trailer))
+    return steps
+
+
+def _build_preprocess(profile: ReaderProfile) -> Callable[[str], str]:
+    """Compose the profile's preprocessing steps into one function (``str`` if there are none)."""
+    steps = _steps(profile)
+    if not steps:
+        return str
+    if len(steps) == 1:
+        return steps[0]
+    return functools.reduce(lambda inner, outer: lambda raw: outer(inner(raw)), steps)
+
+
+@functools.lru_cache(maxsize=None)
+def compile_profile(profile: ReaderProfile) -> CompiledProfile:
+    """
+    Validate and compile a reader profile. Results are cached per profile.
+
+    Args:
+        profile: The reader profile.
+
+    Returns:
+        CompiledProfile: The compiled profile.
+
+    Raises:
+        ProfileError: If the profile is inconsistent.
+    """
+    return CompiledProfile(profile)
+
+
+DEFAULT_PROFILE = ReaderProfile()
+
+PROFILES: Dict[str, ReaderProfile] = {
+    'default': DEFAULT_PROFILE,
+    'crlf': ReaderProfile(name='crlf', removed_characters='\r\n'),
+    'nul_padded': ReaderProfile(name='nul_padded', trailer_characters='\0'),
+    'device_header': ReaderProfile(name='device_header', header_delimiter='|', removed_characters='\r\n',
+                                   trailer_characters='\0'),
+}
+
+
+def get_profile(name: str) -> ReaderProfile:
+    """
+    Return a built-in reader profile.
+
+    Args:
+        name: The profile name; see ``PROFILES``.
+
+    Raises:
+        KeyError: If there is no such profile.
+    """
+    return PROFILES[name]
@@ -0,0 +1,263 @@
+"""
+Reconciliation of terminal swipe logs against processor settlement records.
+
+Both sides are matched on the (PAN, expiration date) key and then on amount:
+
+* ``matched``: a swipe and a settlement with the same key and amount;
+* ``mismatched``: a swipe and a settlement with the same key but different amounts;
+* ``missing_settlement``: a swipe without any settlement for its key;
+* ``missing_swipe``: a settlement without any swipe for its key.
+
+The settlement side is loaded into an in-memory hash index and the swipe side
+is streamed through it. When the settlement side exceeds ``max_in_memory``
+records, both sides are instead spilled to sorted runs on disk and joined with
+a streaming merge, so memory stays bounded for inputs of any size.
+"""
+import heapq
+import itertools
+import os
+import pickle
+import tempfile
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+from .models import FullTrackDataModel
+
+MATCHED = 'matched'
+MISMATCHED = 'mismatched'
+MISSING_SETTLEMENT = 'missing_settlement'
+MISSING_SWIPE = 'missing_swipe'
+
+
+@dataclass
+class SettlementRecord:
+    """
+    A processor settlement record.
+
+    Attributes:
+        pan (str): The Primary Account Number.
+        expiration_date (str): The card's expiration date in YYMM format.
+        amount (int): The settled amount, in minor currency units.
+        reference (str): The processor's reference for the record.
+    """
+    pan: str
+    expiration_date: str
+    amount: int
+    reference: str = ''
+
+
+@dataclass
+class ReconciliationItem:
+    """
+    One outcome of a reconciliation.
+
+    Attributes:
+        status (str): One of ``matched``, ``mismatched``, ``missing_settlement`` or ``missing_swipe``.
+        swipe (Optional[FullTrackDataModel]): The parsed swipe, if any.
+        swipe_amount (Optional[int]): The amount logged with the swipe, if any.
+        settlement (Optional[SettlementRecord]): The settlement record, if any.
+    """
+    status: str
+    swipe: Optional[FullTrackDataModel]
+    swipe_amount: Optional[int]
+    settlement: Optional[SettlementRecord]
+
+
+def swipe_key(result: FullTrackDataModel) -> Optional[Tuple[str, str]]:
+    """
+    Return the (PAN, expiration date) join key of a parsed swipe.
+
+    Args:
+        result: The parsed swipe.
+
+    Returns:
+        Optional[Tuple[str, str]]: The key, taken from Track 2 when present,
+        else from Track 1, or None if neither track was parsed.
+    """
+    track = result.track_two or result.track_one
+    if track is None:
+        return None
+    return track.pan, track.expiration_date
+
+
+def _match_group(swipes: List[Tuple[FullTrackDataModel, Any]],
+                 settlements: List[SettlementRecord]) -> Iterator[ReconciliationItem]:
+    """Match the swipes and settlements that share one key."""
+    by_amount: Dict[Hashable, List[SettlementRecord]] = {}
+    for settlement in settlements:
+        by_amount.setdefault(settlement.amount, []).append(settlement)
+    unmatched = []
+    for swipe, amount in swipes:
+        candidates = by_amount.get(amount)
+        if candidates:
+            yield ReconciliationItem(MATCHED, swipe, amount, candidates.pop())
+        else:
+            unmatched.append((swipe, amount))
+    leftovers = [s for group in by_amount.values() for s in group]
+    for i in range(max(len(unmatched), len(leftovers))):
+        swipe, amount = unmatched[i] if i < len(unmatched) else (None, None)
+        settlement = leftovers[i] if i < len(leftovers) else None
+        if swipe is None:
+            yield ReconciliationItem(MISSING_SWIPE, None, None, settlement)
+        elif settlement is None:
+            yield ReconciliationItem(MISSING_SETTLEMENT, swipe, amount, None)
+        else:
+            yield ReconciliationItem(MISMATCHED, swipe, amount, settlement)
+
+
+class Reconciler:
+    """
+    A memory-bounded hash-join reconciliation engine.
+
+    After a run, ``counts`` holds the number of items per status and
+    ``spilled_runs`` the number of sorted runs written to disk.
+    """
+
+    def __init__(self, max_in_memory: int = 1_000_000, spill_dir: Optional[str] = None):
+        """
+        Configure the reconciler.
+
+        Args:
+            max_in_memory: The maximum number of records held in memory per side
+                before spilling to sorted runs on disk.
+            spill_dir: The directory for spill files (the system temporary directory if omitted).
+        """
+        self.max_in_memory = max_in_memory
+        self.spill_dir = spill_dir
+        self.counts: Dict[str, int] = {}
+        self.spilled_runs = 0
+
+    def reconcile(self, swipes: Iterable[Tuple[FullTrackDataModel, Any]],
+                  settlements: Iterable[SettlementRecord]) -> Iterator[ReconciliationItem]:
+        """
+        Reconcile swipes against settlements, yielding every outcome.
+
+        Swipes without a parsed track have no key and are reported as
+        ``missing_settlement``.
+
+        Args:
+            swipes: ``(parsed swipe, amount)`` pairs from the terminal logs.
+            settlements: The settlement records.
+
+        Yields:
+            ReconciliationItem: Each matched, mismatched or missing record.
+        """
+        self.counts = {MATCHED: 0, MISMATCHED: 0, MISSING_SETTLEMENT: 0, MISSING_SWIPE: 0}
+        self.spilled_runs = 0
+        with tempfile.TemporaryDirectory(dir=self.spill_dir, prefix='reconcile-') as tmp_dir:
+            for item in self._reconcile(swipes, settlements, tmp_dir):
+                self.counts[item.status] += 1
+                yield item
+
+    def _reconcile(self, swipes: Iterable[Tuple[FullTrackDataModel, Any]],
+                   settlements: Iterable[SettlementRecord], tmp_dir: str) -> Iterator[ReconciliationItem]:
+        index: Dict[Tuple[str, str], List[SettlementRecord]] = {}
+        settlement_runs: List[str] = []
+        loaded = 0
+        for settlement in settlements:
+            index.setdefault((settlement.pan, settlement.expiration_date), []).append(settlement)
+            loaded += 1
+            if loaded >= self.max_in_memory:
+                settlement_runs.append(self._spill_index(index, tmp_dir))
+                index = {}
+                loaded = 0
+
+        if settlement_runs:
+            if index:
+                settlement_runs.append(self._spill_index(index, tmp_dir))
+            yield from self._merge_join(swipes, settlement_runs, tmp_dir)
+        else:
+            yield from self._hash_join(swipes, index)
+
+    def _hash_join(self, swipes: Iterable[Tuple[FullTrackDataModel, Any]],
+                   index: Dict[Tuple[str, str], List[SettlementRecord]]) -> Iterator[ReconciliationItem]:
+        """Probe the in-memory settlement index with the streamed swipes."""
+        pending: Dict[Tuple[str, str], List[Tuple[FullTrackDataModel, Any]]] = {}
+        for swipe, amount in swipes:
+            key = swipe_key(swipe)
+            candidates = index.get(key)
+            if not candidates:
+                if key in pending:
+                    pending[key].append((swipe, amount))
+                else:
+                    yield ReconciliationItem(MISSING_SETTLEMENT, swipe, amount, None)
+                continue
+            for i, settlement in enumerate(candidates):
+                if settlement.amount == amount:
+                    del candidates[i]
+                    yield ReconciliationItem(MATCHED, swipe, amount, settlement)
+                    break
+            else:
+                pending.setdefault(key, []).append((swipe, amount))
+        for key, group in pending.items():
+            yield from _match_group(group, index.pop(key, []))
+        for settlements in index.values():
+            for settlement in settlements:
+                yield ReconciliationItem(MISSING_SWIPE, None, None, settlement)
+
+    def _merge_join(self, swipes: Iterable[Tuple[FullTrackDataModel, Any]], settlement_runs: List[str],
+                    tmp_dir: str) -> Iterator[ReconciliationItem]:
+        """Spill the swipes to sorted runs and merge-join them with the settlement runs."""
+        swipe_runs = []
+        keyless = []
+        buffer = []
+        for swipe, amount in swipes:
+            key = swipe_key(swipe)
+            if key is None:
+                keyless.append((swipe, amount))
+                continue
+            buffer.append((key, (swipe, amount)))
+            if len(buffer) >= self.max_in_memory:
+                swipe_runs.append(self._spill(sorted(buffer, key=_sort_key), tmp_dir))
+                buffer = []
+        if buffer:
+            swipe_runs.append(self._spill(sorted(buffer, key=_sort_key), tmp_dir))
+        for swipe, amount in keyless:
+            yield ReconciliationItem(MISSING_SETTLEMENT, swipe, amount, None)
+
+        left = itertools.groupby(heapq.merge(*map(_read_run, swipe_runs), key=_sort_key), key=_sort_key)
+        right = itertools.groupby(heapq.merge(*map(_read_run, settlement_runs), key=_sort_key), key=_sort_key)
+        left_group = next(left, None)
+        right_group = next(right, None)
+        while left_group is not None or right_group is not None:
+            if right_group is None or (left_group is not None and left_group[0] < right_group[0]):
+                yield from _match_group([entry for _, entry in left_group[1]], [])
+                left_group = next(left, None)
+            elif left_group is None or right_group[0] < left_group[0]:
+                yield from _match_group([], [entry for _, entry in right_group[1]])
+                right_group = next(right, None)
+            else:
+                yield from _match_group([entry for _, entry in left_group[1]],
+                                        [entry for _, entry in right_group[1]])
+                left_group = next(left, None)
+                right_group = next(right, None)
+
+    def _spill_index(self, index: Dict[Tuple[str, str], List[SettlementRecord]], tmp_dir: str) -> str:
+        """Write the settlement index to a sorted run file and return its path."""
+        return self._spill([(key, record) for key in sorted(index) for record in index[key]], tmp_dir)
+
+    def _spill(self, entries: List[Tuple[Tuple[str, str], Any]], tmp_dir: str) -> str:
+        """Write sorted ``(key, record)`` entries to a run file and return its path."""
+        fd, path = tempfile.mkstemp(dir=tmp_dir, suffix='.run')
+        with os.fdopen(fd, 'wb') as fh:
+            pickler = pickle.Pickler(fh, protocol=pickle.HIGHEST_PROTOCOL)
+            for entry in entries:
+                pickler.dump(entry)
+                pickler.clear_memo()
+        self.spilled_runs += 1
+        return path
+
+
+def _sort_key(entry: Tuple[Tuple[str, str], Any]) -> Tuple[str, str]:
+    return entry[0]
+
+
+def _read_run(path: str) -> Iterator[Tuple[Tuple[str, str], Any]]:
+    """Stream the entries of a run file."""
+    with open(path, 'rb') as fh:
+        unpickler = pickle.Unpickler(fh)
+        while True:
+            try:
+                yield unpickler.load()
+            except EOFError:
+                return
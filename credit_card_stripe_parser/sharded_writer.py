@@ -0,0 +1,253 @@
+"""
+Partitioned output for parse results.
+
+ShardedWriter routes each parse result to one of many output partitions by a
+key function, so a single parsing pass produces output already split for
+each downstream consumer (by BIN prefix, card brand or any other key).
+
+Each shard is a directory of numbered JSON Lines files. Records are buffered
+per shard and written in batches; at most ``max_open_files`` file handles are
+kept open, least recently used first out. Files are written as ``.part``
+files and renamed into place when they are rotated (by size or age) or when
+the writer is closed, so consumers only ever see complete files.
+"""
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from dataclasses import asdict
+from typing import Callable, Dict, IO, Iterable, List, Optional
+
+from .card_utils import card_brand
+from .models import FullTrackDataModel
+
+UNROUTABLE = 'unroutable'
+
+_UNSAFE = re.compile(r'[^A-Za-z0-9_.-]')
+_LEADING_DOTS = re.compile(r'^\.+')
+
+
+def _result_pan(result: FullTrackDataModel) -> Optional[str]:
+    track = result.track_two or result.track_one
+    return track.pan if track is not None else None
+
+
+def bin_key(length: int = 6) -> Callable[[FullTrackDataModel], str]:
+    """
+    Return a key function that partitions by the leading digits of the PAN.
+
+    Args:
+        length: The number of leading PAN digits (6 for the BIN).
+
+    Returns:
+        Callable[[FullTrackDataModel], str]: The key function. Results without
+        a PAN are routed to the ``unroutable`` shard.
+    """
+    def key(result: FullTrackDataModel) -> str:
+        pan = _result_pan(result)
+        return pan[:length] if pan else UNROUTABLE
+    return key
+
+
+def brand_key(result: FullTrackDataModel) -> str:
+    """Partition by card brand; results without a PAN go to the ``unroutable`` shard."""
+    pan = _result_pan(result)
+    return card_brand(pan) if pan else UNROUTABLE
+
+
+def shard_name(key: object) -> str:
+    """
+    Turn a key into a shard name that is safe to use as a directory name.
+
+    Unsafe characters become underscores and leading dots are escaped, so no
+    key can name ``.``, ``..`` or a hidden directory. Keys left without any
+    other character are routed to the ``unroutable`` shard.
+    """
+    name = _UNSAFE.sub('_', str(key))
+    if not name.strip('.'):
+        return UNROUTABLE
+    return _LEADING_DOTS.sub(lambda m: '_' * len(m.group()), name)
+
+
+def json_line(result: FullTrackDataModel) -> str:
+    """Format a parse result as one line of JSON."""
+    return json.dumps(asdict(result), separators=(',', ':'))
+
+
+class _Shard:
+    """The output state of one partition."""
+
+    def __init__(self, name: str, directory: str):
+        self.name = name
+        self.directory = directory
+        self.buffer: List[str] = []
+        self.path: Optional[str] = None
+        self.size = 0
+        self.opened_at = 0.0
+        self.sequence = 0
+
+
+class ShardedWriter:
+    """
+    Routes parse results to partitioned, rotated output files.
+
+    After use, ``completed`` lists the finished files and ``stats`` counts
+    records, file opens, handle evictions and rotations.
+    """
+
+    def __init__(self, directory: str, key: Callable[[FullTrackDataModel], str] = brand_key,
+                 formatter: Callable[[FullTrackDataModel], str] = json_line, buffer_records: int = 1024,
+                 max_open_files: int = 64, rotate_bytes: Optional[int] = None,
+                 rotate_seconds: Optional[float] = None, suffix: str = '.jsonl',
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Configure the writer.
+
+        Args:
+            directory: The output directory; each shard gets a subdirectory.
+            key: Maps a parse result to its shard name (by card brand if omitted).
+            formatter: Converts a parse result to its output line (without newline).
+            buffer_records: The number of records buffered per shard before writing.
+            max_open_files: The maximum number of file handles kept open.
+            rotate_bytes: Start a new file once a shard's file reaches this size.
+            rotate_seconds: Start a new file once a shard's file is this old.
+            suffix: The file name suffix of completed files.
+            clock: The time source for age-based rotation.
+
+        Raises:
+            ValueError: If ``max_open_files`` or ``buffer_records`` is less than 1.
+        """
+        if max_open_files < 1 or buffer_records < 1:
+            raise ValueError("max_open_files and buffer_records must be at least 1")
+        self.directory = directory
+        self.key = key
+        self.formatter = formatter
+        self.buffer_records = buffer_records
+        self.max_open_files = max_open_files
+        self.rotate_bytes = rotate_bytes
+        self.rotate_seconds = rotate_seconds
+        self.suffix = suffix
+        self.clock = clock
+        self.completed: List[str] = []
+        self.stats: Dict[str, int] = {'records': 0, 'opens': 0, 'evictions': 0, 'rotations': 0}
+        self._shards: Dict[str, _Shard] = {}
+        self._handles: 'OrderedDict[str, IO[str]]' = OrderedDict()
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, result: FullTrackDataModel) -> str:
+        """
+        Route a parse result to its shard.
+
+        Args:
+            result: The parsed swipe.
+
+        Returns:
+            str: The name of the shard the result was routed to.
+        """
+        name = shard_name(self.key(result))
+        shard = self._shards.get(name)
+        if shard is None:
+            shard = self._shards[name] = _Shard(name, self._shard_directory(name))
+        shard.buffer.append(self.formatter(result) + '\n')
+        self.stats['records'] += 1
+        if len(shard.buffer) >= self.buffer_records:
+            self._flush_shard(shard)
+        return name
+
+    def write_many(self, results: Iterable[FullTrackDataModel]) -> int:
+        """Route several parse results and return how many were written."""
+        written = 0
+        for result in results:
+            self.write(result)
+            written += 1
+        return written
+
+    def shards(self) -> List[str]:
+        """Return the names of the shards written so far."""
+        return sorted(self._shards)
+
+    def flush(self) -> None:
+        """Write every shard's buffered records to its current file."""
+        for shard in self._shards.values():
+            if shard.buffer:
+                self._flush_shard(shard)
+        for handle in self._handles.values():
+            handle.flush()
+
+    def close(self) -> None:
+        """Write all buffered records and complete every open file."""
+        for shard in self._shards.values():
+            if shard.buffer:
+                self._flush_shard(shard)
+            if shard.path is not None:
+                self._complete(shard)
+
+    def __enter__(self) -> 'ShardedWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def _shard_directory(self, name: str) -> str:
+        """Return a shard's directory, checking that it stays inside the output directory."""
+        directory = os.path.join(self.directory, name)
+        root = os.path.realpath(self.directory)
+        if os.path.dirname(os.path.realpath(directory)) != root:
+            raise ValueError(f"Shard {name!r} resolves outside the output directory")
+        return directory
+
+    def _flush_shard(self, shard: _Shard) -> None:
+        """Write a shard's buffer, rotating its file first if it is due."""
+        if shard.path is not None and self._rotation_due(shard):
+            self._complete(shard)
+            self.stats['rotations'] += 1
+        if shard.path is None:
+            self._start_file(shard)
+        data = ''.join(shard.buffer)
+        shard.buffer = []
+        self._handle(shard).write(data)
+        shard.size += len(data) if data.isascii() else len(data.encode('utf-8'))
+
+    def _rotation_due(self, shard: _Shard) -> bool:
+        if self.rotate_bytes is not None and shard.size >= self.rotate_bytes:
+            return True
+        return self.rotate_seconds is not None and self.clock() - shard.opened_at >= self.rotate_seconds
+
+    def _start_file(self, shard: _Shard) -> None:
+        """Pick the next unused file name of a shard."""
+        os.makedirs(shard.directory, exist_ok=True)
+        while True:
+            final = os.path.join(shard.directory, f"{shard.name}-{shard.sequence:06d}{self.suffix}")
+            shard.sequence += 1
+            if not os.path.exists(final) and not os.path.exists(final + '.part'):
+                break
+        shard.path = final
+        shard.size = 0
+        shard.opened_at = self.clock()
+
+    def _handle(self, shard: _Shard) -> IO[str]:
+        """Return the open handle of a shard's file, opening it (and evicting another) if needed."""
+        handle = self._handles.get(shard.name)
+        if handle is not None:
+            self._handles.move_to_end(shard.name)
+            return handle
+        if len(self._handles) >= self.max_open_files:
+            _, evicted = self._handles.popitem(last=False)
+            evicted.close()
+            self.stats['evictions'] += 1
+        handle = self._handles[shard.name] = open(shard.path + '.part', 'a', encoding='utf-8')
+        self.stats['opens'] += 1
+        return handle
+
+    def _complete(self, shard: _Shard) -> None:
+        """Durably finish a shard's current file and rename it into place."""
+        handle = self._handles.pop(shard.name, None)
+        if handle is None:
+            handle = open(shard.path + '.part', 'a', encoding='utf-8')
+        handle.flush()
+        os.fsync(handle.fileno())
+        handle.close()
+        os.replace(shard.path + '.part', shard.path)
+        self.completed.append(shard.path)
+        shard.path = None
@@ -0,0 +1,250 @@
+"""
+Shared-memory transport for parse results produced in worker processes.
+
+Pickling FullTrackDataModel objects back to a parent process can cost more
+than parsing them. This module instead writes parsed fields into a bounded
+ring of ``multiprocessing.shared_memory`` segments. Each segment holds a small
+header, a table of fixed-width records and a heap for variable-length fields:
+
+* fixed-width columns: validity flags, format code, expiration dates and
+  service codes;
+* offset-addressed columns: PANs, cardholder name, discretionary data and
+  source strings, stored as ``(offset, length)`` pairs into the heap.
+
+Only segment indices travel through the queues. The parent reads a published
+segment through a SegmentView, which rebuilds models lazily on access, and
+releases it back to the ring for reuse.
+"""
+import multiprocessing
+import queue
+import struct
+from multiprocessing import shared_memory
+from typing import Iterator, List, Optional
+
+from .models import FullTrackDataModel, TrackOneModel, TrackTwoModel
+
+_HEADER = struct.Struct('<II')  # record count, heap bytes used
+# flags, format code, Track 1 expiry and service code, Track 2 expiry and service code,
+# then (offset, length) heap references for the seven variable-length fields
+_RECORD = struct.Struct('<B1s4s3s4s3s' + 'IH' * 7)
+
+_TRACK_ONE_VALID = 0x01
+_TRACK_ONE_PRESENT = 0x02
+_TRACK_TWO_VALID = 0x04
+_TRACK_TWO_PRESENT = 0x08
+
+
+class SharedResultRing:
+    """
+    A bounded ring of shared-memory segments carrying parse results.
+
+    Create the ring in the parent process and pass it to worker processes as a
+    ``multiprocessing.Process`` argument. Workers write results through
+    ``writer()``; the parent receives full segments with ``receive()``. When all
+    segments are in use, writers block until the parent releases one, which
+    bounds memory use and applies backpressure.
+    """
+
+    def __init__(self, segments: int = 4, records_per_segment: int = 4096,
+                 heap_bytes: int = 1 << 20, context: Optional[multiprocessing.context.BaseContext] = None):
+        """
+        Allocate the ring.
+
+        Args:
+            segments: The number of shared-memory segments in the ring.
+            records_per_segment: The record capacity of each segment.
+            heap_bytes: The size of each segment's heap for variable-length fields.
+            context: The multiprocessing context used to create the queues.
+        """
+        context = context if context is not None else multiprocessing.get_context()
+        self.records_per_segment = records_per_segment
+        self.heap_bytes = heap_bytes
+        self.segment_size = _HEADER.size + records_per_segment * _RECORD.size + heap_bytes
+        self._segments = [shared_memory.SharedMemory(create=True, size=self.segment_size)
+                          for _ in range(segments)]
+        self._free = context.Queue()
+        self._ready = context.Queue()
+        for index in range(segments):
+            self._free.put(index)
+
+    def writer(self) -> 'ResultWriter':
+        """Return a writer for use in the current (worker) process."""
+        return ResultWriter(self)
+
+    def receive(self, timeout: Optional[float] = None) -> Optional['SegmentView']:
+        """
+        Wait for the next published segment.
+
+        Args:
+            timeout: Seconds to wait, or None to wait indefinitely.
+
+        Returns:
+            Optional[SegmentView]: A view of the segment, or None if the timeout expired.
+        """
+        try:
+            index = self._ready.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        return SegmentView(self, index)
+
+    def close(self) -> None:
+        """Release all segments. Call once from the process that created the ring."""
+        for segment in self._segments:
+            segment.close()
+            segment.unlink()
+
+
+class ResultWriter:
+    """Writes parse results into the segments of a SharedResultRing."""
+
+    def __init__(self, ring: SharedResultRing):
+        self._ring = ring
+        self._index: Optional[int] = None
+        self._count = 0
+        self._heap_used = 0
+        self._records_base = _HEADER.size
+        self._heap_base = _HEADER.size + ring.records_per_segment * _RECORD.size
+
+    def write(self, result: FullTrackDataModel) -> None:
+        """
+        Append a parse result, publishing the current segment when it is full.
+
+        Args:
+            result: The parsed swipe.
+
+        Raises:
+            ValueError: If the record's variable-length fields do not fit in an empty heap.
+        """
+        flags = 0
+        one = result.track_one
+        two = result.track_two
+        if result.is_track_one_valid:
+            flags |= _TRACK_ONE_VALID
+        if result.is_track_two_valid:
+            flags |= _TRACK_TWO_VALID
+        if one is not None:
+            flags |= _TRACK_ONE_PRESENT
+            fixed_one = (one.format_code.encode('latin-1'), one.expiration_date.encode('latin-1'),
+                         one.service_code.encode('latin-1'))
+            strings_one = tuple(s.encode('latin-1') for s in (
+                one.pan, one.card_holder_name, one.discretionary_data, one.source_string))
+        else:
+            fixed_one = (b'', b'', b'')
+            strings_one = (b'', b'', b'', b'')
+        if two is not None:
+            flags |= _TRACK_TWO_PRESENT
+            fixed_two = (two.expiration_date.encode('latin-1'), two.service_code.encode('latin-1'))
+            strings_two = tuple(s.encode('latin-1') for s in (
+                two.pan, two.discretionary_data, two.source_string))
+        else:
+            fixed_two = (b'', b'')
+            strings_two = (b'', b'', b'')
+        strings = strings_one + strings_two
+        needed = sum(len(s) for s in strings)
+        if needed > self._ring.heap_bytes or any(len(s) > 0xFFFF for s in strings):
+            raise ValueError("Record is too large for the shared-memory segment heap")
+
+        if self._index is None:
+            self._acquire()
+        elif self._count == self._ring.records_per_segment or self._heap_used + needed > self._ring.heap_bytes:
+            self.flush()
+            self._acquire()
+
+        buf = self._ring._segments[self._index].buf
+        refs = []
+        offset = self._heap_used
+        for s in strings:
+            start = self._heap_base + offset
+            buf[start:start + len(s)] = s
+            refs.extend((offset, len(s)))
+            offset += len(s)
+        _RECORD.pack_into(buf, self._records_base + self._count * _RECORD.size,
+                          flags, *fixed_one, *fixed_two, *refs)
+        self._heap_used = offset
+        self._count += 1
+
+    def flush(self) -> None:
+        """Publish the current segment, even if it is not full."""
+        if self._index is None:
+            return
+        _HEADER.pack_into(self._ring._segments[self._index].buf, 0, self._count, self._heap_used)
+        self._ring._ready.put(self._index)
+        self._index = None
+
+    def close(self) -> None:
+        """Publish any pending results."""
+        self.flush()
+
+    def _acquire(self) -> None:
+        """Take a free segment from the ring, blocking until one is available."""
+        self._index = self._ring._free.get()
+        self._count = 0
+        self._heap_used = 0
+
+
+class SegmentView:
+    """
+    A read-only view of a published segment.
+
+    Models are rebuilt only when a record is accessed. The view must be
+    released (or used as a context manager) to return the segment to the ring.
+    """
+
+    def __init__(self, ring: SharedResultRing, index: int):
+        self._ring = ring
+        self._index = index
+        self._buf = ring._segments[index].buf
+        self._count, _ = _HEADER.unpack_from(self._buf, 0)
+        self._heap_base = _HEADER.size + ring.records_per_segment * _RECORD.size
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, i: int) -> FullTrackDataModel:
+        if self._buf is None:
+            raise ValueError("Segment view has been released")
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("Segment record index out of range")
+        fields = _RECORD.unpack_from(self._buf, _HEADER.size + i * _RECORD.size)
+        flags = fields[0]
+        code, exp1, svc1, exp2, svc2 = (f.rstrip(b'\0').decode('latin-1') for f in fields[1:6])
+        strings = []
+        for j in range(6, 20, 2):
+            start = self._heap_base + fields[j]
+            strings.append(bytes(self._buf[start:start + fields[j + 1]]).decode('latin-1'))
+        track_one = track_two = None
+        if flags & _TRACK_ONE_PRESENT:
+            track_one = TrackOneModel(format_code=code, pan=strings[0], card_holder_name=strings[1],
+                                      expiration_date=exp1, service_code=svc1,
+                                      discretionary_data=strings[2], source_string=strings[3])
+        if flags & _TRACK_TWO_PRESENT:
+            track_two = TrackTwoModel(pan=strings[4], expiration_date=exp2, service_code=svc2,
+                                      discretionary_data=strings[5], source_string=strings[6])
+        return FullTrackDataModel(
+            is_track_one_valid=bool(flags & _TRACK_ONE_VALID),
+            track_one=track_one,
+            is_track_two_valid=bool(flags & _TRACK_TWO_VALID),
+            track_two=track_two,
+        )
+
+    def __iter__(self) -> Iterator[FullTrackDataModel]:
+        for i in range(self._count):
+            yield self[i]
+
+    def to_list(self) -> List[FullTrackDataModel]:
+        """Rebuild every model in the segment."""
+        return list(self)
+
+    def release(self) -> None:
+        """Return the segment to the ring. The view cannot be used afterwards."""
+        if self._buf is not None:
+            self._buf = None
+            self._ring._free.put(self._index)
+
+    def __enter__(self) -> 'SegmentView':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.release()
@@ -0,0 +1,224 @@
+"""
+StreamParser class for parsing swipes from fragmented reader byte streams.
+
+Serial card readers deliver data in arbitrary fragments: a single read may
+contain half of Track 1, or the end of one swipe and the start of the next.
+This module provides a push-style parser that frames swipes incrementally and
+hands each complete frame to a FullTrackParser.
+"""
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Union
+
+from .full_track_parser import FullTrackParser
+from .models import FullTrackDataModel
+from .exceptions import CreditCardStripeError
+
+
+@dataclass
+class StreamStats:
+    """
+    Counters describing the traffic seen by a StreamParser.
+
+    Attributes:
+        bytes_in (int): Total number of bytes fed to the parser.
+        frames (int): Number of complete frames handed to the parser.
+        invalid_frames (int): Number of frames the parser rejected.
+        garbage_bytes (int): Number of bytes discarded outside of frames.
+        overflows (int): Number of frames dropped for exceeding the maximum track length.
+    """
+    bytes_in: int = 0
+    frames: int = 0
+    invalid_frames: int = 0
+    garbage_bytes: int = 0
+    overflows: int = 0
+
+
+class StreamParser:
+    """
+    A push-style parser that turns fragmented reader output into parsed swipes.
+
+    Bytes are fed with ``feed`` in chunks of any size. A sentinel state machine
+    frames each swipe into a fixed-size buffer, discards garbage between frames
+    and emits a FullTrackDataModel as soon as the final end sentinel (and LRC
+    byte, when ``expect_lrc`` is set) has arrived. Every input byte is scanned
+    once, so the cost is linear in the size of the stream.
+
+    A Track 1 frame is only known to be complete once the byte following it
+    shows that no Track 2 follows; call ``flush`` at the end of the stream to
+    emit a trailing Track 1 only swipe.
+    """
+
+    _IDLE = 0
+    _TRACK_ONE = 1
+    _LRC_ONE = 2
+    _AFTER_TRACK_ONE = 3
+    _TRACK_TWO = 4
+    _LRC_TWO = 5
+
+    def __init__(self, parser: Optional[FullTrackParser] = None, expect_lrc: bool = False):
+        """
+        Initialize the stream parser.
+
+        Args:
+            parser: The parser used for complete frames (a default FullTrackParser if omitted).
+            expect_lrc: Whether each end sentinel is followed by an LRC byte.
+        """
+        self.parser = parser if parser is not None else FullTrackParser()
+        self.expect_lrc = expect_lrc
+        self.stats = StreamStats()
+
+        ss1, es1 = self.parser._SS1.encode('latin-1'), self.parser._ES1.encode('latin-1')
+        ss2, es2 = self.parser._SS2.encode('latin-1'), self.parser._ES2.encode('latin-1')
+        self._ss1 = ss1[0]
+        self._ss2 = ss2[0]
+        self._es1 = es1[0]
+        self._es2 = es2[0]
+        self._start_pattern = re.compile(b'[' + re.escape(ss1) + re.escape(ss2) + b']')
+        # A new Track 1 start sentinel inside a frame means the previous swipe was truncated
+        self._track_one_pattern = re.compile(b'[' + re.escape(es1) + re.escape(ss1) + b']')
+        self._track_two_pattern = re.compile(b'[' + re.escape(es2) + re.escape(ss1) + re.escape(ss2) + b']')
+
+        # Track body plus end sentinel; the buffer also holds start sentinels and LRC bytes
+        self._max_track_one = self.parser._MAX_TRACK1_LEN + 1
+        self._max_track_two = self.parser._MAX_TRACK2_LEN + 1
+        self._buffer = bytearray(self._max_track_one + self._max_track_two + 4)
+        self._length = 0
+        self._body_start = 0
+        self._state = self._IDLE
+
+    def feed(self, chunk: Union[bytes, bytearray, str]) -> List[FullTrackDataModel]:
+        """
+        Feed a chunk of reader output to the parser.
+
+        Args:
+            chunk: The bytes received from the reader. Strings are encoded as Latin-1.
+
+        Returns:
+            List[FullTrackDataModel]: The swipes completed by this chunk, in stream order.
+        """
+        if isinstance(chunk, str):
+            chunk = chunk.encode('latin-1')
+        data = bytes(chunk)
+        size = len(data)
+        self.stats.bytes_in += size
+        events = []
+        pos = 0
+
+        while pos < size:
+            state = self._state
+
+            if state == self._IDLE:
+                match = self._start_pattern.search(data, pos)
+                if match is None:
+                    self.stats.garbage_bytes += size - pos
+                    break
+                start = match.start()
+                self.stats.garbage_bytes += start - pos
+                self._begin_frame(data[start])
+                pos = start + 1
+
+            elif state == self._TRACK_ONE or state == self._TRACK_TWO:
+                if state == self._TRACK_ONE:
+                    pattern, end_sentinel, limit = self._track_one_pattern, self._es1, self._max_track_one
+                else:
+                    pattern, end_sentinel, limit = self._track_two_pattern, self._es2, self._max_track_two
+                remaining = limit - (self._length - self._body_start)
+                window = min(size, pos + remaining)
+                match = pattern.search(data, pos, window)
+                if match is None:
+                    if window - pos >= remaining:
+                        # No end sentinel within the maximum track length
+                        self.stats.overflows += 1
+                        self.stats.garbage_bytes += self._length + window - pos
+                        self._reset()
+                    else:
+                        self._append(data, pos, window)
+                    pos = window
+                    continue
+                end = match.start()
+                byte = data[end]
+                if byte == end_sentinel:
+                    self._append(data, pos, end + 1)
+                    pos = end + 1
+                    if state == self._TRACK_ONE:
+                        self._state = self._LRC_ONE if self.expect_lrc else self._AFTER_TRACK_ONE
+                    elif self.expect_lrc:
+                        self._state = self._LRC_TWO
+                    else:
+                        self._emit(events)
+                else:
+                    # A start sentinel inside the frame: drop the truncated swipe and resync
+                    self.stats.garbage_bytes += self._length + end - pos
+                    self._reset()
+                    self._begin_frame(byte)
+                    pos = end + 1
+
+            elif state == self._LRC_ONE or state == self._LRC_TWO:
+                self._buffer[self._length] = data[pos]
+                self._length += 1
+                pos += 1
+                if state == self._LRC_ONE:
+                    self._state = self._AFTER_TRACK_ONE
+                else:
+                    self._emit(events)
+
+            else:  # _AFTER_TRACK_ONE
+                if data[pos] == self._ss2:
+                    self._buffer[self._length] = self._ss2
+                    self._length += 1
+                    self._body_start = self._length
+                    self._state = self._TRACK_TWO
+                    pos += 1
+                else:
+                    # Track 1 only swipe; the byte is re-examined from the idle state
+                    self._emit(events)
+
+        return events
+
+    def flush(self) -> List[FullTrackDataModel]:
+        """
+        Signal the end of the stream.
+
+        A completed Track 1 frame still waiting for a possible Track 2 is emitted;
+        any other partial frame is discarded.
+
+        Returns:
+            List[FullTrackDataModel]: The swipe completed by the flush, if any.
+        """
+        events = []
+        if self._state == self._AFTER_TRACK_ONE:
+            self._emit(events)
+        else:
+            self.stats.garbage_bytes += self._length
+            self._reset()
+        return events
+
+    def _begin_frame(self, sentinel: int) -> None:
+        """Start a new frame with the given start sentinel byte."""
+        self._buffer[0] = sentinel
+        self._length = 1
+        self._body_start = 1
+        self._state = self._TRACK_ONE if sentinel == self._ss1 else self._TRACK_TWO
+
+    def _append(self, data: bytes, start: int, end: int) -> None:
+        """Copy ``data[start:end]`` into the frame buffer."""
+        length = self._length
+        self._buffer[length:length + end - start] = data[start:end]
+        self._length = length + end - start
+
+    def _reset(self) -> None:
+        """Discard the current frame and return to the idle state."""
+        self._length = 0
+        self._body_start = 0
+        self._state = self._IDLE
+
+    def _emit(self, events: List[FullTrackDataModel]) -> None:
+        """Parse the buffered frame, append the result to ``events`` and reset."""
+        frame = self._buffer[:self._length].decode('latin-1')
+        self._reset()
+        self.stats.frames += 1
+        try:
+            events.append(self.parser.parse(frame))
+        except CreditCardStripeError:
+            self.stats.invalid_frames += 1
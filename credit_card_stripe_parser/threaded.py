@@ -0,0 +1,107 @@
+"""
+Thread-pool batch parsing over a shared parser instance.
+
+FullTrackParser keeps no per-call state, so one instance can serve many
+threads. On free-threaded CPython builds the threads parse in parallel and
+avoid the pickling cost of a process pool; on standard builds the GIL
+serializes parsing, and ``bulk.parse_files`` with worker processes is
+usually the cheaper choice for large inputs. ``benchmarks/bench_threads.py``
+compares both execution models on each interpreter.
+"""
+import os
+import sys
+import sysconfig
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence
+
+from .exceptions import CreditCardStripeError
+from .full_track_parser import FullTrackParser
+from .models import FullTrackDataModel
+
+
+def free_threaded_build() -> bool:
+    """Whether the running interpreter is a free-threaded (no-GIL) build."""
+    return bool(sysconfig.get_config_var('Py_GIL_DISABLED'))
+
+
+def gil_enabled() -> bool:
+    """Whether the GIL is currently enabled (always True before Python 3.13)."""
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', None)
+    return True if is_gil_enabled is None else is_gil_enabled()
+
+
+class ThreadedParser:
+    """Parses batches of swipes on a pool of threads sharing one parser."""
+
+    def __init__(self, parser: Optional[FullTrackParser] = None, workers: Optional[int] = None,
+                 chunk_size: int = 256):
+        """
+        Start the thread pool.
+
+        Args:
+            parser: The shared parser (a default FullTrackParser if omitted).
+            workers: The number of threads (one per CPU if omitted).
+            chunk_size: The number of swipes handed to a thread at a time.
+        """
+        self.parser = parser if parser is not None else FullTrackParser()
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='parse')
+
+    def _parse_chunk(self, tracks: Sequence[str]) -> List[Optional[FullTrackDataModel]]:
+        parse = self.parser.parse
+        results = []
+        for track in tracks:
+            try:
+                results.append(parse(track))
+            except CreditCardStripeError:
+                results.append(None)
+        return results
+
+    def parse_batch(self, tracks: Sequence[str]) -> List[Optional[FullTrackDataModel]]:
+        """
+        Parse a batch of swipes in parallel.
+
+        Args:
+            tracks: The full track strings.
+
+        Returns:
+            List[Optional[FullTrackDataModel]]: One result per swipe, in input
+            order, or None where the parser raised an error.
+        """
+        size = self.chunk_size
+        chunks = [tracks[i:i + size] for i in range(0, len(tracks), size)]
+        if len(chunks) <= 1:
+            return self._parse_chunk(tracks)
+        results = []
+        for chunk_results in self._executor.map(self._parse_chunk, chunks):
+            results.extend(chunk_results)
+        return results
+
+    def close(self) -> None:
+        """Shut down the thread pool."""
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self) -> 'ThreadedParser':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def parse_batch(tracks: Sequence[str], workers: Optional[int] = None,
+                parser: Optional[FullTrackParser] = None) -> List[Optional[FullTrackDataModel]]:
+    """
+    Parse a batch of swipes on a temporary thread pool.
+
+    Args:
+        tracks: The full track strings.
+        workers: The number of threads (one per CPU if omitted).
+        parser: The shared parser (a default FullTrackParser if omitted).
+
+    Returns:
+        List[Optional[FullTrackDataModel]]: One result per swipe, in input
+        order, or None where the parser raised an error.
+    """
+    with ThreadedParser(parser, workers) as threaded:
+        return threaded.parse_batch(tracks)
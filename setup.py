@@ -25,6 +25,9 @@ setup(
     keywords='credit card stripe parser magnetic stripe iso7811',
     install_requires=[],
     extras_require={
+        'numpy': [
+            'numpy>=1.20',
+        ],
         'dev': [
             'pytest>=6.0',
             'pytest-cov>=2.0',
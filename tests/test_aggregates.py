@@ -0,0 +1,123 @@
+"""
+Tests for the streaming aggregate statistics.
+"""
+import pickle
+import random
+
+import pytest
+
+from credit_card_stripe_parser import FullTrackParser, InvalidTrackOneError
+from credit_card_stripe_parser.aggregates import (
+    CountMinSketch, HyperLogLog, SwipeAggregator, TopK, WindowedAggregator,
+)
+
+
+def _swipe(parser, pan, service_code="101"):
+    return parser.parse(f";{pan}=2512{service_code}1000000000?")
+
+
+class TestSketches:
+    """Test cases for the individual sketches."""
+
+    def test_count_min_sketch_never_undercounts(self):
+        """Test that estimates are upper bounds close to the true counts."""
+        rng = random.Random(1)
+        keys = [str(rng.randrange(5000)) for _ in range(20000)]
+        sketch = CountMinSketch(width=1024, depth=4)
+        for key in keys:
+            sketch.add(key)
+        for key in set(keys[:200]):
+            true = keys.count(key)
+            assert true <= sketch.estimate(key) <= true + 2.72 * len(keys) / 1024
+        assert sketch.total == len(keys)
+
+    def test_count_min_sketch_merge(self):
+        """Test that merging two sketches equals sketching the combined stream."""
+        a, b, combined = CountMinSketch(256, 3), CountMinSketch(256, 3), CountMinSketch(256, 3)
+        for i in range(1000):
+            (a if i % 2 else b).add(str(i % 37))
+            combined.add(str(i % 37))
+        a.merge(b)
+        assert a._table == combined._table
+        with pytest.raises(ValueError):
+            a.merge(CountMinSketch(256, 3, seed=1))
+
+    def test_hyperloglog_accuracy_and_merge(self):
+        """Test that distinct counts are within a few standard errors and merge as a union."""
+        a, b = HyperLogLog(12), HyperLogLog(12)
+        for i in range(30000):
+            a.add(f"card-{i}")
+            b.add(f"card-{i + 15000}")
+        assert abs(a.count() - 30000) < 0.05 * 30000
+        a.merge(b)
+        assert abs(a.count() - 45000) < 0.05 * 45000
+        small = HyperLogLog()
+        for i in range(10):
+            small.add(str(i))
+            small.add(str(i))
+        assert small.count() == 10
+
+    def test_top_k(self):
+        """Test that heavy hitters survive pruning and merging."""
+        rng = random.Random(2)
+        stream = ["hot-a"] * 500 + ["hot-b"] * 300 + [f"cold-{rng.randrange(10000)}" for _ in range(3000)]
+        rng.shuffle(stream)
+        a, b = TopK(20), TopK(20)
+        for i, key in enumerate(stream):
+            (a if i % 2 else b).add(key)
+        a.merge(b)
+        top = a.top(2)
+        assert [key for key, _ in top] == ["hot-a", "hot-b"]
+        assert 500 <= top[0][1] <= 500 + a.floor
+        assert len(a._counts) <= 40
+
+
+class TestSwipeAggregator:
+    """Test cases for SwipeAggregator and WindowedAggregator."""
+
+    def _feed(self, aggregator, parser, offset=0):
+        for i in range(100):
+            pan = "4111111111111111" if i % 4 else f"55555555{i + offset:08d}"
+            aggregator.add(_swipe(parser, pan, "201" if i % 10 == 0 else "101"), terminal=f"T{i % 3}")
+        aggregator.add(parser.parse("garbage"), terminal="T0")
+        aggregator.add_error(InvalidTrackOneError("bad"))
+
+    def test_counts(self):
+        """Test per-dimension counts, distinct cards and error rates."""
+        parser = FullTrackParser()
+        aggregator = SwipeAggregator()
+        self._feed(aggregator, parser)
+        assert aggregator.total == 102
+        assert aggregator.estimate("bin", "411111") >= 75
+        assert aggregator.top("service_code") == [("101", 90), ("201", 10)]
+        assert aggregator.top("terminal", 1)[0][0] == "T0"
+        assert aggregator.distinct_cards() == 26
+        assert aggregator.errors == {"no_valid_track": 1, "InvalidTrackOneError": 1}
+        assert aggregator.error_rates()["no_valid_track"] == pytest.approx(1 / 102)
+
+    def test_merge_of_partials_matches_single(self):
+        """Test that merged worker aggregates match one aggregate of all input."""
+        parser = FullTrackParser()
+        single, first, second = SwipeAggregator(), SwipeAggregator(), SwipeAggregator()
+        self._feed(single, parser)
+        self._feed(single, parser, offset=100)
+        self._feed(first, parser)
+        self._feed(pickle.loads(pickle.dumps(second)), parser)
+        self._feed(second, parser, offset=100)
+        first.merge(pickle.loads(pickle.dumps(second)))
+        assert first.snapshot() == single.snapshot()
+
+    def test_windowed_rollup(self):
+        """Test that swipes land in their windows, old windows expire and rollups merge spans."""
+        parser = FullTrackParser()
+        windowed = WindowedAggregator(window=10, retain=3, clock=lambda: 45.0)
+        for timestamp in (1, 12, 25, 33, 38):
+            windowed.add(_swipe(parser, "4111111111111111"), timestamp=timestamp)
+        windowed.add(_swipe(parser, "4111111111111111"), timestamp=2)  # older than every retained window
+        assert [start for start, _ in windowed.windows()] == [10, 20, 30]
+        assert windowed.rollup().swipes == 4
+        assert windowed.rollup(span=20).swipes == 3
+        other = WindowedAggregator(window=10, retain=3)
+        other.add_error("timeout", timestamp=31)
+        windowed.merge(other)
+        assert windowed.rollup(span=10, now=40).errors == {"timeout": 1}
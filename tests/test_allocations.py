@@ -0,0 +1,123 @@
+"""
+Retained-memory budget tests for the parser entry points and models.
+
+Each case parses a batch of records under tracemalloc, keeps the results alive
+and divides the memory still allocated afterwards by the number of records.
+This measures what each record retains (its result objects), not temporaries
+that were allocated and freed during parsing. The measured bytes and blocks
+per record are checked against the committed budgets in
+``allocation_budgets.json``; when a budget is exceeded the top allocation sites
+are printed. Set ``UPDATE_ALLOCATION_BUDGETS=1`` to rewrite the budget file
+from the current measurements. Object sizes differ between interpreter
+versions, so the tests are skipped on any other version than the CPython
+release the budgets were recorded with.
+"""
+import json
+import os
+import sys
+import tracemalloc
+
+import pytest
+
+from credit_card_stripe_parser import FullTrackDataModel, FullTrackParser, TrackOneModel, TrackTwoModel
+
+BUDGET_FILE = os.path.join(os.path.dirname(__file__), "allocation_budgets.json")
+RECORDS = 2000
+TOP_SITES = 10
+
+TRACK_ONE = "%B5168755544412233^PKMMV/UNEMBOXXXX          ^1807111100000000000000111000000?"
+TRACK_TWO = ";5168755544412233=18071111000011100000?"
+FULL_TRACK = TRACK_ONE + TRACK_TWO
+INVALID = "invalid track data"
+
+_parser = FullTrackParser()
+_track_one = _parser.parse_track_one(TRACK_ONE)
+_track_two = _parser.parse_track_two(TRACK_TWO)
+
+CASES = {
+    "parse/full_track": lambda i: _parser.parse(FULL_TRACK),
+    "parse/track_one": lambda i: _parser.parse(TRACK_ONE),
+    "parse/track_two": lambda i: _parser.parse(TRACK_TWO),
+    "parse/invalid": lambda i: _parser.parse(INVALID),
+    "parse_full_track/both": lambda i: _parser.parse_full_track(TRACK_ONE, TRACK_TWO),
+    "parse_track_one/track_one": lambda i: _parser.parse_track_one(TRACK_ONE),
+    "parse_track_one/full_track": lambda i: _parser.parse_track_one(FULL_TRACK),
+    "parse_track_two/track_two": lambda i: _parser.parse_track_two(TRACK_TWO),
+    "parse_track_two/full_track": lambda i: _parser.parse_track_two(FULL_TRACK),
+    "try_parse_track_one/invalid": lambda i: _parser.try_parse_track_one(INVALID),
+    "try_parse_track_two/invalid": lambda i: _parser.try_parse_track_two(INVALID),
+    "TrackOneModel": lambda i: TrackOneModel(
+        format_code="B", pan="5168755544412233", card_holder_name="PKMMV/UNEMBOXXXX",
+        expiration_date="1807", service_code="111", discretionary_data="", source_string=TRACK_ONE),
+    "TrackTwoModel": lambda i: TrackTwoModel(
+        pan="5168755544412233", expiration_date="1807", service_code="111",
+        discretionary_data="", source_string=TRACK_TWO),
+    "FullTrackDataModel": lambda i: FullTrackDataModel(
+        is_track_one_valid=True, track_one=_track_one, is_track_two_valid=True, track_two=_track_two),
+}
+
+
+def _load_budgets():
+    with open(BUDGET_FILE, "r", encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def _measure(func):
+    """Return bytes and blocks retained per record, and the retained allocation statistics."""
+    func(0)  # Warm up caches and interned strings outside of the measurement
+    results = [None] * RECORDS
+    tracemalloc.start(5)
+    try:
+        before = tracemalloc.take_snapshot()
+        for i in range(RECORDS):
+            results[i] = func(i)
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    stats = after.filter_traces(filters).compare_to(before.filter_traces(filters), "traceback")
+    size = sum(stat.size_diff for stat in stats)
+    count = sum(stat.count_diff for stat in stats)
+    return size / RECORDS, count / RECORDS, stats
+
+
+def _format_top_sites(stats):
+    lines = []
+    for stat in sorted(stats, key=lambda s: s.size_diff, reverse=True)[:TOP_SITES]:
+        lines.append(f"{stat.size_diff / RECORDS:8.1f} B/record {stat.count_diff / RECORDS:6.2f} blocks/record")
+        lines.extend(f"    {line}" for line in stat.traceback.format()[-4:])
+    return "\n".join(lines)
+
+
+@pytest.mark.parametrize("case", sorted(CASES))
+def test_retained_memory_budget(case):
+    """Test that each entry point stays within its per-record retained-memory budget."""
+    budgets = _load_budgets()
+    updating = bool(os.environ.get("UPDATE_ALLOCATION_BUDGETS"))
+    interpreter = "{}.{}".format(*sys.version_info[:2])
+    if not updating and (sys.implementation.name != "cpython" or budgets["python"] != interpreter):
+        pytest.skip(f"Budgets were recorded with CPython {budgets['python']}, "
+                    f"not {sys.implementation.name} {interpreter}")
+    per_record_bytes, per_record_blocks, stats = _measure(CASES[case])
+
+    if updating:
+        headroom = budgets["headroom"]
+        budgets["python"] = interpreter
+        budgets["budgets"][case] = {
+            "bytes": int(per_record_bytes * headroom) + 16,
+            "blocks": round(per_record_blocks * headroom + 0.25, 2),
+        }
+        with open(BUDGET_FILE, "w", encoding="utf-8") as fh:
+            json.dump(budgets, fh, indent=2, sort_keys=True)
+            fh.write("\n")
+        return
+
+    budget = budgets["budgets"][case]
+    if per_record_bytes > budget["bytes"] or per_record_blocks > budget["blocks"]:
+        print(f"Top allocation sites for {case}:\n{_format_top_sites(stats)}")
+    assert per_record_bytes <= budget["bytes"], (
+        f"{case}: {per_record_bytes:.1f} bytes/record exceeds budget of {budget['bytes']}"
+    )
+    assert per_record_blocks <= budget["blocks"], (
+        f"{case}: {per_record_blocks:.2f} blocks/record exceeds budget of {budget['blocks']}"
+    )
@@ -0,0 +1,77 @@
+"""
+Tests for the on-disk swipe archive index.
+"""
+import pytest
+
+from credit_card_stripe_parser import ArchiveIndex
+
+
+class TestArchiveIndex:
+    """Test cases for building and querying an archive index."""
+
+    CARD_A = ("%B5168755544412233^PKMMV/UNEMBOXXXX          ^1807111100000000000000111000000?"
+              ";5168755544412233=18071111000011100000?")
+    CARD_B = ";4111111111111111=25121010000000000000?"
+    KEY = b"test-index-key"
+
+    def _write_archive(self, path, lines):
+        path.write_text("\n".join(lines) + "\n", encoding="ascii")
+        return str(path)
+
+    def test_lookup_and_query(self, tmp_path):
+        """Test finding swipes by PAN, BIN and expiry."""
+        archive = self._write_archive(tmp_path / "a.log", [self.CARD_A, "garbage", self.CARD_B, self.CARD_A])
+        index = ArchiveIndex(str(tmp_path / "index"), self.KEY)
+        assert index.add_archive(archive) == 3
+        assert index.skipped == 1
+
+        locations = index.lookup(pan="5168755544412233")
+        assert [offset for _, offset in locations] == [0, len(self.CARD_A) + len(self.CARD_B) + 10]
+        assert len(index.lookup(bin_prefix="411111")) == 1
+        assert len(index.lookup(bin_prefix="516875", expiry="1807")) == 2
+        assert index.lookup(bin_prefix="516875", expiry="2512") == []
+
+        results = index.query(pan="4111111111111111")
+        assert len(results) == 1
+        assert results[0].track_two.expiration_date == "2512"
+
+    def test_incremental_updates_persist(self, tmp_path):
+        """Test that new archives add segments and the index reopens from disk."""
+        index_dir = str(tmp_path / "index")
+        index = ArchiveIndex(index_dir, self.KEY)
+        index.add_archive(self._write_archive(tmp_path / "a.log", [self.CARD_A]))
+        index.add_archive(self._write_archive(tmp_path / "b.log", [self.CARD_B, self.CARD_A]))
+        assert index.add_archive(str(tmp_path / "a.log")) == 0
+
+        reopened = ArchiveIndex(index_dir, self.KEY)
+        assert len(reopened.query(pan="5168755544412233")) == 2
+        reopened.compact()
+        assert len(ArchiveIndex(index_dir, self.KEY).lookup(pan="5168755544412233")) == 2
+        assert len(list((tmp_path / "index").glob("segment-*.idx"))) == 1
+
+    def test_requires_key_and_criteria(self, tmp_path):
+        """Test argument validation."""
+        with pytest.raises(ValueError):
+            ArchiveIndex(str(tmp_path), b"")
+        with pytest.raises(ValueError):
+            ArchiveIndex(str(tmp_path), self.KEY).lookup()
+
+    def test_skips_non_digit_pans(self, tmp_path):
+        """Test that records whose PAN is not ASCII digits are skipped and counted."""
+        lines = [self.CARD_B, ";411111111111\u00b2\u00b3\u00b9=25121010000000000000?",
+                 ";4111\u00e9111111111111=25121010000000000000?", ";41111X1111111111=2512101?"]
+        archive = tmp_path / "a.log"
+        archive.write_text("\n".join(lines) + "\n", encoding="latin-1")
+        index = ArchiveIndex(str(tmp_path / "index"), self.KEY)
+        assert index.add_archive(str(archive)) == 1
+        assert index.skipped == 3
+        assert len(index.query(bin_prefix="411111")) == 1
+
+    @pytest.mark.parametrize("criteria", [
+        {"pan": "4111\u00b2"}, {"pan": ""}, {"bin_prefix": "41111"}, {"bin_prefix": "41111X"},
+        {"bin_prefix": "\u00b3\u00b311111"}, {"expiry": "25"}, {"expiry": "25\u00b212"},
+    ])
+    def test_rejects_malformed_criteria(self, tmp_path, criteria):
+        """Test that malformed criteria raise a clear ValueError."""
+        with pytest.raises(ValueError, match="must be"):
+            ArchiveIndex(str(tmp_path), self.KEY).lookup(**criteria)
@@ -0,0 +1,129 @@
+"""
+Tests for the binary record format.
+"""
+import struct
+
+import pytest
+
+from credit_card_stripe_parser import FullTrackParser
+from credit_card_stripe_parser.binary_format import RecordReader, RecordWriter, write_records
+from credit_card_stripe_parser.consistency import check_columns, to_columns
+from credit_card_stripe_parser.models import FullTrackDataModel, TrackOneModel
+
+TRACK_ONE = "%B5168755544412233^PKMMV/UNEMBOXXXX          ^1807111100000000000000111000000?"
+TRACK_TWO = ";5168755544412233=18071111000011100000?"
+
+
+def _results():
+    parser = FullTrackParser()
+    results = [parser.parse(line) for line in (
+        TRACK_ONE + TRACK_TWO, TRACK_TWO, TRACK_ONE, "invalid track data",
+        "%B4111111111111111^DOE/JANE^2512101?;5555555555554444=2601201?",
+    )]
+    results.append(FullTrackDataModel(
+        is_track_one_valid=True,
+        track_one=TrackOneModel(format_code='B', pan='1234 5678 9012', card_holder_name='Ünïcode',
+                                expiration_date='AB12', service_code='1x1', discretionary_data='',
+                                source_string=''),
+        is_track_two_valid=False,
+        track_two=None,
+    ))
+    return results
+
+
+class TestBinaryFormat:
+    """Test cases for writing and reading binary record files."""
+
+    def test_round_trip(self, tmp_path):
+        """Test that every model, including non-BCD fields, is rebuilt exactly."""
+        path = str(tmp_path / "swipes.bin")
+        results = _results()
+        assert write_records(path, results) == len(results)
+        with RecordReader(path) as reader:
+            assert reader.schema_version == 2
+            assert len(reader) == len(results)
+            assert list(reader) == results
+            assert reader[-1] == results[-1]
+            with pytest.raises(IndexError):
+                reader[len(results)]
+        assert not (tmp_path / "swipes.bin.part").exists()
+
+    @pytest.mark.parametrize("format_code", ["B", "\xe9", "\u20ac", "", "\0", "BB"])
+    def test_format_code_round_trip(self, tmp_path, format_code):
+        """Test that format codes outside ASCII, or not one character, are stored exactly."""
+        path = str(tmp_path / "swipes.bin")
+        result = FullTrackParser().parse(TRACK_ONE)
+        result.track_one.format_code = format_code
+        write_records(path, [result])
+        with RecordReader(path) as reader:
+            assert reader[0] == result
+            assert reader[0].track_one.format_code == format_code
+
+    def test_without_source_strings(self, tmp_path):
+        """Test that source strings can be left out to save space."""
+        path = str(tmp_path / "swipes.bin")
+        write_records(path, _results()[:1], include_source=False)
+        with RecordReader(path) as reader:
+            assert not reader.include_source
+            assert reader[0].track_one.source_string == ''
+            assert reader[0].track_two.pan == "5168755544412233"
+
+    def test_columns_match_to_columns(self, tmp_path):
+        """Test that the vectorized columns equal those built from the models."""
+        pytest.importorskip("numpy")
+        path = str(tmp_path / "swipes.bin")
+        results = _results()
+        write_records(path, results)
+        with RecordReader(path) as reader:
+            columns = reader.columns()
+            expected = to_columns(results)
+            for name, column in expected.items():
+                assert column.tolist() == columns[name].tolist(), name
+            assert check_columns(**columns).counts == check_columns(**expected).counts
+            assert reader.records()['flags'].shape == (len(results),)
+            del columns
+
+    @pytest.mark.parametrize("line", [
+        ";41111111111111111112=2512101?",
+        "%B4111111111111111^DOE/JANE^2512101?;41111111111111111112=2512101?",
+    ])
+    def test_columns_never_truncate(self, tmp_path, line):
+        """Test that over-long fields read the same through columns as through the models."""
+        pytest.importorskip("numpy")
+        path = str(tmp_path / "swipes.bin")
+        result = FullTrackParser().parse(line)
+        result.track_two.service_code += "9"
+        write_records(path, [result])
+        with RecordReader(path) as reader:
+            model = reader[0]
+            assert model == result
+            columns = reader.columns()
+            for number, track in (("one", model.track_one), ("two", model.track_two)):
+                if track is None:
+                    continue
+                assert columns[f"track_{number}_pan"][0] == track.pan.encode()
+                assert columns[f"track_{number}_expiry"][0] == track.expiration_date.encode()
+                assert columns[f"track_{number}_service_code"][0] == track.service_code.encode()
+            del columns
+
+    def test_aborted_write_leaves_nothing(self, tmp_path):
+        """Test that a failed write does not leave a partial file behind."""
+        path = tmp_path / "swipes.bin"
+        with pytest.raises(RuntimeError):
+            with RecordWriter(str(path)) as writer:
+                writer.write(_results()[0])
+                raise RuntimeError("boom")
+        assert list(tmp_path.iterdir()) == []
+
+    def test_rejects_other_files(self, tmp_path):
+        """Test that foreign files and unknown schema versions are rejected."""
+        path = tmp_path / "other.bin"
+        path.write_bytes(b"not a record file at all, just some bytes")
+        with pytest.raises(ValueError, match="Invalid record file"):
+            RecordReader(str(path))
+        write_records(str(path), [])
+        data = bytearray(path.read_bytes())
+        struct.pack_into('<H', data, 8, 99)
+        path.write_bytes(bytes(data))
+        with pytest.raises(ValueError, match="schema version 99"):
+            RecordReader(str(path))
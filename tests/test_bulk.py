@@ -0,0 +1,79 @@
+"""
+Tests for bulk and streaming parsing of plain and compressed archives.
+"""
+import bz2
+import gzip
+import lzma
+
+import pytest
+
+from credit_card_stripe_parser import ArchiveIndex
+from credit_card_stripe_parser import archive_index, bulk
+
+
+class TestBulk:
+    """Test cases for reading compressed swipe archives."""
+
+    CARD_A = ";5168755544412233=18071111000011100000?"
+    CARD_B = "%B4111111111111111^DOE/JOHN^2512101000000000000?"
+    CONTENT = f"{CARD_A}\r\n{CARD_B}\n\n{CARD_A}".encode("ascii")
+
+    @pytest.mark.parametrize("chunk_size", [1, 7, 40, 4096])
+    @pytest.mark.parametrize("compress", [None, gzip.compress, bz2.compress, lzma.compress])
+    def test_iter_records_across_chunk_boundaries(self, tmp_path, compress, chunk_size):
+        """Test that records split across chunks are framed correctly."""
+        path = tmp_path / "swipes.log"
+        path.write_bytes(compress(self.CONTENT) if compress else self.CONTENT)
+        stats = bulk.IngestStats()
+        records = list(bulk.iter_records(str(path), chunk_size=chunk_size, stats=stats))
+        assert records == [
+            (0, self.CARD_A),
+            (len(self.CARD_A) + 2, self.CARD_B),
+            (len(self.CARD_A) + len(self.CARD_B) + 4, self.CARD_A),
+        ]
+        assert stats.decompressed_bytes == len(self.CONTENT)
+        assert stats.records == 3
+
+    def test_parse_files_in_parallel(self, tmp_path):
+        """Test parsing several compressed files with worker processes."""
+        paths = []
+        for i, compress in enumerate((gzip.compress, bz2.compress, lzma.compress)):
+            path = tmp_path / f"swipes-{i}.log"
+            path.write_bytes(compress(self.CONTENT))
+            paths.append(str(path))
+        file_results, stats = bulk.parse_files(paths, max_workers=2)
+        assert [r.path for r in file_results] == paths
+        assert all(len(r.results) == 3 for r in file_results)
+        assert file_results[0].results[1].track_one.pan == "4111111111111111"
+        assert stats.files == 3 and stats.records == 9
+        assert set(stats.throughput()) == {"decompress_mb_per_s", "frame_mb_per_s", "parse_records_per_s"}
+
+    def test_archive_index_reads_compressed_archives(self, tmp_path):
+        """Test that the archive index works over gzip archives."""
+        path = tmp_path / "swipes.log.gz"
+        path.write_bytes(gzip.compress(self.CONTENT))
+        index = ArchiveIndex(str(tmp_path / "index"), b"key")
+        assert index.add_archive(str(path)) == 3
+        assert len(index.query(pan="5168755544412233")) == 2
+
+    def test_archive_index_reads_each_archive_once(self, tmp_path, monkeypatch):
+        """Test that query reads all hits of an archive in one forward pass."""
+        path = tmp_path / "swipes.log.gz"
+        path.write_bytes(gzip.compress((self.CONTENT + b"\n") * 50))
+        index = ArchiveIndex(str(tmp_path / "index"), b"key")
+        index.add_archive(str(path))
+        opened, seeks = [], []
+
+        class Tracked(gzip.GzipFile):
+            def seek(self, offset, whence=0):
+                seeks.append(offset)
+                return super().seek(offset, whence)
+
+        def tracked_open(archive):
+            opened.append(archive)
+            return Tracked(archive, "rb")
+
+        monkeypatch.setattr(archive_index, "open_archive", tracked_open)
+        assert len(index.query(pan="5168755544412233")) == 100
+        assert len(opened) == 1
+        assert seeks == sorted(seeks)
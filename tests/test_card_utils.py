@@ -0,0 +1,52 @@
+"""
+Tests for the PAN helper functions.
+"""
+import pytest
+
+from credit_card_stripe_parser.card_utils import card_brand, luhn_valid, luhn_valid_span, mask_pan
+
+
+class TestCardUtils:
+    """Test cases for Luhn, brand detection and masking."""
+
+    @pytest.mark.parametrize("pan, expected", [
+        ("4111111111111111", True),
+        ("5168755544412233", False),
+        ("378282246310005", True),
+        ("4111111111111112", False),
+        ("41111a1111111111", False),
+        ("", False),
+        ("4111111111111\u00b2\u00b3\u00b9", False),
+        ("\u0664111111111111111", False),
+    ])
+    def test_luhn_valid(self, pan, expected):
+        """Test the Luhn check."""
+        assert luhn_valid(pan) is expected
+
+    @pytest.mark.parametrize("pan", ["4111111111111111", "5168755544412233", "378282246310005",
+                                     "41111a1111111111", "0", ""])
+    def test_luhn_valid_span(self, pan):
+        """Test that the span check agrees with the Luhn check on the sliced PAN."""
+        text = ";" + pan + "=2512?"
+        assert luhn_valid_span(text, 1, 1 + len(pan)) is luhn_valid(pan)
+
+    @pytest.mark.parametrize("pan, brand", [
+        ("4111111111111111", "visa"),
+        ("5168755544412233", "mastercard"),
+        ("2221000000000009", "mastercard"),
+        ("378282246310005", "amex"),
+        ("6011111111111117", "discover"),
+        ("3530111333300000", "jcb"),
+        ("9999999999999999", "unknown"),
+        ("\u00b3\u00b311111111111111", "unknown"),
+        ("4\u00b211111111111111", "visa"),
+    ])
+    def test_card_brand(self, pan, brand):
+        """Test brand detection from the BIN."""
+        assert card_brand(pan) == brand
+
+    def test_mask_pan(self):
+        """Test PAN masking."""
+        assert mask_pan("4111111111111111") == "411111******1111"
+        assert mask_pan("4111111111111111", 0, 4, "X") == "XXXXXXXXXXXX1111"
+        assert mask_pan("12345") == "*****"
@@ -0,0 +1,125 @@
+"""
+Tests for the track format classifier.
+"""
+import random
+
+import pytest
+
+from credit_card_stripe_parser import FullTrackParser
+from credit_card_stripe_parser.classifier import (
+    EMPTY, JIS_II, TRACK_ONE, TRACK_ONE_AND_TWO, TRACK_THREE, TRACK_TWO, UNKNOWN, FormatClassifier,
+)
+from credit_card_stripe_parser.exceptions import (
+    InvalidTrackOneError, InvalidTrackTwoError, UnsupportedFormatError,
+)
+from credit_card_stripe_parser.profiles import ReaderProfile
+
+TRACK_ONE_DATA = "%B5168755544412233^PKMMV/UNEMBOXXXX          ^1807111100000000000000111000000?"
+TRACK_TWO_DATA = ";5168755544412233=18071111000011100000?"
+TRACK_THREE_DATA = (";011234567890123445=724724100000000000030300XXXX040400099010="
+                    "************************==1=0000000000000000?")
+JIS_II_DATA = "\x7f" + "A" * 67 + "\x7f"
+
+
+def _with_lrc(track):
+    lrc = 0
+    for ch in track[1:-1]:
+        lrc ^= ord(ch)
+    return track + chr(lrc)
+
+
+SUPPORTED = [
+    (TRACK_ONE_DATA, TRACK_ONE),
+    (TRACK_TWO_DATA, TRACK_TWO),
+    (TRACK_ONE_DATA + TRACK_TWO_DATA, TRACK_ONE_AND_TWO),
+    (_with_lrc(TRACK_ONE_DATA), TRACK_ONE),
+    (_with_lrc(TRACK_ONE_DATA) + _with_lrc(TRACK_TWO_DATA), TRACK_ONE_AND_TWO),
+    (TRACK_ONE_DATA + "X" + TRACK_TWO_DATA, TRACK_ONE_AND_TWO),  # wrong Track 1 LRC
+    (TRACK_ONE_DATA + "?" + TRACK_TWO_DATA, TRACK_ONE_AND_TWO),  # wrong Track 1 LRC equal to "?"
+    (TRACK_ONE_DATA + "?", TRACK_ONE),
+    (TRACK_TWO_DATA + "\0", TRACK_TWO),
+    ("%B5168755544412233^PKMMV/UNEMBOXXXX", TRACK_ONE),  # no end sentinel
+]
+
+
+class TestFormatClassifier:
+    """Test cases for FormatClassifier."""
+
+    @pytest.mark.parametrize("line, kind", SUPPORTED + [
+        (TRACK_THREE_DATA, TRACK_THREE), (JIS_II_DATA, JIS_II), ("", EMPTY), ("hello", UNKNOWN),
+    ])
+    def test_classify(self, line, kind):
+        """Test the format assigned from the leading character and length."""
+        assert FormatClassifier().classify(line) == kind
+
+    @pytest.mark.parametrize("line, kind", SUPPORTED + [
+        (TRACK_ONE_DATA + "\n" + TRACK_TWO_DATA, TRACK_ONE),  # falls back to parse
+    ])
+    def test_matches_full_parse(self, line, kind):
+        """Test that dispatched parsing gives the same result as FullTrackParser.parse."""
+        assert FormatClassifier().parse(line) == FullTrackParser().parse(line)
+
+    def test_bad_lrc_equal_to_end_sentinel(self):
+        """Test that an LRC character equal to the end sentinel is still checked."""
+        result = FormatClassifier().parse(TRACK_ONE_DATA + "?" + TRACK_TWO_DATA)
+        assert not result.is_track_one_valid
+        assert result.track_one is None
+
+    def test_matches_full_parse_on_mutations(self):
+        """Test that results and errors match FullTrackParser.parse on corrupted lines."""
+        rng = random.Random(7)
+        classifier, parser = FormatClassifier(), FullTrackParser()
+        for _ in range(3000):
+            chars = list(rng.choice([TRACK_ONE_DATA + TRACK_TWO_DATA, TRACK_ONE_DATA, TRACK_TWO_DATA]))
+            for _ in range(rng.randint(1, 3)):
+                # Misplaced start sentinels are not well-formed and may legitimately differ
+                chars[rng.randrange(len(chars))] = rng.choice("?^=0X\0")
+            line = "".join(chars)
+            try:
+                expected = parser.parse(line)
+            except (InvalidTrackOneError, InvalidTrackTwoError) as e:
+                expected = type(e)
+            try:
+                actual = classifier.parse(line)
+            except (InvalidTrackOneError, InvalidTrackTwoError) as e:
+                actual = type(e)
+            except UnsupportedFormatError:
+                continue
+            assert actual == expected, line
+
+    def test_parse_errors_match(self):
+        """Test that malformed tracks raise the parser's own errors."""
+        classifier = FormatClassifier()
+        with pytest.raises(InvalidTrackOneError):
+            classifier.parse("%B1?")
+        with pytest.raises(InvalidTrackTwoError):
+            classifier.parse(";1?")
+
+    @pytest.mark.parametrize("line, reason", [
+        (TRACK_THREE_DATA, TRACK_THREE), (JIS_II_DATA, JIS_II), ("", EMPTY), ("hello", UNKNOWN),
+    ])
+    def test_unsupported_formats(self, line, reason):
+        """Test that unsupported lines are rejected with a reason code."""
+        with pytest.raises(UnsupportedFormatError) as excinfo:
+            FormatClassifier().parse(line)
+        assert excinfo.value.reason == reason
+
+    def test_batch_groups_formats(self):
+        """Test that a mixed batch is grouped by format and parsed in input order."""
+        lines = [TRACK_TWO_DATA, TRACK_ONE_DATA, JIS_II_DATA, TRACK_ONE_DATA + TRACK_TWO_DATA,
+                 ";1?", TRACK_THREE_DATA, TRACK_TWO_DATA]
+        batch = FormatClassifier().parse_batch(lines)
+        parser = FullTrackParser()
+        assert batch.groups == {TRACK_TWO: [0, 4, 6], TRACK_ONE: [1], JIS_II: [2],
+                                TRACK_ONE_AND_TWO: [3], TRACK_THREE: [5]}
+        assert batch.errors == {2: JIS_II, 4: "InvalidTrackTwoError", 5: TRACK_THREE}
+        for index in (0, 1, 3, 6):
+            assert batch.results[index] == parser.parse(lines[index])
+        assert batch.results[2] is None and batch.results[4] is None
+
+    def test_profile_sentinels(self):
+        """Test that the classifier follows the sentinels of the wrapped parser."""
+        parser = ReaderProfile(name="brackets", track_two_start="[", track_two_end="]").compile().parser
+        classifier = FormatClassifier(parser)
+        assert classifier.classify("[5168755544412233=18071111000011100000]") == TRACK_TWO
+        assert classifier.parse("[5168755544412233=18071111000011100000]").track_two.pan == "5168755544412233"
@@ -0,0 +1,85 @@
+"""
+Tests for the cross-track consistency checker.
+"""
+import pytest
+
+from credit_card_stripe_parser import FullTrackParser
+from credit_card_stripe_parser import consistency
+
+np = pytest.importorskip("numpy")
+
+
+class TestConsistency:
+    """Test cases for batch cross-track consistency checks."""
+
+    TEST_TRACK_ONE = "%B5168755544412233^PKMMV/UNEMBOXXXX          ^1807111100000000000000111000000?"
+    TEST_TRACK_TWO = ";5168755544412233=18071111000011100000?"
+
+    def test_check_results(self):
+        """Test bitmasks and counts for parsed results."""
+        parser = FullTrackParser()
+        results = [
+            parser.parse(self.TEST_TRACK_ONE + self.TEST_TRACK_TWO),
+            parser.parse(self.TEST_TRACK_ONE + self.TEST_TRACK_TWO.replace('=1807111', '=1907201')),
+            parser.parse(self.TEST_TRACK_ONE + self.TEST_TRACK_TWO.replace(';5168', ';4168')),
+            parser.parse(self.TEST_TRACK_TWO),
+        ]
+        report = consistency.check_results(results)
+        assert report.masks.tolist() == [
+            0,
+            consistency.EXPIRY_MISMATCH | consistency.SERVICE_CODE_MISMATCH,
+            consistency.PAN_MISMATCH,
+            consistency.TRACK_MISSING,
+        ]
+        assert report.counts == {
+            'pan_mismatch': 1,
+            'expiry_mismatch': 1,
+            'service_code_mismatch': 1,
+            'track_missing': 1,
+            'invalid_field': 0,
+            'consistent': 1,
+        }
+        assert report.mismatched().tolist() == [1, 2, 3]
+
+    def test_check_columns(self):
+        """Test checking columnar arrays directly."""
+        report = consistency.check_columns(
+            track_one_pan=np.array([b'4111111111111111', b'4111111111111111']),
+            track_two_pan=np.array([b'4111111111111111', b'4111111111111111']),
+            track_one_expiry=[b'2512', b'2512'],
+            track_two_expiry=[b'2512', b'2612'],
+            track_one_service_code=[b'101', b'101'],
+            track_two_service_code=[b'101', b'101'],
+        )
+        assert report.masks.tolist() == [0, consistency.EXPIRY_MISMATCH]
+        assert len(report) == 2
+
+    def test_invalid_fields_are_flagged_not_truncated(self):
+        """Test that over-long and non-ASCII values are flagged instead of compared truncated."""
+        parser = FullTrackParser()
+        results = [
+            parser.parse("%B4111111111111111^DOE/JANE^2512101?;4111111111111111=2512101?"),
+            parser.parse("%B41111111111111111112^DOE/JANE^2512101?;41111111111111111113=2512101?"),
+            parser.parse("%B4111111111111111^DOE/JANE^2512101?;4111111111111111=2512101?"),
+        ]
+        results[2].track_one.service_code = "10\u00e9"
+        results[2].track_two.service_code = "10\u00e9"
+        report = consistency.check_results(results)
+        assert report.masks.tolist() == [0, consistency.INVALID_FIELD, consistency.INVALID_FIELD]
+        assert report.counts["invalid_field"] == 2
+
+        report = consistency.check_columns(
+            track_one_pan=["4111111111111111", "41111111111111111112", "4111111111111111"],
+            track_two_pan=["4111111111111111", "41111111111111111113", "4111111111111111"],
+            track_one_expiry=["2512", "2512", "25120"],
+            track_two_expiry=["2512", "2512", "25121"],
+            track_one_service_code=["101", "101", "\u0661\u0660\u0661"],
+            track_two_service_code=["101", "101", "101"],
+        )
+        assert report.masks.tolist() == [0, consistency.INVALID_FIELD, consistency.INVALID_FIELD]
+        assert report.counts["track_missing"] == 0
+
+    def test_check_columns_length_mismatch(self):
+        """Test that columns of different lengths are rejected."""
+        with pytest.raises(ValueError):
+            consistency.check_columns([b'1'], [b'1', b'2'], [b''], [b''], [b''], [b''])
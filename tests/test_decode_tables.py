@@ -0,0 +1,92 @@
+"""
+Tests for the service code and expiration date decode tables.
+"""
+import datetime
+
+import pytest
+
+from credit_card_stripe_parser.decode_tables import (
+    SERVICE_CODES, decode_expiry, decode_service_code, decode_service_codes, expired_flags,
+    expiry_columns, service_code_columns,
+)
+
+
+class TestServiceCodes:
+    """Test cases for service code decoding."""
+
+    def test_all_codes_decoded(self):
+        """Test that the table covers all 1000 codes."""
+        assert len(SERVICE_CODES) == 1000
+        assert decode_service_code("12") is None
+        assert decode_service_code("abc") is None
+
+    @pytest.mark.parametrize("code, interchange, chip, authorization, services, pin", [
+        ("101", "international", False, "normal", "any", "none"),
+        ("201", "international", True, "normal", "any", "none"),
+        ("226", "international", True, "online", "any", "if_feasible"),
+        ("520", "national", False, "online", "any", "required"),
+        ("703", "private", False, "normal", "atm", "required"),
+        ("745", "private", False, "online_unless_bilateral", "goods_and_services", "required"),
+        ("999", "test", False, "reserved", "reserved", "reserved"),
+    ])
+    def test_decoding(self, code, interchange, chip, authorization, services, pin):
+        """Test each digit's interpretation."""
+        decoded = decode_service_code(code)
+        assert (decoded.interchange, decoded.chip, decoded.authorization, decoded.services, decoded.pin) == (
+            interchange, chip, authorization, services, pin)
+        assert decoded.assigned == (code != "999")
+
+    def test_columns_match_table(self):
+        """Test that vectorized decoding agrees with the table, including invalid codes."""
+        pytest.importorskip("numpy")
+        codes = list(SERVICE_CODES) + ["", "12", "1a1", "1234", "1011", "\u0661\u0660\u0661", "1\u00b23"]
+        columns = service_code_columns(codes)
+        decoded = decode_service_codes(codes)
+        assert columns["valid"].tolist() == [d is not None for d in decoded]
+        for name in ("assigned", "chip", "cash_allowed", "pin_required"):
+            assert columns[name].tolist() == [bool(d and getattr(d, name)) for d in decoded]
+        for name in ("interchange", "authorization", "services", "pin"):
+            assert columns[name].tolist() == [getattr(d, name) if d else "" for d in decoded]
+
+
+class TestExpiryDates:
+    """Test cases for expiration date decoding."""
+
+    def test_end_of_month(self):
+        """Test that YYMM maps to the last day of the month."""
+        assert decode_expiry("2402").end_date == datetime.date(2024, 2, 29)
+        assert decode_expiry("2502").end_date == datetime.date(2025, 2, 28)
+        assert decode_expiry("2512").end_date == datetime.date(2025, 12, 31)
+        assert decode_expiry("2513") is None
+        assert decode_expiry("2500") is None
+
+    def test_expired_flags(self):
+        """Test that cards are valid through the end of their expiry month."""
+        reference = datetime.date(2025, 6, 30)
+        assert decode_expiry("2506").is_expired(reference) is False
+        assert decode_expiry("2505").is_expired(reference) is True
+        assert expired_flags(["2505", "2506", "3001", "bad"], reference) == [True, False, False, None]
+
+    def test_columns(self):
+        """Test vectorized expiry decoding against the scalar path."""
+        np = pytest.importorskip("numpy")
+        reference = datetime.date(2025, 6, 1)
+        values = ["2505", "2506", "9912", "0001", "2513", "25", b"3002"]
+        columns = expiry_columns(values, reference)
+        assert columns["valid"].tolist() == [True, True, True, True, False, False, True]
+        assert columns["expired"].tolist() == [True, False, False, True, False, False, False]
+        assert columns["end_date"][0] == np.datetime64("2025-05-31")
+        assert np.isnat(columns["end_date"][4])
+        assert columns["month_index"][6] == decode_expiry("3002").month_index
+
+    @pytest.mark.parametrize("values", [
+        ["25061", "2506 ", "\u0662\u0665\u0660\u0666", "2506"],
+        [b"25061", b"2506\xff", b"2506"],
+    ])
+    def test_columns_reject_what_the_scalar_path_rejects(self, values):
+        """Test that over-long and non-ASCII values are invalid, not truncated."""
+        pytest.importorskip("numpy")
+        columns = expiry_columns(values, datetime.date(2025, 6, 1))
+        expected = [decode_expiry(v if isinstance(v, str) else v.decode("latin-1")) is not None
+                    for v in values]
+        assert columns["valid"].tolist() == expected == [False] * (len(values) - 1) + [True]
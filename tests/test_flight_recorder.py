@@ -0,0 +1,184 @@
+"""
+Tests for the failed-swipe flight recorder.
+"""
+import gc
+import json
+import os
+import signal
+import weakref
+
+import pytest
+
+from credit_card_stripe_parser import FullTrackParser, InvalidTrackOneError, InvalidTrackTwoError
+from credit_card_stripe_parser.classifier import FormatClassifier
+from credit_card_stripe_parser.flight_recorder import (
+    FlightRecorder, TRACK_ONE_ERROR, TRACK_TWO_ERROR, TRY_TRACK_ONE, TRY_TRACK_TWO, mask_swipe,
+)
+
+TRACK_ONE = "%B5168755544412233^PKMMV/UNEMBOXXXX          ^1807111100000000000000111000000?"
+TRACK_TWO = ";5168755544412233=18071111000011100000?"
+BAD_TRACK_ONE = "%B5168755544412233PKMMV?"
+BAD_TRACK_TWO = ";5168755544412233?"
+
+
+class TestMaskSwipe:
+    """Test cases for mask_swipe."""
+
+    def test_masks_card_data(self):
+        """Test that PANs, names and discretionary data are masked."""
+        masked = mask_swipe(TRACK_ONE + TRACK_TWO)
+        assert len(masked) == len(TRACK_ONE + TRACK_TWO)
+        assert "5168755544412233" not in masked
+        assert "PKMMV" not in masked
+        assert masked.startswith("%B516875******2233^*****/" + "*" * 10 + " " * 10 + "^1807111*")
+        assert masked.endswith(";516875******2233=1807111*************?")
+
+    @pytest.mark.parametrize("raw, masked", [
+        # Corrupted PAN
+        (";51687555X4412233=18071111000011100000?", ";" + "*" * 16 + "=" + "*" * 20 + "?"),
+        # Track 1 without the separator after the name
+        ("%B5168755544412233^PKMMV/UNEMBOXXXX", "%" + "*" * 17 + "^*****/" + "*" * 10),
+        # Corrupted expiry date
+        (";5168755544412233=18X71111000011100000?", ";" + "*" * 16 + "=" + "*" * 20 + "?"),
+        (BAD_TRACK_ONE, "%" + "*" * 22 + "?"),
+        ("%B51687555X4412233^DOE/J^1807111100?", "%" + "*" * 17 + "^***/*^" + "*" * 10 + "?"),
+        ("garbage\r\n", "*******\r\n"),
+        ("²³¹é", "****"),
+    ])
+    def test_masks_malformed_input(self, raw, masked):
+        """Test that fields that cannot be identified are masked entirely."""
+        assert mask_swipe(raw) == masked
+
+
+class TestFlightRecorder:
+    """Test cases for FlightRecorder."""
+
+    def test_records_parse_failures(self):
+        """Test that parse errors are recorded with reason, offset and masked input."""
+        recorder = FlightRecorder(capacity=8, clock=lambda: 123.0)
+        parser = FullTrackParser(recorder=recorder)
+        with pytest.raises(InvalidTrackOneError):
+            parser.parse(BAD_TRACK_ONE)
+        with pytest.raises(InvalidTrackTwoError):
+            parser.parse("xx" + BAD_TRACK_TWO)
+        parser.parse(TRACK_ONE + TRACK_TWO)
+
+        first, second = recorder.dump()
+        assert (first.sequence, first.timestamp, first.reason, first.offset) == (0, 123.0, TRACK_ONE_ERROR, 0)
+        assert first.detail.startswith("ValueError: ")
+        assert first.raw == "%" + "*" * 22 + "?"
+        assert (second.reason, second.offset) == (TRACK_TWO_ERROR, 2)
+        assert recorder.seen == {TRACK_ONE_ERROR: 1, TRACK_TWO_ERROR: 1}
+
+    def test_records_try_parse_failures(self):
+        """Test that failed try_parse_* calls are recorded, but inputs without the track are not."""
+        recorder = FlightRecorder()
+        parser = FullTrackParser(recorder=recorder)
+        assert parser.try_parse_track_one(TRACK_TWO) == (False, None)
+        assert parser.try_parse_track_two(TRACK_ONE) == (False, None)
+        assert parser.try_parse_track_two(BAD_TRACK_TWO) == (False, None)
+        assert parser.try_parse_track_one(BAD_TRACK_ONE) == (False, None)
+        assert parser.try_parse_track_two(TRACK_TWO)[0]
+
+        bad_two, bad_one = recorder.dump()
+        assert (bad_two.reason, bad_two.offset) == (TRY_TRACK_TWO, 0)
+        assert (bad_one.reason, bad_one.offset) == (TRY_TRACK_ONE, 0)
+        assert recorder.seen == {TRY_TRACK_TWO: 1, TRY_TRACK_ONE: 1}
+
+    def test_ring_holds_only_masked_input(self):
+        """Test that card data is masked when it is recorded, not when it is dumped."""
+        recorder = FlightRecorder()
+        parser = FullTrackParser(recorder=recorder)
+        with pytest.raises(InvalidTrackOneError):
+            parser.parse("%B5168755544412233^PKMMV/UNEMBOXXXX" + TRACK_TWO)
+        (entry,) = [slot for slot in recorder._slots if slot is not None]
+        assert "5168755544412233" not in repr(entry)
+        assert "PKMMV" not in repr(entry) and "11100000" not in repr(entry)
+
+    def test_parse_full_track_and_classifier_record(self):
+        """Test that parse_full_track and the format classifier record failures."""
+        recorder = FlightRecorder()
+        parser = FullTrackParser(recorder=recorder)
+        with pytest.raises(InvalidTrackTwoError):
+            parser.parse_full_track(TRACK_ONE, BAD_TRACK_TWO)
+        batch = FormatClassifier(parser).parse_batch([BAD_TRACK_TWO, BAD_TRACK_ONE + TRACK_TWO])
+        assert len(batch.errors) == 2
+        assert [r.reason for r in recorder.dump()] == [TRACK_TWO_ERROR, TRACK_TWO_ERROR, TRACK_ONE_ERROR]
+
+    def test_does_not_keep_callers_alive(self):
+        """Test that recorded failures do not keep the caller's frames and data alive."""
+        class Lines(list):
+            pass
+
+        recorder = FlightRecorder()
+        lines = Lines([TRACK_TWO, BAD_TRACK_TWO])
+        alive = weakref.ref(lines)
+        FormatClassifier(FullTrackParser(recorder=recorder)).parse_batch(lines)
+        del lines
+        gc.collect()
+        assert alive() is None
+        assert len(recorder) == 1
+        assert recorder.dump()[0].detail.startswith("ValueError: ")
+
+    def test_ring_keeps_latest(self):
+        """Test that the ring overwrites the oldest failures."""
+        recorder = FlightRecorder(capacity=3)
+        for i in range(10):
+            recorder.record(TRACK_ONE_ERROR, f"swipe {i}", i)
+        assert recorder.recorded == 10
+        assert len(recorder) == 3
+        assert [r.offset for r in recorder.dump()] == [7, 8, 9]
+        recorder.clear()
+        assert recorder.dump() == [] and recorder.seen == {}
+
+    def test_sampling_rates(self):
+        """Test that sampling keeps one in N failures per reason."""
+        recorder = FlightRecorder(sample_rates={TRACK_ONE_ERROR: 4, TRY_TRACK_ONE: 0})
+        for i in range(10):
+            recorder.record(TRACK_ONE_ERROR, "x", i)
+            recorder.record(TRY_TRACK_ONE, "x", i)
+            recorder.record(TRACK_TWO_ERROR, "x", i)
+        dump = recorder.dump()
+        assert [r.offset for r in dump if r.reason == TRACK_ONE_ERROR] == [0, 4, 8]
+        assert not [r for r in dump if r.reason == TRY_TRACK_ONE]
+        assert len([r for r in dump if r.reason == TRACK_TWO_ERROR]) == 10
+        assert recorder.seen == {TRACK_ONE_ERROR: 10, TRY_TRACK_ONE: 10, TRACK_TWO_ERROR: 10}
+
+    def test_invalid_configuration(self):
+        """Test that invalid capacities and sampling rates are rejected."""
+        with pytest.raises(ValueError):
+            FlightRecorder(capacity=0)
+        with pytest.raises(ValueError):
+            FlightRecorder(sample_rates={TRACK_ONE_ERROR: -1})
+
+    def test_write(self, tmp_path):
+        """Test that dumps are written as JSON Lines without card data."""
+        recorder = FlightRecorder()
+        parser = FullTrackParser(recorder=recorder)
+        with pytest.raises(InvalidTrackOneError):
+            parser.parse(BAD_TRACK_ONE + TRACK_TWO)
+        path = str(tmp_path / "failures.jsonl")
+        assert recorder.write(path) == 1
+        with open(path, encoding="utf-8") as fh:
+            text = fh.read()
+        assert "5168755544412233" not in text
+        header, record = [json.loads(line) for line in text.splitlines()]
+        assert header == {"capacity": 1024, "recorded": 1, "seen": {TRACK_ONE_ERROR: 1}}
+        assert record["reason"] == TRACK_ONE_ERROR
+        assert not os.path.exists(path + ".part")
+
+    @pytest.mark.skipif(not hasattr(signal, "SIGUSR1"), reason="requires SIGUSR1")
+    def test_signal_handler(self, tmp_path):
+        """Test that a signal writes a dump."""
+        recorder = FlightRecorder()
+        recorder.record(TRACK_TWO_ERROR, BAD_TRACK_TWO, 0)
+        path = str(tmp_path / "failures.jsonl")
+        previous = signal.getsignal(signal.SIGUSR1)
+        recorder.install_signal_handler(path)
+        try:
+            signal.raise_signal(signal.SIGUSR1)
+        finally:
+            recorder.uninstall_signal_handler()
+        assert signal.getsignal(signal.SIGUSR1) is previous
+        with open(path, encoding="utf-8") as fh:
+            assert len(fh.read().splitlines()) == 2
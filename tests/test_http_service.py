@@ -0,0 +1,188 @@
+"""
+Tests for the local HTTP parsing service.
+"""
+import asyncio
+import json
+import threading
+
+from credit_card_stripe_parser.http_service import ParseService
+
+TRACK = ("%B5168755544412233^PKMMV/UNEMBOXXXX          ^1807111100000000000000111000000?"
+         ";5168755544412233=18071111000011100000?")
+
+
+async def _request(reader, writer, method, path, payload=None):
+    body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n"
+                 .encode("latin-1") + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line == b"\r\n":
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return status, json.loads(await reader.readexactly(int(headers["content-length"])))
+
+
+class TestParseService:
+    """Test cases for the HTTP parsing service."""
+
+    def test_single_batch_and_stats(self):
+        """Test the endpoints over one keep-alive connection."""
+        async def scenario():
+            service = ParseService(max_batch=8, max_delay=0.005, workers=2)
+            await service.start()
+            try:
+                reader, writer = await asyncio.open_connection("127.0.0.1", service.port)
+                status, result = await _request(reader, writer, "POST", "/parse", {"track": TRACK})
+                assert status == 200
+                assert result["track_two"]["pan"] == "5168755544412233"
+
+                status, result = await _request(reader, writer, "POST", "/parse/batch",
+                                                {"tracks": [TRACK, 42]})
+                assert status == 200
+                assert [r["ok"] for r in result["results"]] == [True, False]
+
+                status, _ = await _request(reader, writer, "POST", "/parse", {"tracks": "x"})
+                assert status == 422
+                assert (await _request(reader, writer, "GET", "/missing"))[0] == 404
+
+                status, stats = await _request(reader, writer, "GET", "/stats")
+                assert status == 200
+                assert stats["connections"] == 1
+                assert stats["single_requests"] == 2 and stats["batch_requests"] == 1
+                writer.close()
+            finally:
+                await service.stop()
+
+        asyncio.run(scenario())
+
+    def test_concurrent_requests_are_micro_batched(self):
+        """Test that concurrent single requests share micro-batches."""
+        async def client(port):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            status, result = await _request(reader, writer, "POST", "/parse", {"track": TRACK})
+            writer.close()
+            return status
+
+        async def scenario():
+            service = ParseService(max_batch=16, max_delay=0.05, workers=2)
+            await service.start()
+            try:
+                statuses = await asyncio.gather(*(client(service.port) for _ in range(16)))
+                assert statuses == [200] * 16
+                assert service.stats["micro_batched_items"] == 16
+                assert service.stats["micro_batches"] < 16
+            finally:
+                await service.stop()
+
+        asyncio.run(scenario())
+
+    def test_invalid_content_length(self):
+        """Test that a malformed or negative Content-Length gets a 400 response."""
+        async def send(port, length):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(f"POST /parse HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode("latin-1"))
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+            return response
+
+        async def scenario():
+            service = ParseService(workers=1)
+            await service.start()
+            try:
+                for length in ("abc", "-1", "+5", "1e3"):
+                    response = await send(service.port, length)
+                    assert response.startswith(b"HTTP/1.1 400 ")
+                    assert b"Connection: close" in response
+            finally:
+                await service.stop()
+
+        asyncio.run(scenario())
+
+    def test_failed_micro_batch_answers_clients(self):
+        """Test that clients get an error response when a micro-batch fails."""
+        class Failing(ParseService):
+            def _parse_batch(self, tracks):
+                if len(tracks) == 1 and tracks[0] == "boom":
+                    raise RuntimeError("boom")
+                return super()._parse_batch(tracks)
+
+        async def client(port, track):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            status, _ = await _request(reader, writer, "POST", "/parse", {"track": track})
+            writer.close()
+            return status
+
+        async def scenario():
+            service = Failing(workers=1)
+            await service.start()
+            try:
+                assert await asyncio.wait_for(client(service.port, "boom"), 5) == 500
+                assert await asyncio.wait_for(client(service.port, TRACK), 5) == 200
+            finally:
+                await service.stop()
+
+        asyncio.run(scenario())
+
+    def test_stop_cancels_waiting_requests(self):
+        """Test that stop cancels in-flight micro-batches and answers their requests."""
+        release = threading.Event()
+
+        class Blocking(ParseService):
+            def _parse_batch(self, tracks):
+                release.wait(5)
+                return super()._parse_batch(tracks)
+
+        async def scenario():
+            service = Blocking(workers=1)
+            await service.start()
+            reader, writer = await asyncio.open_connection("127.0.0.1", service.port)
+            request = asyncio.ensure_future(_request(reader, writer, "POST", "/parse", {"track": TRACK}))
+            while not service._dispatches:
+                await asyncio.sleep(0.001)
+            # The worker thread is released while stop() waits for the pool to shut down
+            threading.Timer(0.05, release.set).start()
+            await service.stop()
+            assert not service._dispatches and service._pending.empty()
+            status, result = await asyncio.wait_for(request, 5)
+            assert (status, result) == (503, {"error": "service stopping"})
+            writer.close()
+
+        asyncio.run(scenario())
+
+    def test_stop_answers_requests_held_by_the_batcher(self):
+        """Test that requests queued behind a busy worker get a 503 when the service stops."""
+        release = threading.Event()
+
+        class Blocking(ParseService):
+            def _parse_batch(self, tracks):
+                release.wait(5)
+                return super()._parse_batch(tracks)
+
+        async def client(port):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            response = await _request(reader, writer, "POST", "/parse", {"track": TRACK})
+            writer.close()
+            return response
+
+        async def scenario():
+            service = Blocking(workers=1, max_delay=10)
+            await service.start()
+            busy = asyncio.ensure_future(client(service.port))
+            while not service._dispatches:
+                await asyncio.sleep(0.001)
+            queued = [asyncio.ensure_future(client(service.port)) for _ in range(2)]
+            while service.stats["single_requests"] < 3 or not service._pending.empty():
+                await asyncio.sleep(0.001)
+            await asyncio.sleep(0.01)
+            threading.Timer(0.05, release.set).start()
+            await service.stop()
+            responses = await asyncio.wait_for(asyncio.gather(busy, *queued), 5)
+            assert responses == [(503, {"error": "service stopping"})] * 3
+
+        asyncio.run(scenario())
@@ -0,0 +1,66 @@
+"""
+Tests for the simulated card-reader load generator.
+"""
+import json
+import socket
+
+import pytest
+
+from credit_card_stripe_parser import loadgen
+
+
+class TestLoadGenerator:
+    """Test cases for load generation and reporting."""
+
+    @pytest.mark.parametrize("transport", ["socket", "pipe"])
+    def test_run_load(self, transport):
+        """Test that fragmented, bursty and malformed traffic is fully accounted for."""
+        config = loadgen.LoadConfig(readers=3, rate=400, duration=0.2, transport=transport,
+                                    burst_size=4, fragment_size=7, malformed_ratio=0.2, seed=1)
+        report = loadgen.run_load(config)
+        assert report["swipes_sent"] > 0
+        assert report["malformed_sent"] > 0
+        assert report["swipes_parsed"] == report["swipes_sent"]
+        assert report["dropped"] == 0 and report["unexpected"] == 0
+        latency = report["latency_ms"]
+        assert 0 <= latency["p50"] <= latency["p95"] <= latency["p99"] <= latency["p999"] <= latency["max"]
+        json.dumps(report)
+
+    @pytest.mark.parametrize("ratio", [0.0, 0.5, 1.0])
+    def test_counts_every_malformed_swipe(self, ratio):
+        """Test that truncated and noise-prefixed swipes are both counted as malformed."""
+        config = loadgen.LoadConfig(malformed_ratio=ratio)
+        ours, theirs = socket.socketpair()
+        try:
+            reader = loadgen._Reader(0, config, ours, seed=7)
+            for seq in range(100):
+                reader._emit(seq)
+            ours.shutdown(socket.SHUT_WR)
+            data = b"".join(iter(lambda: theirs.recv(65536), b""))
+        finally:
+            ours.close()
+            theirs.close()
+        truncated = 100 - reader.sent
+        noisy = sum(data.count(noise + b"%B") for noise in loadgen._NOISE)
+        assert reader.malformed == truncated + noisy
+        if ratio == 0.0:
+            assert reader.malformed == 0
+        elif ratio == 1.0:
+            assert reader.malformed == 100
+        else:
+            assert 0 < truncated < reader.malformed < 100
+
+    def test_percentile(self):
+        """Test nearest-rank percentiles."""
+        values = list(range(1, 101))
+        assert loadgen.percentile(values, 0.5) == 50
+        assert loadgen.percentile(values, 0.99) == 99
+        assert loadgen.percentile(values, 0.999) == 100
+        assert loadgen.percentile([], 0.5) == 0.0
+
+    def test_main_writes_report(self, tmp_path):
+        """Test the command line entry point."""
+        output = tmp_path / "report.json"
+        assert loadgen.main(["--readers", "1", "--rate", "100", "--duration", "0.05",
+                             "--transport", "pipe", "--output", str(output)]) == 0
+        assert "latency_ms" in json.loads(output.read_text())
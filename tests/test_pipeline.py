@@ -0,0 +1,75 @@
+"""
+Tests for the staged ingestion pipeline.
+"""
+import io
+import json
+from dataclasses import asdict
+
+import pytest
+
+from credit_card_stripe_parser.pipeline import (
+    EnrichStage, FrameStage, MaskStage, ParseStage, Pipeline, Stage, WriteStage, read_chunks,
+)
+
+CARD_A = ";4111111111111111=25121010000000000000?"
+CARD_B = ("%B5168755544412233^PKMMV/UNEMBOXXXX          ^1807111100000000000000111000000?"
+          ";5168755544412233=18071111000011100000?")
+
+
+class _Failing(Stage):
+    def process(self, item):
+        raise RuntimeError("boom")
+
+
+class TestPipeline:
+    """Test cases for the pipeline framework and built-in stages."""
+
+    def _chunks(self, count):
+        data = "\n".join([CARD_A, "garbage", CARD_B] * count).encode("ascii")
+        return [data[i:i + 50] for i in range(0, len(data), 50)]
+
+    def test_full_chain_with_mixed_modes(self):
+        """Test read, frame, parse, enrich, mask and write with backpressure."""
+        out = io.StringIO()
+        pipeline = Pipeline([
+            FrameStage(batch_size=4, queue_size=2),
+            ParseStage(workers=3, batch_size=8, queue_size=2),
+            EnrichStage(mode="inline"),
+            MaskStage(workers=2),
+            WriteStage(out, formatter=lambda s: json.dumps(asdict(s))),
+        ])
+        assert pipeline.run(self._chunks(100)) == []
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert len(records) == 200
+        assert {r["pan"] for r in records} == {"411111******1111", "516875******2233"}
+        assert {r["brand"] for r in records} == {"visa", "mastercard"}
+        assert all(r["result"]["track_two"]["source_string"] == "" for r in records)
+
+        metrics = pipeline.metrics()
+        assert metrics["ParseStage"]["items_in"] == 300
+        assert metrics["ParseStage"]["items_out"] == 200
+        assert metrics["WriteStage"]["items_in"] == 200
+        assert metrics["ParseStage"]["max_queue_depth"] <= 2
+
+    def test_process_stage_and_collected_output(self):
+        """Test a process-mode stage and collecting the last stage's output."""
+        pipeline = Pipeline([ParseStage(mode="process", workers=2, batch_size=10), EnrichStage(mode="inline")])
+        results = pipeline.run([CARD_A, CARD_B] * 20)
+        assert len(results) == 40
+        assert sum(r.luhn_valid for r in results) == 20
+
+    def test_read_chunks_and_frame_tail(self, tmp_path):
+        """Test reading a file in chunks and framing an unterminated last record."""
+        path = tmp_path / "swipes.log"
+        path.write_text(f"{CARD_A}\n{CARD_B}", encoding="ascii")
+        results = Pipeline([FrameStage(), ParseStage(mode="inline")]).run(read_chunks(str(path), 16))
+        assert len(results) == 2
+
+    def test_errors_and_validation(self):
+        """Test error propagation and configuration checks."""
+        with pytest.raises(RuntimeError):
+            Pipeline([_Failing(workers=2, batch_size=1, queue_size=1), EnrichStage()]).run(range(50))
+        with pytest.raises(ValueError):
+            FrameStage(workers=2)
+        with pytest.raises(ValueError):
+            Pipeline([EnrichStage(mode="inline")])
@@ -0,0 +1,127 @@
+"""
+Tests for pre-check gating before parsing.
+"""
+import datetime
+import tracemalloc
+
+import pytest
+
+from credit_card_stripe_parser import FullTrackParser, InvalidTrackOneError
+from credit_card_stripe_parser.exceptions import CreditCardStripeError, RejectedSwipeError
+from credit_card_stripe_parser.prechecks import (
+    EXPIRY, FORMAT_CODE, LUHN, SERVICE_CODE, PreCheckedParser, PreChecks,
+)
+from credit_card_stripe_parser.profiles import ReaderProfile
+
+TRACK_ONE = "%B4111111111111111^DOE/JOHN^2512101000?"
+TRACK_TWO = ";4111111111111111=25121010000?"
+FULL_TRACK = TRACK_ONE + TRACK_TWO
+BAD_LUHN = ";5168755544412233=25121010000?"
+REFERENCE = datetime.date(2025, 6, 15)
+
+
+def _checks(**overrides):
+    options = dict(reference_date=REFERENCE, service_codes=frozenset({"101", "201"}),
+                   format_codes=frozenset("B"))
+    options.update(overrides)
+    return PreChecks(**options)
+
+
+class TestPreCheckedParser:
+    """Test cases for PreCheckedParser."""
+
+    @pytest.mark.parametrize("raw, reason", [
+        (TRACK_ONE, None),
+        (TRACK_TWO, None),
+        (FULL_TRACK, None),
+        (";4111111111111111=25061010000?", None),
+        (BAD_LUHN, LUHN),
+        ("%B5168755544412233^DOE/JOHN^2512101000?", LUHN),
+        (";41111111111a1111=25121010000?", LUHN),
+        (";4111111111111111=25051010000?", EXPIRY),
+        (";4111111111111111=25131010000?", EXPIRY),
+        (";4111111111111111=25x21010000?", EXPIRY),
+        (";4111111111111111=25121200000?", SERVICE_CODE),
+        ("%A4111111111111111^DOE/JOHN^2512101000?", FORMAT_CODE),
+        ("no sentinels at all", None),
+        (";4111111111111111?", None),
+    ])
+    def test_check(self, raw, reason):
+        """Test that each check rejects with its reason."""
+        assert PreCheckedParser(_checks()).check(raw) == reason
+
+    def test_track_two_fields_preferred(self):
+        """Test that Track 2 fields are checked when both tracks are present."""
+        checked = PreCheckedParser(_checks())
+        assert checked.check(TRACK_ONE.replace("2512", "2401") + TRACK_TWO) is None
+        assert checked.check(TRACK_ONE + TRACK_TWO.replace("2512", "2401")) == EXPIRY
+
+    def test_disabled_checks(self):
+        """Test that only configured checks run."""
+        checked = PreCheckedParser(PreChecks(luhn=False))
+        assert checked.check(BAD_LUHN) is None
+        assert checked.check("%A4111111111111111^DOE/JOHN^0001999000?") is None
+
+    def test_parse(self):
+        """Test that accepted swipes are parsed and rejected ones raise."""
+        checked = PreCheckedParser(_checks())
+        assert checked.parse(FULL_TRACK) == FullTrackParser().parse(FULL_TRACK)
+        with pytest.raises(RejectedSwipeError) as info:
+            checked.parse(BAD_LUHN)
+        assert info.value.reason == LUHN
+        assert isinstance(info.value, CreditCardStripeError)
+
+    @pytest.mark.skipif(not hasattr(tracemalloc, "reset_peak"), reason="requires tracemalloc.reset_peak")
+    @pytest.mark.parametrize("raw", [
+        BAD_LUHN,
+        ";4111111111111111=25051010000?",
+        ";4111111111111111=25121200000?",
+        "%A4111111111111111^DOE/JOHN^2512101000?",
+        # Long fields, so that slicing or copying any of them would show
+        ";" + "1" * 4096 + "=25121010000?",
+        "%B4111111111111111^" + "D" * 4096 + "^2501101000?",
+        BAD_LUHN + "0" * 4096,
+    ], ids=["luhn", "expiry", "service_code", "format_code", "long_pan", "long_name", "long_tail"])
+    def test_rejection_allocates_nothing(self, raw):
+        """Test that a rejected swipe allocates no field strings, copies or models, even transiently."""
+        checked = PreCheckedParser(_checks())
+        assert checked.check(raw) is not None
+        tracemalloc.start()
+        try:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            for _ in range(1000):
+                checked.check(raw)
+            peak = tracemalloc.get_traced_memory()[1] - before
+        finally:
+            tracemalloc.stop()
+        # A few small ints and iterators; a parsed model alone takes about 1 KB
+        assert peak < 512
+
+    def test_batch_and_stats(self):
+        """Test the batch forms and the counters."""
+        checked = PreCheckedParser(_checks())
+        raws = [FULL_TRACK, BAD_LUHN, "%B4111111111111111?", TRACK_TWO.replace("2512", "2001")]
+        batch = checked.parse_batch(raws)
+        assert batch.results[0] is not None and batch.results[1:] == [None, None, None]
+        assert batch.rejected == {1: LUHN, 3: EXPIRY}
+        assert batch.errors == {2: InvalidTrackOneError.__name__}
+        assert checked.filter(raws) == [FULL_TRACK, "%B4111111111111111?"]
+        assert checked.stats == {"checked": 8, "accepted": 4, FORMAT_CODE: 0, SERVICE_CODE: 0,
+                                 EXPIRY: 2, LUHN: 2}
+
+    def test_uses_parser_sentinels(self):
+        """Test that fields are located with the parser's sentinels."""
+        parser = ReaderProfile(name="pipe", track_two_separator="|").compile().parser
+        checked = PreCheckedParser(_checks(), parser)
+        assert checked.check(TRACK_TWO.replace("=", "|")) is None
+        assert checked.check(BAD_LUHN.replace("=", "|")) == LUHN
+
+    @pytest.mark.parametrize("checks", [
+        PreChecks(service_codes=frozenset({"12"})),
+        PreChecks(format_codes=frozenset({"BB"})),
+    ])
+    def test_invalid_configuration(self, checks):
+        """Test that misconfigured checks are rejected."""
+        with pytest.raises(ValueError):
+            PreCheckedParser(checks)
@@ -0,0 +1,82 @@
+"""
+Tests for the sampling profiler.
+"""
+import threading
+import time
+
+import pytest
+
+from credit_card_stripe_parser import FullTrackParser
+from credit_card_stripe_parser.loadgen import main as loadgen_main
+from credit_card_stripe_parser.profiler import SamplingProfiler, profiled
+
+TRACK = ("%B5168755544412233^PKMMV/UNEMBOXXXX          ^1807111100000000000000111000000?"
+         ";5168755544412233=18071111000011100000?")
+
+
+def _parse_for(seconds):
+    parser = FullTrackParser()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        parser.parse(TRACK)
+
+
+class TestSamplingProfiler:
+    """Test cases for SamplingProfiler."""
+
+    def test_samples_parse_path(self, tmp_path):
+        """Test that samples attribute time to the parser's functions."""
+        with SamplingProfiler(frequency=1000) as profiler:
+            worker = threading.Thread(target=_parse_for, args=(0.3,))
+            worker.start()
+            worker.join()
+        assert not profiler.running
+        assert profiler.samples > 20
+        functions = {s.function: s for s in profiler.summary()}
+        parse = functions["credit_card_stripe_parser.full_track_parser:FullTrackParser.parse"]
+        assert parse.total_samples > 10
+        assert parse.total_samples >= parse.self_samples
+        callees = {stack[stack.index(parse.function) + 1] for stack in profiler.stacks
+                   if parse.function in stack[:-1]}
+        assert any("FullTrackParser._validate_track" in c or "FullTrackParser.parse_track" in c for c in callees)
+        assert 0 < parse.total_seconds < 1.0
+
+        collapsed_path, summary_path = profiler.write(str(tmp_path / "run"))
+        with open(collapsed_path, encoding="utf-8") as fh:
+            lines = fh.read().splitlines()
+        stack, count = lines[0].rsplit(" ", 1)
+        assert int(count) > 0 and ";" in stack
+        assert sum(int(line.rsplit(" ", 1)[1]) for line in lines) == profiler.samples
+        with open(summary_path, encoding="utf-8") as fh:
+            assert "FullTrackParser.parse" in fh.read()
+
+    def test_idle_threads_are_skipped(self):
+        """Test that threads blocked on an event are not sampled by default."""
+        stop = threading.Event()
+        waiter = threading.Thread(target=stop.wait)
+        waiter.start()
+        try:
+            with SamplingProfiler(frequency=500) as profiler:
+                time.sleep(0.05)
+        finally:
+            stop.set()
+            waiter.join()
+        assert all("threading:Event.wait" not in stack for stack in profiler.stacks)
+
+    def test_disabled_profiling_starts_nothing(self, tmp_path):
+        """Test that a None prefix neither samples nor writes files."""
+        threads = threading.active_count()
+        with profiled(None) as profiler:
+            assert profiler is None
+            assert threading.active_count() == threads
+        assert list(tmp_path.iterdir()) == []
+        with pytest.raises(ValueError):
+            SamplingProfiler(frequency=0)
+
+    def test_cli_profile_option(self, tmp_path):
+        """Test that the load generator CLI writes profile files when asked."""
+        prefix = str(tmp_path / "loadgen")
+        assert loadgen_main(["--readers", "2", "--rate", "200", "--duration", "0.3", "--seed", "1",
+                             "--output", str(tmp_path / "report.json"), "--profile", prefix]) == 0
+        assert (tmp_path / "loadgen.collapsed").stat().st_size > 0
+        assert (tmp_path / "loadgen.summary.txt").exists()
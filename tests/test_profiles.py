@@ -0,0 +1,93 @@
+"""
+Tests for compiled reader profiles.
+"""
+import pickle
+
+import pytest
+
+from credit_card_stripe_parser import FullTrackParser, InvalidTrackTwoError, StreamParser
+from credit_card_stripe_parser.profiles import (
+    DEFAULT_PROFILE, PROFILES, ProfileError, ReaderProfile, compile_profile, get_profile,
+)
+
+TRACK_ONE = "%B5168755544412233^PKMMV/UNEMBOXXXX          ^1807111100000000000000111000000?"
+TRACK_TWO = ";5168755544412233=18071111000011100000?"
+
+
+def _without_source(result):
+    """Return the result's fields except the raw source strings, which legitimately differ."""
+    one, two = result.track_one, result.track_two
+    return (result.is_track_one_valid, result.is_track_two_valid,
+            one and (one.format_code, one.pan, one.card_holder_name, one.expiration_date, one.service_code,
+                     one.discretionary_data),
+            two and (two.pan, two.expiration_date, two.service_code, two.discretionary_data))
+
+
+class TestReaderProfiles:
+    """Test cases for reader profiles."""
+
+    @pytest.mark.parametrize("name", sorted(PROFILES))
+    def test_builtin_profiles_are_valid(self, name):
+        """Test that every built-in profile validates and compiles."""
+        profile = get_profile(name)
+        assert profile.problems() == []
+        assert compile_profile(profile) is profile.compile()
+
+    def test_default_profile_adds_no_preprocessing(self):
+        """Test that the default profile parses exactly like FullTrackParser."""
+        compiled = DEFAULT_PROFILE.compile()
+        assert compiled.parse == compiled.parser.parse
+        assert compiled.parse(TRACK_ONE + TRACK_TWO) == FullTrackParser().parse(TRACK_ONE + TRACK_TWO)
+
+    @pytest.mark.parametrize("name, raw", [
+        ("crlf", TRACK_ONE + "\r\n" + TRACK_TWO + "\r\n"),
+        ("nul_padded", TRACK_ONE + TRACK_TWO + "\0" * 12),
+        ("device_header", "RDR-0042|" + TRACK_ONE + "\r\n" + TRACK_TWO + "\0\0\0"),
+    ])
+    def test_vendor_layouts(self, name, raw):
+        """Test that vendor layouts parse to the same fields as clean input."""
+        result = get_profile(name).compile().parse(raw)
+        assert result.is_track_one_valid and result.is_track_two_valid
+        assert _without_source(result) == _without_source(FullTrackParser().parse(TRACK_ONE + TRACK_TWO))
+
+    def test_custom_sentinels_and_header(self):
+        """Test overridden sentinels, separators, length limits and a fixed-size header."""
+        profile = ReaderProfile(name="acme-x9", track_one_start="<", track_one_separator="|",
+                                track_one_end=">", track_two_start="[", track_two_separator="#",
+                                track_two_end="]", max_track_two_length=37, header_length=4)
+        compiled = profile.compile()
+        assert type(compiled.parser).__name__ == "AcmeX9TrackParser"
+        raw = "HDR:" + TRACK_ONE.translate(str.maketrans("%^?", "<|>")) + TRACK_TWO.translate(
+            str.maketrans(";=?", "[#]"))
+        result = compiled.parse(raw)
+        assert _without_source(result) == _without_source(FullTrackParser().parse(TRACK_ONE + TRACK_TWO))
+        with pytest.raises(InvalidTrackTwoError) as info:
+            compiled.parse("HDR:[" + "1" * 38 + "#2512101]")
+        assert "maximum length of 37" in str(info.value.__cause__)
+
+    def test_stream_parser_uses_profile_sentinels(self):
+        """Test that a compiled parser plugs into StreamParser."""
+        profile = ReaderProfile(name="brackets", track_two_start="[", track_two_end="]")
+        stream = StreamParser(parser=profile.compile().parser)
+        results = stream.feed(b"noise[5168755544412233=18071111000011100000]")
+        assert [r.track_two.pan for r in results] == ["5168755544412233"]
+
+    @pytest.mark.parametrize("overrides, message", [
+        ({"track_one_end": "^"}, "track_one sentinels and separator must be distinct"),
+        ({"track_two_start": "%"}, "track_one_start and track_two_start must differ"),
+        ({"track_two_separator": "=="}, "track_two_separator must be a single character"),
+        ({"max_track_two_length": 0}, "max_track_two_length must be positive"),
+        ({"header_length": 3, "header_delimiter": "|"}, "mutually exclusive"),
+        ({"removed_characters": "\n;"}, "removed_characters must not contain sentinels"),
+    ])
+    def test_validation(self, overrides, message):
+        """Test that inconsistent profiles are rejected before compiling."""
+        profile = ReaderProfile(name="broken", **overrides)
+        with pytest.raises(ProfileError, match=message):
+            profile.compile()
+
+    def test_profile_parser_pickles(self):
+        """Test that profile parsers can be sent to worker processes."""
+        profile = ReaderProfile(name="brackets", track_two_start="[", track_two_end="]")
+        parser = pickle.loads(pickle.dumps(profile.compile().parser))
+        assert parser.parse("[5168755544412233=18071111000011100000]").track_two.pan == "5168755544412233"
@@ -0,0 +1,62 @@
+"""
+Tests for reconciling swipe logs against settlement records.
+"""
+import random
+
+import pytest
+
+from credit_card_stripe_parser import FullTrackParser
+from credit_card_stripe_parser.reconcile import Reconciler, SettlementRecord
+
+
+def _swipe(parser, pan, expiry):
+    return parser.parse(f";{pan}={expiry}1011000000000?")
+
+
+class TestReconciler:
+    """Test cases for the reconciliation engine."""
+
+    def _inputs(self):
+        parser = FullTrackParser()
+        swipes = [
+            (_swipe(parser, "4111111111111111", "2512"), 1000),
+            (_swipe(parser, "4111111111111111", "2512"), 1000),
+            (_swipe(parser, "5555555555554444", "2601"), 500),
+            (_swipe(parser, "378282246310005", "2703"), 700),
+            (parser.parse("garbage"), 100),
+        ]
+        settlements = [
+            SettlementRecord("4111111111111111", "2512", 1000, "a"),
+            SettlementRecord("5555555555554444", "2601", 550, "b"),
+            SettlementRecord("6011111111111117", "2805", 300, "c"),
+            SettlementRecord("4111111111111111", "2512", 1000, "d"),
+        ]
+        return swipes, settlements
+
+    @pytest.mark.parametrize("max_in_memory", [1000, 1])
+    def test_reconcile(self, max_in_memory, tmp_path):
+        """Test matched, mismatched and missing outcomes in memory and with spilling."""
+        swipes, settlements = self._inputs()
+        reconciler = Reconciler(max_in_memory=max_in_memory, spill_dir=str(tmp_path))
+        items = list(reconciler.reconcile(iter(swipes), iter(settlements)))
+        assert reconciler.counts == {
+            "matched": 2, "mismatched": 1, "missing_settlement": 2, "missing_swipe": 1,
+        }
+        assert {i.settlement.reference for i in items if i.status == "matched"} == {"a", "d"}
+        mismatched = [i for i in items if i.status == "mismatched"][0]
+        assert (mismatched.swipe_amount, mismatched.settlement.amount) == (500, 550)
+        assert (reconciler.spilled_runs > 0) == (max_in_memory == 1)
+        assert list(tmp_path.iterdir()) == []
+
+    def test_spilled_and_in_memory_agree(self):
+        """Test that both join strategies give the same counts on random data."""
+        parser = FullTrackParser()
+        rng = random.Random(7)
+        pans = [f"4{rng.randrange(10 ** 14, 10 ** 15)}" for _ in range(30)]
+        swipes = [(_swipe(parser, rng.choice(pans), "2512"), rng.choice([100, 200])) for _ in range(200)]
+        settlements = [SettlementRecord(rng.choice(pans), "2512", rng.choice([100, 200])) for _ in range(200)]
+        in_memory = Reconciler(max_in_memory=10_000)
+        spilled = Reconciler(max_in_memory=16)
+        assert len(list(in_memory.reconcile(swipes, settlements))) == len(list(spilled.reconcile(swipes, settlements)))
+        assert in_memory.counts == spilled.counts
+        assert spilled.spilled_runs > 2
@@ -0,0 +1,110 @@
+"""
+Tests for the sharded output writer.
+"""
+import json
+import os
+
+import pytest
+
+from credit_card_stripe_parser import FullTrackParser
+from credit_card_stripe_parser.sharded_writer import UNROUTABLE, ShardedWriter, bin_key, shard_name
+
+PANS = ["4111111111111111", "5555555555554444", "378282246310005", "6011111111111117", "4012888888881881"]
+
+
+def _results(count=100):
+    parser = FullTrackParser()
+    return [parser.parse(f";{PANS[i % len(PANS)]}=2512101{i:010d}?") for i in range(count)]
+
+
+def _read_shard(directory):
+    lines = []
+    for name in sorted(os.listdir(directory)):
+        assert not name.endswith(".part")
+        with open(os.path.join(directory, name), encoding="utf-8") as fh:
+            lines.extend(json.loads(line) for line in fh)
+    return lines
+
+
+class TestShardedWriter:
+    """Test cases for ShardedWriter."""
+
+    def test_routes_by_brand(self, tmp_path):
+        """Test that every record lands in its brand's shard, in order."""
+        results = _results() + [FullTrackParser().parse("garbage")]
+        with ShardedWriter(str(tmp_path), buffer_records=7) as writer:
+            writer.write_many(results)
+        assert writer.shards() == ["amex", "discover", "mastercard", "unroutable", "visa"]
+        visa = _read_shard(tmp_path / "visa")
+        assert len(visa) == 40
+        assert [r["track_two"]["discretionary_data"] for r in visa] == [
+            f"{i:010d}" for i in range(100) if PANS[i % 5].startswith("4")]
+        assert len(_read_shard(tmp_path / "unroutable")) == 1
+
+    def test_open_handle_limit(self, tmp_path):
+        """Test that at most max_open_files handles are used and no record is lost."""
+        with ShardedWriter(str(tmp_path), key=bin_key(6), buffer_records=1, max_open_files=2) as writer:
+            writer.write_many(_results())
+            assert len(writer._handles) <= 2
+        assert writer.stats["evictions"] > 0
+        assert sum(len(_read_shard(tmp_path / name)) for name in writer.shards()) == 100
+
+    def test_rotation_by_size(self, tmp_path):
+        """Test that files rotate once they reach rotate_bytes."""
+        with ShardedWriter(str(tmp_path), key=lambda r: "all", buffer_records=10, rotate_bytes=2000) as writer:
+            writer.write_many(_results())
+        files = sorted(os.listdir(tmp_path / "all"))
+        assert len(files) == writer.stats["rotations"] + 1 > 1
+        assert files[0] == "all-000000.jsonl"
+        assert len(_read_shard(tmp_path / "all")) == 100
+
+    def test_rotation_by_time_and_atomic_completion(self, tmp_path):
+        """Test that aged files are completed and that only complete files are visible."""
+        now = [0.0]
+        writer = ShardedWriter(str(tmp_path), key=lambda r: "all", buffer_records=1, rotate_seconds=60,
+                               clock=lambda: now[0])
+        results = _results(4)
+        writer.write_many(results[:2])
+        assert os.listdir(tmp_path / "all") == ["all-000000.jsonl.part"]
+        now[0] = 61.0
+        writer.write_many(results[2:])
+        assert sorted(os.listdir(tmp_path / "all")) == ["all-000000.jsonl", "all-000001.jsonl.part"]
+        writer.close()
+        assert [os.path.basename(p) for p in writer.completed] == ["all-000000.jsonl", "all-000001.jsonl"]
+
+    def test_does_not_overwrite_previous_runs(self, tmp_path):
+        """Test that a second run continues the file numbering."""
+        for _ in range(2):
+            with ShardedWriter(str(tmp_path), key=lambda r: "all") as writer:
+                writer.write_many(_results(3))
+        assert sorted(os.listdir(tmp_path / "all")) == ["all-000000.jsonl", "all-000001.jsonl"]
+
+    @pytest.mark.parametrize("key, name", [
+        ("..", UNROUTABLE),
+        (".", UNROUTABLE),
+        ("", UNROUTABLE),
+        ("../etc", "___etc"),
+        (".hidden", "_hidden"),
+        ("a/../b", "a_.._b"),
+        ("411111", "411111"),
+    ])
+    def test_shard_name(self, key, name):
+        """Test that shard names cannot escape the output directory."""
+        assert shard_name(key) == name
+
+    def test_dot_keys_stay_inside_directory(self, tmp_path):
+        """Test that a PAN of dots is written inside the output directory."""
+        output = tmp_path / "out"
+        result = FullTrackParser().parse(";..=25121010000?")
+        with ShardedWriter(str(output), key=bin_key()) as writer:
+            assert writer.write(result) == UNROUTABLE
+        root = os.path.realpath(str(output))
+        assert writer.completed
+        for path in writer.completed:
+            assert os.path.realpath(path).startswith(root + os.sep)
+        assert sorted(os.listdir(str(tmp_path))) == ["out"]
+
+    def test_rejects_invalid_limits(self, tmp_path):
+        """Test that nonsensical limits are rejected."""
+        with pytest.raises(ValueError):
+            ShardedWriter(str(tmp_path), max_open_files=0)
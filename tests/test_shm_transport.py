@@ -0,0 +1,63 @@
+"""
+Tests for the shared-memory result transport.
+"""
+import multiprocessing
+
+import pytest
+
+from credit_card_stripe_parser import FullTrackParser, SharedResultRing
+
+TRACK_ONE = "%B5168755544412233^PKMMV/UNEMBOXXXX          ^1807111100000000000000111000000?"
+TRACK_TWO = ";5168755544412233=18071111000011100000?"
+LINES = [TRACK_ONE + TRACK_TWO, TRACK_TWO, TRACK_ONE, "invalid track data"]
+
+
+def _worker(ring, lines):
+    parser = FullTrackParser()
+    writer = ring.writer()
+    for line in lines:
+        writer.write(parser.parse(line))
+    writer.close()
+
+
+class TestSharedResultRing:
+    """Test cases for passing parse results through shared memory."""
+
+    def test_round_trip_in_process(self):
+        """Test that models are rebuilt exactly from a segment."""
+        ring = SharedResultRing(segments=2, records_per_segment=8, heap_bytes=4096)
+        try:
+            parser = FullTrackParser()
+            writer = ring.writer()
+            for line in LINES:
+                writer.write(parser.parse(line))
+            writer.flush()
+            with ring.receive(timeout=5) as view:
+                assert len(view) == len(LINES)
+                assert view.to_list() == [parser.parse(line) for line in LINES]
+                assert view[-1].track_one is None
+            with pytest.raises(ValueError):
+                view[0]
+        finally:
+            ring.close()
+
+    def test_workers_stream_through_bounded_ring(self):
+        """Test continuous streaming from worker processes through a small ring."""
+        ring = SharedResultRing(segments=2, records_per_segment=3, heap_bytes=1024)
+        lines = LINES * 10
+        workers = [multiprocessing.Process(target=_worker, args=(ring, lines)) for _ in range(2)]
+        try:
+            for worker in workers:
+                worker.start()
+            received = []
+            while len(received) < 2 * len(lines):
+                view = ring.receive(timeout=10)
+                assert view is not None
+                with view:
+                    received.extend(view)
+            for worker in workers:
+                worker.join(timeout=10)
+            parser = FullTrackParser()
+            assert sorted(map(repr, received)) == sorted(repr(parser.parse(line)) for line in lines * 2)
+        finally:
+            ring.close()
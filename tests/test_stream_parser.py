@@ -0,0 +1,62 @@
+"""
+Tests for the incremental stream parser.
+"""
+from credit_card_stripe_parser import FullTrackParser, StreamParser
+
+
+class TestStreamParser:
+    """Test cases for the push-style stream parser."""
+
+    TEST_TRACK_ONE = "%B5168755544412233^PKMMV/UNEMBOXXXX          ^1807111100000000000000111000000?"
+    TEST_TRACK_TWO = ";5168755544412233=18071111000011100000?"
+    TEST_FULL_TRACK = f"{TEST_TRACK_ONE}{TEST_TRACK_TWO}"
+
+    def test_feed_byte_by_byte(self):
+        """Test that swipes split into single-byte reads are framed correctly."""
+        stream = StreamParser()
+        data = ("\r\nnoise" + self.TEST_FULL_TRACK + "\r\n" + self.TEST_FULL_TRACK).encode('ascii')
+        events = []
+        for i in range(len(data)):
+            events.extend(stream.feed(data[i:i + 1]))
+        assert len(events) == 2
+        expected = FullTrackParser().parse(self.TEST_FULL_TRACK)
+        assert events == [expected, expected]
+        assert stream.stats.frames == 2
+        assert stream.stats.garbage_bytes == len("\r\nnoise\r\n")
+
+    def test_emits_on_final_end_sentinel(self):
+        """Test that a combined swipe is emitted as soon as Track 2 ends."""
+        stream = StreamParser()
+        assert stream.feed(self.TEST_FULL_TRACK[:50]) == []
+        events = stream.feed(self.TEST_FULL_TRACK[50:])
+        assert len(events) == 1
+        assert events[0].is_track_one_valid and events[0].is_track_two_valid
+
+    def test_track_one_only_needs_next_byte_or_flush(self):
+        """Test that a Track 1 only swipe is emitted on the next byte or on flush."""
+        stream = StreamParser()
+        assert stream.feed(self.TEST_TRACK_ONE) == []
+        events = stream.feed("\n")
+        assert len(events) == 1 and events[0].track_two is None
+        assert stream.feed(self.TEST_TRACK_ONE) == []
+        assert len(stream.flush()) == 1
+
+    def test_lrc_bytes(self):
+        """Test framing with an LRC byte after each end sentinel."""
+        parser = FullTrackParser()
+        lrc1 = parser._calculate_lrc(self.TEST_TRACK_ONE[1:-1].encode('ascii'))
+        lrc2 = parser._calculate_lrc(self.TEST_TRACK_TWO[1:-1].encode('ascii'))
+        swipe = f"{self.TEST_TRACK_ONE}{chr(lrc1)}{self.TEST_TRACK_TWO}{chr(lrc2)}"
+        stream = StreamParser(expect_lrc=True)
+        assert stream.feed(swipe[:-1]) == []
+        events = stream.feed(swipe[-1:])
+        assert len(events) == 1
+        assert events[0].track_two.pan == '5168755544412233'
+
+    def test_resync_after_truncated_and_oversized_frames(self):
+        """Test that truncated and overlong frames are dropped without losing the next swipe."""
+        stream = StreamParser()
+        events = stream.feed(";51687555" + "%B" + "9" * 200 + self.TEST_FULL_TRACK)
+        assert len(events) == 1
+        assert events[0].track_one.pan == '5168755544412233'
+        assert stream.stats.overflows == 1
@@ -0,0 +1,99 @@
+"""
+Tests for thread-pool parsing and the thread safety of a shared parser.
+"""
+import random
+import sys
+import threading
+
+from credit_card_stripe_parser import FullTrackParser
+from credit_card_stripe_parser.threaded import ThreadedParser, gil_enabled, parse_batch
+
+TRACK_ONE = "%B5168755544412233^PKMMV/UNEMBOXXXX          ^1807111100000000000000111000000?"
+TRACK_TWO = ";5168755544412233=18071111000011100000?"
+
+
+def _tracks(count, seed=3):
+    rng = random.Random(seed)
+    tracks = []
+    for i in range(count):
+        pan = f"4{rng.randrange(10 ** 14, 10 ** 15)}"
+        kind = i % 5
+        if kind == 0:
+            tracks.append(f"%B{pan}^DOE/JOHN^2512101{i:06d}?;{pan}=2512101{i:06d}?")
+        elif kind == 1:
+            tracks.append(f";{pan}=2601201{i:06d}?")
+        elif kind == 2:
+            tracks.append(TRACK_ONE + TRACK_TWO)
+        elif kind == 3:
+            tracks.append(f"%B{pan}^{'X' * 90}^2512101?")  # Track 1 too long
+        else:
+            tracks.append("not a swipe")
+    return tracks
+
+
+class TestThreadedParser:
+    """Test cases for ThreadedParser."""
+
+    def test_matches_serial_parsing(self):
+        """Test that batch results equal serial results, in order, with errors as None."""
+        tracks = _tracks(2000)
+        parser = FullTrackParser()
+        expected = []
+        for track in tracks:
+            try:
+                expected.append(parser.parse(track))
+            except Exception:
+                expected.append(None)
+        with ThreadedParser(parser, workers=4, chunk_size=64) as threaded:
+            assert threaded.parse_batch(tracks) == expected
+            assert threaded.parse_batch(tracks[:10]) == expected[:10]
+            assert threaded.parse_batch([]) == []
+        assert None in expected
+        assert parse_batch(tracks[:300], workers=2) == expected[:300]
+
+    def test_gil_flag(self):
+        """Test that the GIL flag reflects the interpreter."""
+        assert gil_enabled() is (sys._is_gil_enabled() if hasattr(sys, "_is_gil_enabled") else True)
+
+
+def test_shared_parser_is_thread_safe():
+    """Stress concurrent parse and parse_full_track calls on one parser instance."""
+    parser = FullTrackParser()
+    tracks = _tracks(200, seed=11)
+    pairs = [(TRACK_ONE, TRACK_TWO), (TRACK_ONE, None), (None, TRACK_TWO), ("%bad?", ";bad?")]
+
+    def run_serial():
+        results = []
+        for track in tracks:
+            try:
+                results.append(parser.parse(track))
+            except Exception as e:
+                results.append(type(e))
+        for track1, track2 in pairs:
+            try:
+                results.append(parser.parse_full_track(track1, track2))
+            except Exception as e:
+                results.append(type(e))
+        return results
+
+    expected = run_serial()
+    threads = 8
+    barrier = threading.Barrier(threads)
+    outputs = [None] * threads
+
+    def worker(index):
+        barrier.wait()
+        outputs[index] = [run_serial() for _ in range(20)]
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # force frequent thread switches on GIL builds
+    try:
+        workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+    finally:
+        sys.setswitchinterval(interval)
+    for runs in outputs:
+        assert all(run == expected for run in runs)